@@ -0,0 +1,500 @@
+#!/usr/bin/env python3
+"""
+CaveCode Drift Analytics v1.0
+
+Scans a corpus of engine outputs and rolls up, per engine, the drift
+columns MULTI-ENGINE.md tracks by hand:
+
+    - header format failures   em-dash BLOCK lines that don't match the
+                               validator's BLOCK_HEADER_RE
+    - glyph substitutions      a block's glyph vs. the official one for its
+                               role (e.g. ✏️ → 🖍️ on TUNING KNOBS, or none)
+    - missing blocks           SHELL / BEHAVIOR / TUNING / PUBLIC / NOTES
+    - block order              block numbers that repeat or go backwards
+
+Usage:
+    # Engines are the folders directly under each directory given; their
+    # .cavecode cards and .html / .htm / .js artifacts are all scanned
+    python cavecode_drift.py artifacts/
+
+    # Or name them: ENGINE=dir|file|glob
+    python cavecode_drift.py gemini=runs/gemini/ claude="runs/claude/**/*.cavecode"
+
+    # Paste-ready table for MULTI-ENGINE.md, or JSON for scripts
+    python cavecode_drift.py --format markdown artifacts/
+    python cavecode_drift.py --format json artifacts/ > drift.json
+
+Options:
+    --jobs N          worker processes (default: all CPUs)
+    --db PATH         per-file results cache (default: .cavecode-drift.sqlite)
+    --no-cache        analyze every file, keep nothing
+    --files           also list every file with drift
+
+Results are cached per file: unchanged files (same mtime and size) are
+not read again, so refreshing the matrix after a new test run only
+analyzes the new or edited artifacts. Changing the rule tables below
+invalidates every cached result. Only header lines are decoded; the rest
+of each card is never parsed.
+
+Structural pass = no missing blocks and blocks in order. Glyph pass = no
+glyph substitutions. Drift level per file: High (structure broken),
+Medium (header format failures), Low (glyph substitutions only); an
+engine's level is the median over its files.
+"""
+
+import glob
+import json
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "validator"))
+import cavecode_trace as trace
+from cavecode_view import CardView
+from validate_cavecode_v1_1 import BLOCK_HEADER_RE, REQUIRED_BLOCKS
+from validation_cache import rules_fingerprint
+
+ANALYZER_VERSION = "1.0"
+
+DEFAULT_DB = ".cavecode-drift.sqlite"
+
+# Title keywords that identify each required block, checked in this order
+ROLE_KEYWORDS = {
+    "SHELL": ("SHELL", "IDENTITY"),
+    "BEHAVIOR": ("BEHAVIOR", "GAME LOOP", "FLOW"),
+    "TUNING": ("TUNING", "KNOBS"),
+    "PUBLIC": ("PUBLIC TEXT",),
+    "NOTES": ("NOTES",),
+}
+
+# Official glyphs per role: the card set's first, then the spellings the
+# compliance log also accepts (🪨 🔧 🎚️)
+ROLE_GLYPHS = {
+    "SHELL": ("🧱", "🪨"),
+    "BEHAVIOR": ("🎮", "🔧"),
+    "TUNING": ("🖍️", "🎚️"),
+    "PUBLIC": ("🌐",),
+    "NOTES": ("📝",),
+}
+
+# Characters that wrap a header line in comment syntax
+COMMENT_MARKS = "/#*-<!>; \t"
+
+LEVELS = ("None", "Low", "Medium", "High")
+
+# What a directory target contributes: cards, and the HTML / JS artifacts
+# engines produce with the blocks as comments
+CARD_SUFFIXES = (".cavecode", ".html", ".htm", ".js")
+
+RULES_FINGERPRINT = rules_fingerprint(
+    ANALYZER_VERSION, BLOCK_HEADER_RE.pattern, REQUIRED_BLOCKS, ROLE_KEYWORDS, ROLE_GLYPHS
+)
+
+USAGE = (
+    "Usage: python cavecode_drift.py [--jobs N] [--db PATH | --no-cache] "
+    "[--format text|markdown|json] [--files] <[ENGINE=]dir | file | glob> ..."
+)
+
+# Per-file result: {"headers", "header_failures", "glyphs", "missing",
+#                   "order", "order_ok", "error"}
+Analysis = Dict[str, Any]
+# (engine, path)
+Target = Tuple[str, str]
+# (path, mtime_ns, size, analysis)
+Result = Tuple[str, int, int, Analysis]
+
+
+def header_role(title: str) -> Optional[str]:
+    for role, keywords in ROLE_KEYWORDS.items():
+        if any(k in title for k in keywords):
+            return role
+    return None
+
+
+def header_glyph(text: str) -> str:
+    """Whatever sits before BLOCK once comment markers are removed ('' if nothing)."""
+    return text[: text.find("BLOCK")].strip(COMMENT_MARKS)
+
+
+def _bare(glyph: str) -> str:
+    # ✏️ and ✏ are the same glyph for drift purposes
+    return glyph.replace("\ufe0f", "")
+
+
+def analyze(data: bytes) -> Analysis:
+    """Drift facts for one card, from its header lines only."""
+    result: Analysis = {
+        "headers": 0, "header_failures": [], "glyphs": [], "missing": [],
+        "order": "", "order_ok": True, "error": None,
+    }
+    try:
+        headers = CardView(data).headers
+    except UnicodeDecodeError as e:
+        result["error"] = f"Cannot decode header: {e}"
+        return result
+
+    result["headers"] = len(headers)
+    roles: List[str] = []
+    numbers: List[int] = []
+    for header in headers:
+        text = header.text
+        if not BLOCK_HEADER_RE.match(text):
+            result["header_failures"].append(text)
+        if header.number is not None:
+            numbers.append(int(header.number))
+        role = header_role(text.split("—", 1)[1])
+        if role is None:
+            continue
+        roles.append(role)
+        glyph = header_glyph(text)
+        official = ROLE_GLYPHS[role]
+        if _bare(glyph) not in {_bare(g) for g in official}:
+            result["glyphs"].append([glyph, official[0]])
+
+    result["missing"] = [role for role in REQUIRED_BLOCKS if role not in roles]
+    result["order"] = ">".join(roles)
+    result["order_ok"] = (len(set(roles)) == len(roles)
+                          and all(a < b for a, b in zip(numbers, numbers[1:])))
+    return result
+
+
+def drift_level(a: Analysis) -> str:
+    if a.get("error") or a["missing"] or not a["order_ok"]:
+        return "High"
+    if a["header_failures"]:
+        return "Medium"
+    if a["glyphs"]:
+        return "Low"
+    return "None"
+
+
+def analyze_chunk(jobs: List[Tuple[str, int, int]]) -> List[Result]:
+    """Worker entry point: read and analyze one chunk of (path, mtime_ns, size)."""
+    results: List[Result] = []
+    for path, mtime_ns, size in jobs:
+        trace.count("files")
+        try:
+            with trace.phase("read"):
+                data = Path(path).read_bytes()
+        except OSError as e:
+            results.append((path, mtime_ns, size, {"error": f"Cannot read file: {e}"}))
+            continue
+        with trace.phase("analyze"):
+            results.append((path, mtime_ns, size, analyze(data)))
+    trace.flush_worker()
+    return results
+
+
+# ----------------------------------------------------------------------
+# Inputs and cache
+# ----------------------------------------------------------------------
+
+def collect_targets(args: List[str]) -> List[Target]:
+    """
+    (engine, path) for every card (every CARD_SUFFIXES file under a
+    directory). ENGINE=target names the engine;
+    otherwise a directory's subfolders are its engines, and a file or
+    glob match belongs to its parent folder.
+    """
+    targets: List[Target] = []
+    for arg in args:
+        engine, sep, target = arg.partition("=")
+        if not sep or os.path.exists(arg):
+            engine, target = "", arg
+        if os.path.isdir(target):
+            root = Path(target)
+            for p in sorted(root.rglob("*")):
+                if p.suffix.lower() not in CARD_SUFFIXES or not p.is_file():
+                    continue
+                rel = p.relative_to(root).parts
+                name = engine or (rel[0] if len(rel) > 1 else root.resolve().name)
+                targets.append((name, os.path.normpath(str(p))))
+        else:
+            paths = sorted(glob.glob(target, recursive=True)) if glob.has_magic(target) else [target]
+            for p in paths:
+                name = engine or Path(p).resolve().parent.name
+                targets.append((name, os.path.normpath(p)))
+    return targets
+
+
+def open_cache(db_path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS files ("
+        " path TEXT PRIMARY KEY,"
+        " mtime_ns INTEGER NOT NULL,"
+        " size INTEGER NOT NULL,"
+        " rules TEXT NOT NULL,"
+        " analysis TEXT NOT NULL)"
+    )
+    return conn
+
+
+def load_cached(conn: Optional[sqlite3.Connection]) -> Dict[str, Tuple[int, int, Analysis]]:
+    if conn is None:
+        return {}
+    rows = conn.execute(
+        "SELECT path, mtime_ns, size, analysis FROM files WHERE rules = ?", (RULES_FINGERPRINT,)
+    )
+    return {path: (mtime_ns, size, json.loads(analysis)) for path, mtime_ns, size, analysis in rows}
+
+
+def store_results(conn: Optional[sqlite3.Connection], results: List[Result]) -> None:
+    if conn is None or not results:
+        return
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO files (path, mtime_ns, size, rules, analysis) VALUES (?, ?, ?, ?, ?)",
+            [(path, mtime_ns, size, RULES_FINGERPRINT, json.dumps(a, ensure_ascii=False))
+             for path, mtime_ns, size, a in results
+             if not (a.get("error") or "").startswith("Cannot read")],
+        )
+
+
+def analyze_all(
+    targets: List[Target], jobs: int, conn: Optional[sqlite3.Connection]
+) -> Tuple[Dict[str, Analysis], int]:
+    """Analysis per path, re-reading only files whose stat changed. Returns (analyses, cached)."""
+    with trace.phase("cache"):
+        known = load_cached(conn)
+    analyses: Dict[str, Analysis] = {}
+    stale: List[Tuple[str, int, int]] = []
+    for _, path in targets:
+        if path in analyses:
+            continue
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            analyses[path] = {"error": f"Cannot read file: {e}"}
+            continue
+        prev = known.get(path)
+        if prev and prev[0] == st.st_mtime_ns and prev[1] == st.st_size:
+            analyses[path] = prev[2]
+        else:
+            analyses[path] = {}
+            stale.append((path, st.st_mtime_ns, st.st_size))
+    cached = len(analyses) - len(stale)
+
+    # A few chunks per worker so one slow directory doesn't stall the pool
+    chunk_size = max(1, min(256, len(stale) // (jobs * 4) or 1))
+    chunks = [stale[i : i + chunk_size] for i in range(0, len(stale), chunk_size)]
+
+    def collect(results: List[Result]) -> None:
+        for path, _, _, analysis in results:
+            analyses[path] = analysis
+        with trace.phase("cache"):
+            store_results(conn, results)
+
+    if jobs <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            collect(analyze_chunk(chunk))
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(analyze_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                collect(future.result())
+    return analyses, cached
+
+
+# ----------------------------------------------------------------------
+# Matrix
+# ----------------------------------------------------------------------
+
+def summarize(targets: List[Target], analyses: Dict[str, Analysis]) -> Dict[str, Dict[str, Any]]:
+    """Per-engine totals, engines sorted by name."""
+    engines: Dict[str, Dict[str, Any]] = {}
+    levels: Dict[str, List[int]] = {}
+    for engine, path in targets:
+        a = analyses[path]
+        e = engines.setdefault(engine, {
+            "files": 0, "errors": 0, "structural_pass": 0, "glyph_pass": 0,
+            "header_failures": 0, "header_failure_files": 0, "order_drift": 0,
+            "missing": {}, "glyphs": {}, "orders": {}, "levels": {},
+        })
+        e["files"] += 1
+        level = drift_level(a)
+        e["levels"][level] = e["levels"].get(level, 0) + 1
+        levels.setdefault(engine, []).append(LEVELS.index(level))
+        if a.get("error"):
+            e["errors"] += 1
+            continue
+        if not a["missing"] and a["order_ok"]:
+            e["structural_pass"] += 1
+        if not a["glyphs"]:
+            e["glyph_pass"] += 1
+        if a["header_failures"]:
+            e["header_failures"] += len(a["header_failures"])
+            e["header_failure_files"] += 1
+        if not a["order_ok"]:
+            e["order_drift"] += 1
+        for role in a["missing"]:
+            e["missing"][role] = e["missing"].get(role, 0) + 1
+        for found, official in a["glyphs"]:
+            pair = f"{found or 'none'} → {official}"
+            e["glyphs"][pair] = e["glyphs"].get(pair, 0) + 1
+        e["orders"][a["order"]] = e["orders"].get(a["order"], 0) + 1
+
+    for engine, e in engines.items():
+        ranks = sorted(levels[engine])
+        e["drift_level"] = LEVELS[ranks[(len(ranks) - 1) // 2]]
+    return dict(sorted(engines.items()))
+
+
+def _top(counts: Dict[str, int], n: int = 3) -> str:
+    if not counts:
+        return "—"
+    top = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+    text = ", ".join(f"{k} ×{v}" for k, v in top)
+    return text + (f", +{len(counts) - n} more" if len(counts) > n else "")
+
+
+def matrix_rows(engines: Dict[str, Dict[str, Any]]) -> List[List[str]]:
+    rows = [["Engine", "Files", "Structural Pass", "Glyph Pass", "Header Format Fails",
+             "Missing Blocks", "Glyph Substitutions", "Order Drift", "Drift Level"]]
+    for engine, e in engines.items():
+        files = e["files"]
+        rows.append([
+            engine,
+            str(files) + (f" ({e['errors']} unreadable)" if e["errors"] else ""),
+            f"{e['structural_pass']}/{files}",
+            f"{e['glyph_pass']}/{files}",
+            f"{e['header_failures']} in {e['header_failure_files']} files" if e["header_failures"] else "—",
+            _top(e["missing"], 5),
+            _top(e["glyphs"]),
+            f"{e['order_drift']} files" if e["order_drift"] else "—",
+            "—" if e["drift_level"] == "None" else e["drift_level"],
+        ])
+    return rows
+
+
+def print_text(rows: List[List[str]], out=sys.stdout) -> None:
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    for n, row in enumerate(rows):
+        print("  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip(), file=out)
+        if n == 0:
+            print("  ".join("-" * w for w in widths), file=out)
+
+
+def print_markdown(rows: List[List[str]], out=sys.stdout) -> None:
+    print("| " + " | ".join(rows[0]) + " |", file=out)
+    print("|" + "|".join("-" * (len(h) + 2) for h in rows[0]) + "|", file=out)
+    for row in rows[1:]:
+        print("| " + " | ".join(cell.replace("|", "\\|") for cell in row) + " |", file=out)
+
+
+def print_files(targets: List[Target], analyses: Dict[str, Analysis], out=sys.stdout) -> None:
+    for engine, path in targets:
+        a = analyses[path]
+        if a.get("error"):
+            print(f"{engine}  {path}: {a['error']}", file=out)
+            continue
+        level = drift_level(a)
+        if level == "None":
+            continue
+        notes = []
+        if a["missing"]:
+            notes.append("missing " + ", ".join(a["missing"]))
+        if not a["order_ok"]:
+            notes.append("order " + (a["order"] or "?"))
+        if a["header_failures"]:
+            notes.append(f"{len(a['header_failures'])} header format fails")
+        if a["glyphs"]:
+            notes.append("glyphs " + ", ".join(f"{f or 'none'} → {o}" for f, o in a["glyphs"]))
+        print(f"{engine}  {path}: {level} — {'; '.join(notes)}", file=out)
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+class Options:
+    __slots__ = ("targets", "jobs", "db", "format", "files")
+
+    def __init__(self):
+        self.targets: List[str] = []
+        self.jobs = os.cpu_count() or 1
+        self.db: Optional[str] = DEFAULT_DB
+        self.format = "text"
+        self.files = False
+
+
+def parse_args(argv) -> Options:
+    opts = Options()
+    i = 1
+    while i < len(argv):
+        if argv[i] in ("-j", "--jobs") and i + 1 < len(argv):
+            try:
+                opts.jobs = max(1, int(argv[i + 1]))
+            except ValueError:
+                print(USAGE, file=sys.stderr)
+                sys.exit(1)
+            i += 2
+        elif argv[i] == "--db" and i + 1 < len(argv):
+            opts.db = argv[i + 1]
+            i += 2
+        elif argv[i] == "--no-cache":
+            opts.db = None
+            i += 1
+        elif argv[i] == "--format" and i + 1 < len(argv):
+            if argv[i + 1] not in ("text", "markdown", "json"):
+                print(f"Unsupported format: {argv[i + 1]}", file=sys.stderr)
+                sys.exit(1)
+            opts.format = argv[i + 1]
+            i += 2
+        elif argv[i] == "--files":
+            opts.files = True
+            i += 1
+        else:
+            opts.targets.append(argv[i])
+            i += 1
+    if not opts.targets:
+        print(USAGE, file=sys.stderr)
+        sys.exit(1)
+    return opts
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv if argv is None else argv
+    trace.start("drift")
+    opts = parse_args(argv)
+
+    targets = collect_targets(opts.targets)
+    if not targets:
+        print("ERROR: No cards to analyze.", file=sys.stderr)
+        sys.exit(1)
+
+    started = time.perf_counter()
+    conn = open_cache(Path(opts.db)) if opts.db else None
+    analyses, cached = analyze_all(targets, opts.jobs, conn)
+    if conn is not None:
+        conn.close()
+    engines = summarize(targets, analyses)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    with trace.phase("report"):
+        if opts.format == "json":
+            record = {"type": "drift", "version": ANALYZER_VERSION, "engines": engines}
+            if opts.files:
+                record["files"] = [{"engine": engine, "path": path, **analyses[path]}
+                                   for engine, path in targets]
+            json.dump(record, sys.stdout, ensure_ascii=False, indent=1)
+            print()
+        else:
+            if opts.files:
+                print_files(targets, analyses)
+                print()
+            rows = matrix_rows(engines)
+            (print_markdown if opts.format == "markdown" else print_text)(rows)
+
+    print(f"{len(analyses)} files, {len(analyses) - cached} analyzed, {cached} cached "
+          f"({elapsed:.0f} ms)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
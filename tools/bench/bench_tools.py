@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+CaveCode Tool Benchmarks v1.0
+
+Runs each tool over a synthetic corpus and reports throughput
+(files/s, MB/s) and peak RSS. Results can be saved as a baseline and
+later runs compared against it to flag regressions.
+
+Usage:
+    python bench_tools.py [--corpus DIR] [--count N] [--blocks N] [--knobs N]
+                          [--size BYTES] [--malformed RATE] [--seed N]
+                          [--repeat N] [--only case,case]
+                          [--save-baseline PATH] [--baseline PATH]
+                          [--threshold 0.15] [--json PATH]
+
+    With no --corpus, a corpus is generated in a temp dir from the
+    make_corpus.py options. Each case runs in a fresh child process
+    (best of --repeat) so peak RSS is per tool. Tool output goes to
+    /dev/null; only the timing loop is measured, not interpreter startup.
+
+Cases:
+    validate_v1_1   validate_cavecode_v1_1.py batch mode over the card dir
+    validate_v1_0   validate_cavecode.py main() per card
+    fixer           cavecode_fix_v1.py main() per card
+    compiler        cavecode_to_code.py --lang python main() per card
+    converter       cavecaode_convert.py main() per JSON config
+
+Exit status is 1 when any case regressed past --threshold against
+--baseline (throughput down or peak RSS up by more than that fraction).
+"""
+
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from make_corpus import generate_corpus
+
+TOOLS = Path(__file__).resolve().parent.parent
+DEFAULT_THRESHOLD = 0.15
+
+
+def load_tool(relpath: str):
+    path = TOOLS / relpath
+    # Same import context as running the script directly
+    if str(path.parent) not in sys.path:
+        sys.path.insert(0, str(path.parent))
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def call_main(module, argv: List[str]) -> None:
+    sys.argv = argv
+    try:
+        module.main()
+    except SystemExit:
+        pass
+
+
+def case_validate_v1_1(cards: List[Path], corpus: Path) -> None:
+    tool = load_tool("validator/validate_cavecode_v1_1.py")
+    call_main(tool, ["validate_cavecode_v1_1.py", str(corpus / "cards"), "--jobs", "1"])
+
+
+def case_validate_v1_0(cards: List[Path], corpus: Path) -> None:
+    tool = load_tool("validator/validate_cavecode.py")
+    for card in cards:
+        call_main(tool, ["validate_cavecode.py", str(card)])
+
+
+def case_fixer(cards: List[Path], corpus: Path) -> None:
+    tool = load_tool("fixer/cavecode_fix_v1.py")
+    for card in cards:
+        call_main(tool, ["cavecode_fix_v1.py", str(card)])
+
+
+def case_compiler(cards: List[Path], corpus: Path) -> None:
+    tool = load_tool("compiler/cavecode_to_code.py")
+    for card in cards:
+        call_main(tool, ["cavecode_to_code.py", "--lang", "python", str(card)])
+
+
+def case_converter(cards: List[Path], corpus: Path) -> None:
+    tool = load_tool("compiler/cavecaode_convert.py")
+    for config in sorted((corpus / "configs").glob("*.json")):
+        call_main(tool, ["cavecode_convert.py", str(config)])
+
+
+# name -> (runner, input glob relative to the corpus)
+CASES: Dict[str, tuple] = {
+    "validate_v1_1": (case_validate_v1_1, "cards/*.cavecode"),
+    "validate_v1_0": (case_validate_v1_0, "cards/*.cavecode"),
+    "fixer": (case_fixer, "cards/*.cavecode"),
+    "compiler": (case_compiler, "cards/*.cavecode"),
+    "converter": (case_converter, "configs/*.json"),
+}
+
+
+def run_case_child(name: str, corpus: Path) -> None:
+    """Child side: run one case with stdout silenced, print timing JSON."""
+    runner, pattern = CASES[name]
+    inputs = sorted(corpus.glob(pattern))
+    cards = sorted(corpus.glob("cards/*.cavecode"))
+    total_bytes = sum(p.stat().st_size for p in inputs)
+
+    real_stdout = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    sys.stdout.flush()
+    os.dup2(devnull, 1)
+    try:
+        started = time.perf_counter()
+        runner(cards, corpus)
+        sys.stdout.flush()
+        seconds = time.perf_counter() - started
+    finally:
+        os.dup2(real_stdout, 1)
+        os.close(devnull)
+
+    print(json.dumps({"files": len(inputs), "bytes": total_bytes, "seconds": seconds}))
+
+
+def run_case(name: str, corpus: Path) -> Dict[str, float]:
+    """Parent side: spawn the child, collect timing plus its peak RSS."""
+    proc = subprocess.Popen(
+        [sys.executable, __file__, "--run-case", name, "--corpus", str(corpus)],
+        stdout=subprocess.PIPE,
+        stdin=subprocess.DEVNULL,
+    )
+    _, status, usage = os.wait4(proc.pid, 0)
+    out = proc.stdout.read().decode("utf-8")
+    proc.stdout.close()
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f"benchmark case {name} failed (exit {proc.returncode})")
+
+    data = json.loads(out.strip().splitlines()[-1])
+    seconds = max(data["seconds"], 1e-9)
+    return {
+        "files": data["files"],
+        "bytes": data["bytes"],
+        "seconds": round(seconds, 6),
+        "files_per_s": round(data["files"] / seconds, 2),
+        "mb_per_s": round(data["bytes"] / seconds / 1e6, 3),
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        "peak_rss_kb": usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss,
+    }
+
+
+def best_of(name: str, corpus: Path, repeat: int) -> Dict[str, float]:
+    runs = [run_case(name, corpus) for _ in range(repeat)]
+    best = min(runs, key=lambda r: r["seconds"])
+    best["peak_rss_kb"] = min(r["peak_rss_kb"] for r in runs)
+    return best
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    regressions = []
+    for name, now in current["cases"].items():
+        before = baseline.get("cases", {}).get(name)
+        if not before:
+            continue
+        if now["files_per_s"] < before["files_per_s"] * (1 - threshold):
+            regressions.append(
+                f"{name}: throughput {before['files_per_s']} → {now['files_per_s']} files/s"
+            )
+        if now["peak_rss_kb"] > before["peak_rss_kb"] * (1 + threshold):
+            regressions.append(
+                f"{name}: peak RSS {before['peak_rss_kb']} → {now['peak_rss_kb']} KiB"
+            )
+    return regressions
+
+
+def print_table(results: Dict, baseline: Optional[Dict]) -> None:
+    print(f"{'case':<16}{'files':>8}{'files/s':>12}{'MB/s':>10}{'peak RSS':>12}{'vs base':>10}")
+    for name, r in results["cases"].items():
+        delta = ""
+        before = (baseline or {}).get("cases", {}).get(name)
+        if before:
+            change = r["files_per_s"] / before["files_per_s"] - 1
+            delta = f"{change:+.0%}"
+        print(
+            f"{name:<16}{r['files']:>8}{r['files_per_s']:>12.1f}{r['mb_per_s']:>10.2f}"
+            f"{r['peak_rss_kb']:>9} KiB{delta:>10}"
+        )
+
+
+def parse_args(argv):
+    opts = {
+        "corpus": None, "repeat": 3, "only": None, "save_baseline": None,
+        "baseline": None, "threshold": DEFAULT_THRESHOLD, "json": None, "run_case": None,
+    }
+    corpus_opts = {"count": 200, "blocks": 5, "knobs": 3, "size": 0, "malformed": 0.1, "seed": 1}
+    i = 1
+    while i < len(argv):
+        name = argv[i][2:].replace("-", "_") if argv[i].startswith("--") else None
+        if name in corpus_opts and i + 1 < len(argv):
+            corpus_opts[name] = float(argv[i + 1]) if name == "malformed" else int(argv[i + 1])
+        elif name in opts and i + 1 < len(argv):
+            value = argv[i + 1]
+            if name == "repeat":
+                value = max(1, int(value))
+            elif name == "threshold":
+                value = float(value)
+            elif name == "only":
+                value = [c for c in value.split(",") if c]
+            opts[name] = value
+        else:
+            print(f"Unknown argument: {argv[i]}", file=sys.stderr)
+            sys.exit(1)
+        i += 2
+    return opts, corpus_opts
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv if argv is None else argv
+    opts, corpus_opts = parse_args(argv)
+
+    if opts["run_case"]:
+        run_case_child(opts["run_case"], Path(opts["corpus"]))
+        return
+
+    names = opts["only"] or list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        print(f"Unknown case(s): {', '.join(unknown)} (available: {', '.join(CASES)})",
+              file=sys.stderr)
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory(prefix="cavecode-bench-") as tmp:
+        corpus = Path(opts["corpus"]) if opts["corpus"] else generate_corpus(Path(tmp), **corpus_opts)
+        results = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "corpus": str(opts["corpus"]) if opts["corpus"] else corpus_opts,
+                "repeat": opts["repeat"],
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            },
+            "cases": {name: best_of(name, corpus, opts["repeat"]) for name in names},
+        }
+
+    baseline = None
+    if opts["baseline"] and Path(opts["baseline"]).exists():
+        baseline = json.loads(Path(opts["baseline"]).read_text(encoding="utf-8"))
+
+    print_table(results, baseline)
+
+    if opts["json"]:
+        Path(opts["json"]).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if opts["save_baseline"]:
+        path = Path(opts["save_baseline"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"\nBaseline saved to {path}")
+
+    if baseline:
+        regressions = compare(results, baseline, opts["threshold"])
+        if regressions:
+            print(f"\nREGRESSIONS (threshold {opts['threshold']:.0%}):")
+            for r in regressions:
+                print(f"- {r}")
+            sys.exit(1)
+        print(f"\nNo regressions against {opts['baseline']} (threshold {opts['threshold']:.0%}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+CaveCode Synthetic Corpus Generator v1.0
+
+Builds a directory of cards from the scaffold template, plus a matching
+JSON config for each card (input for the converter).
+
+Usage:
+    python make_corpus.py OUT_DIR [--count N] [--blocks N] [--knobs N]
+                          [--size BYTES] [--malformed RATE] [--seed N]
+
+    --count      number of cards (default 200)
+    --blocks     total blocks per card, 5 = the scaffold set (default 5)
+    --knobs      tuning knobs per card (default 3)
+    --size       pad each card with notes up to about this many bytes
+    --malformed  fraction of cards with one broken header (default 0.1)
+    --seed       random seed, so corpora are reproducible (default 1)
+
+Output:
+    OUT_DIR/cards/card_00000.cavecode ...
+    OUT_DIR/configs/card_00000.json ...
+"""
+
+import json
+import random
+import sys
+from pathlib import Path
+from typing import Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scaffold"))
+from cavecode_new_card import render_card
+
+# Fixed timestamp so identical settings give byte-identical corpora
+CREATED = "2025-01-01 00:00:00Z"
+
+KNOB_ANCHOR = "MAX_LIVES:        3\n"
+NOTES_HEADER = "📝 BLOCK 5 — HUMAN NOTES"
+
+
+def _break_tuning_glyph(card: str, rng: random.Random) -> str:
+    return card.replace("🖍️ BLOCK 3", "✏️ BLOCK 3", 1)
+
+
+def _drop_glyph(card: str, rng: random.Random) -> str:
+    return card.replace("🌐 BLOCK 4", "BLOCK 4", 1)
+
+
+def _hyphen_dash(card: str, rng: random.Random) -> str:
+    return card.replace("🎮 BLOCK 2 —", "🎮 BLOCK 2 -", 1)
+
+
+def _comment_header(card: str, rng: random.Random) -> str:
+    return card.replace("🧱 BLOCK 1", "// 🧱 BLOCK 1", 1)
+
+
+def _missing_block(card: str, rng: random.Random) -> str:
+    return card.replace(NOTES_HEADER, "📝 NOTES", 1)
+
+
+MALFORMATIONS = [_break_tuning_glyph, _drop_glyph, _hyphen_dash, _comment_header, _missing_block]
+
+
+def make_knobs(rng: random.Random, count: int) -> Dict[str, object]:
+    knobs: Dict[str, object] = {}
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            knobs[f"KNOB_{i:04d}"] = round(rng.uniform(0, 100), 2)
+        elif kind == 1:
+            knobs[f"KNOB_{i:04d}"] = rng.randint(0, 1000)
+        else:
+            knobs[f"KNOB_{i:04d}"] = rng.choice([True, False])
+    return knobs
+
+
+def make_card(
+    rng: random.Random,
+    index: int,
+    blocks: int = 5,
+    knobs: int = 3,
+    size: int = 0,
+    malformed: bool = False,
+) -> str:
+    title = f"Synthetic Card {index:05d}"
+    card = render_card(title, CREATED)
+
+    # Extra knobs go right after the scaffold's own three
+    extra = make_knobs(rng, max(0, knobs - 3))
+    if extra:
+        knob_lines = "".join(f"{k}: {str(v).lower() if isinstance(v, bool) else v}\n"
+                             for k, v in extra.items())
+        card = card.replace(KNOB_ANCHOR, KNOB_ANCHOR + knob_lines, 1)
+
+    # Extra blocks are appended after HUMAN NOTES
+    parts = [card]
+    for n in range(6, blocks + 1):
+        parts.append(
+            "\n========================================\n"
+            f"🎮 BLOCK {n} — EXPANSION {n}\n"
+            "========================================\n"
+            f"- Optional mode {n}, described in plain words.\n"
+        )
+    card = "".join(parts)
+
+    if malformed:
+        card = rng.choice(MALFORMATIONS)(card, rng)
+
+    if size and len(card.encode("utf-8")) < size:
+        pad = []
+        length = len(card.encode("utf-8"))
+        i = 0
+        while length < size:
+            line = f"# note {i}: the cave remembers every tweak a human makes.\n"
+            pad.append(line)
+            length += len(line)
+            i += 1
+        card += "".join(pad)
+    return card
+
+
+def make_config(rng: random.Random, index: int, knobs: int) -> Dict[str, object]:
+    config: Dict[str, object] = {"title": f"Synthetic Card {index:05d}"}
+    config.update(make_knobs(rng, knobs))
+    config["start_message"] = "Tap to begin."
+    config["game_over_message"] = "Game over. Try again."
+    return config
+
+
+def generate_corpus(
+    out_dir: Path,
+    count: int = 200,
+    blocks: int = 5,
+    knobs: int = 3,
+    size: int = 0,
+    malformed: float = 0.1,
+    seed: int = 1,
+) -> Path:
+    rng = random.Random(seed)
+    cards = out_dir / "cards"
+    configs = out_dir / "configs"
+    cards.mkdir(parents=True, exist_ok=True)
+    configs.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        broken = rng.random() < malformed
+        text = make_card(rng, i, blocks, knobs, size, broken)
+        (cards / f"card_{i:05d}.cavecode").write_text(text, encoding="utf-8")
+        config = make_config(rng, i, knobs)
+        (configs / f"card_{i:05d}.json").write_text(json.dumps(config, indent=2), encoding="utf-8")
+    return out_dir
+
+
+def parse_args(argv):
+    opts = {"count": 200, "blocks": 5, "knobs": 3, "size": 0, "malformed": 0.1, "seed": 1}
+    out = None
+    i = 1
+    while i < len(argv):
+        name = argv[i][2:] if argv[i].startswith("--") else None
+        if name in opts and i + 1 < len(argv):
+            opts[name] = float(argv[i + 1]) if name == "malformed" else int(argv[i + 1])
+            i += 2
+        elif out is None and not argv[i].startswith("--"):
+            out = argv[i]
+            i += 1
+        else:
+            print(f"Unknown argument: {argv[i]}", file=sys.stderr)
+            sys.exit(1)
+    if out is None:
+        print("Usage: make_corpus.py OUT_DIR [--count N] [--blocks N] [--knobs N] "
+              "[--size BYTES] [--malformed RATE] [--seed N]", file=sys.stderr)
+        sys.exit(1)
+    return Path(out), opts
+
+
+def main():
+    out, opts = parse_args(sys.argv)
+    generate_corpus(out, **opts)
+    print(f"Wrote {opts['count']} cards to {out / 'cards'} and configs to {out / 'configs'}")
+
+
+if __name__ == "__main__":
+    main()
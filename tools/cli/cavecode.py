@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+CaveCode CLI v1.0
+
+One entry point for every tool. Each subcommand takes the same arguments
+as the script it stands for, and only that script is imported:
+`cavecode validate` never loads the compiler or the converter.
+
+Usage:
+    python tools/cli/cavecode.py validate cards/
+    python tools/cli/cavecode.py fix --in-place cards/
+    python tools/cli/cavecode.py compile --lang python,js --out build/ cards/
+    python tools/cli/cavecode.py --help
+
+    # fix → validate → compile in one process, each card read once
+    python tools/cli/cavecode.py run cards/a.cavecode cards/b.cavecode
+    python tools/cli/cavecode.py run --out build/ --lang python,js cards/
+    python tools/cli/cavecode.py run --steps validate,compile --out build/ --lang all cards/
+
+run:
+    --steps fix,validate,compile   steps to chain (default: fix,validate, plus
+                                   compile when --out is given)
+    --out DIR / --lang L[,L]       as for compile (--lang defaults to python)
+    --rules PACK[,PACK]            extra validator rule packs
+    --force                        rebuild every target
+
+    fix rewrites changed cards in place, validate reports like the batch
+    validator, and compile builds only cards that did not FAIL, sharing
+    the compiler's OUT/.cavecode-build.json manifest. Exit status is 1 if
+    any card failed or could not be read or written.
+
+As a library (with tools/cli on sys.path):
+    from cavecode import load
+    validator = load("validate")
+    status, messages = validator.validate_bytes(data, path)
+"""
+
+import importlib
+import os
+import sys
+
+TOOLS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# subcommand: (script under tools/, help line)
+COMMANDS = {
+    "validate": ("validator/validate_cavecode_v1_1.py", "check cards against the v1.1 rules"),
+    "validate-v1.0": ("validator/validate_cavecode.py", "the original single-card validator"),
+    "fix": ("fixer/cavecode_fix_v1.py", "normalize block headers"),
+    "convert": ("compiler/cavecaode_convert.py", "JSON / JS / .env config → card"),
+    "compile": ("compiler/cavecode_to_code.py", "card → Python / JS / Java program"),
+    "new": ("scaffold/cavecode_new_card.py", "print a blank card"),
+    "index": ("index/cavecode_index.py", "search cards by block, knob or text"),
+    "watch": ("watch/cavecode_watch.py", "re-run tools when cards change"),
+    "export": ("export/cavecode_export.py", "card ↔ canonical JSON / packed binary"),
+    "html": ("html/cavecode_html.py", "knobs in HTML/JS artifacts: show, check, set"),
+    "drift": ("analytics/cavecode_drift.py", "per-engine drift matrix for a corpus"),
+    "merge": ("merge/cavecode_merge.py", "block/knob-level diff and three-way merge"),
+    "upgrade": ("dialect/cavecode_upgrade.py", "classify card dialects, upgrade v1.0 cards to v1.1"),
+    "bench": ("bench/bench_tools.py", "benchmark the tools"),
+}
+
+STEPS = ("fix", "validate", "compile")
+
+USAGE = "Usage: cavecode.py <command> [args...]\n       cavecode.py run [--steps " + ",".join(STEPS) + "] " \
+        "[--out DIR] [--lang L[,L]] [--rules PACK] [--force] <file | dir | glob> ..."
+
+
+def load(command: str):
+    """The module behind a subcommand, imported on first use."""
+    directory, name = os.path.split(os.path.join(TOOLS, COMMANDS[command][0]))
+    # Same import context as running the script directly
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    return importlib.import_module(name[:-3])
+
+
+def print_help(out=sys.stdout) -> None:
+    print(USAGE + "\n\nCommands:", file=out)
+    width = max(len(c) for c in COMMANDS)
+    for command, (_, help_text) in COMMANDS.items():
+        print(f"  {command:<{width}}  {help_text}", file=out)
+    print(f"  {'run':<{width}}  chain fix → validate → compile in one process", file=out)
+
+
+# ----------------------------------------------------------------------
+# run: fix → validate → compile
+# ----------------------------------------------------------------------
+
+class RunOptions:
+    __slots__ = ("steps", "targets", "out", "langs", "packs", "force")
+
+    def __init__(self):
+        self.steps = None
+        self.targets = []
+        self.out = None
+        self.langs = []
+        self.packs = ()
+        self.force = False
+
+
+def parse_run_args(argv) -> RunOptions:
+    opts = RunOptions()
+    i = 0
+    while i < len(argv):
+        if argv[i] == "--steps" and i + 1 < len(argv):
+            opts.steps = [s for s in argv[i + 1].split(",") if s]
+            i += 2
+        elif argv[i] == "--out" and i + 1 < len(argv):
+            opts.out = argv[i + 1]
+            i += 2
+        elif argv[i] == "--lang" and i + 1 < len(argv):
+            opts.langs.append(argv[i + 1])
+            i += 2
+        elif argv[i] == "--rules" and i + 1 < len(argv):
+            opts.packs += tuple(p for p in argv[i + 1].split(",") if p)
+            i += 2
+        elif argv[i] == "--force":
+            opts.force = True
+            i += 1
+        else:
+            opts.targets.append(argv[i])
+            i += 1
+    if opts.steps is None:
+        opts.steps = ["fix", "validate"] + (["compile"] if opts.out else [])
+    unknown = [s for s in opts.steps if s not in STEPS]
+    if not opts.targets or not opts.steps or unknown:
+        if unknown:
+            print(f"Unknown step: {', '.join(unknown)}", file=sys.stderr)
+        print(USAGE, file=sys.stderr)
+        sys.exit(1)
+    if "compile" in opts.steps and opts.out is None:
+        print("The compile step needs --out DIR", file=sys.stderr)
+        sys.exit(1)
+    return opts
+
+
+def run(argv) -> int:
+    opts = parse_run_args(argv)
+    import time
+    from pathlib import Path
+
+    sys.path.insert(0, os.path.join(TOOLS, "common"))
+    import cavecode_trace as trace
+    trace.start("run")
+
+    fixer = load("fix") if "fix" in opts.steps else None
+    validator = load("validate") if "validate" in opts.steps else None
+    compiler = load("compile") if "compile" in opts.steps else None
+
+    engine = None
+    if validator:
+        try:
+            engine = validator.build_engine(opts.packs)
+        except (ValueError, OSError, AttributeError) as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 1
+    if compiler:
+        # The compiler's own option parsing checks and normalizes the languages
+        langs = compiler.parse_args(["", "--lang", ",".join(opts.langs or ["python"]),
+                                     "--out", opts.out, "-"]).langs
+        out = Path(opts.out)
+        out.mkdir(parents=True, exist_ok=True)
+        manifest = compiler.load_manifest(out)
+        fingerprint = compiler.compiler_fingerprint()
+        cards = compiler.collect_cards(opts.targets)
+        clashes = compiler.stem_clashes(cards)
+        if clashes:
+            for clash in clashes:
+                print(f"ERROR: {clash}", file=sys.stderr)
+            return 1
+    else:
+        cards = [(p, "") for p in (validator or fixer).collect_paths(opts.targets)]
+    if not cards:
+        print("ERROR: No cards to process.", file=sys.stderr)
+        return 1
+
+    counts = {"PASS": 0, "PASS WITH WARNINGS": 0, "FAIL": 0}
+    fixed = built = errors = 0
+    started = time.perf_counter()
+    for card, stem in cards:
+        path = Path(card)
+        trace.count("files")
+        try:
+            with trace.phase("read"):
+                data = path.read_bytes()
+        except OSError as e:
+            errors += 1
+            print(f"ERROR: {card}: Cannot read file: {e}", file=sys.stderr)
+            continue
+
+        if fixer:
+            try:
+                text = data.decode("utf-8")
+            except UnicodeDecodeError as e:
+                text = None
+                if not validator:
+                    errors += 1
+                    print(f"ERROR: {card}: {e}", file=sys.stderr)
+                    continue
+            with trace.phase("fix"):
+                fixed_text = fixer.fix_text(text) if text is not None else None
+            if fixed_text != text:
+                try:
+                    with trace.phase("write"):
+                        fixer.replace_atomic(path, lambda f: f.write(fixed_text))
+                except OSError as e:
+                    errors += 1
+                    print(f"ERROR: {card}: {e}", file=sys.stderr)
+                    continue
+                data = fixed_text.encode("utf-8")
+                fixed += 1
+                print(f"fixed {card}")
+
+        if validator:
+            with trace.phase("validate"):
+                status, messages = validator.validate_bytes(data, path, engine)
+            counts[status] += 1
+            print(f"{card}: {status}")
+            for m in messages:
+                print(f"    - {m}")
+            if status == "FAIL":
+                continue
+
+        if compiler:
+            with trace.phase("compile"):
+                _, entries, langs_built, error = compiler.build_card(
+                    card, stem, langs, manifest.get(card, {}), data, str(out), fingerprint, opts.force
+                )
+            if error:
+                errors += 1
+                print(f"ERROR: {card}: {error}", file=sys.stderr)
+                continue
+            manifest[card] = entries
+            built += len(langs_built)
+            for lang in langs_built:
+                print(f"{card} → {entries[lang]['output']}")
+
+    if compiler:
+        compiler.save_manifest(out, manifest)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    summary = [f"{len(cards)} files"]
+    if fixer:
+        summary.append(f"{fixed} fixed")
+    if validator:
+        summary.append(f"{counts['PASS']} PASS, {counts['PASS WITH WARNINGS']} PASS WITH WARNINGS, "
+                       f"{counts['FAIL']} FAIL")
+    if compiler:
+        summary.append(f"{built} targets built")
+    if errors:
+        summary.append(f"{errors} errors")
+    print(f"\nSummary: {' — '.join(summary)} ({elapsed:.0f} ms)")
+    return 1 if counts["FAIL"] or errors else 0
+
+
+def main(argv=None):
+    argv = sys.argv if argv is None else argv
+    if len(argv) < 2:
+        print_help(sys.stderr)
+        sys.exit(1)
+    if argv[1] in ("-h", "--help", "help"):
+        print_help()
+        sys.exit(0)
+    command, args = argv[1], argv[2:]
+    if command == "run":
+        sys.exit(run(args))
+    if command not in COMMANDS:
+        print(f"Unknown command: {command}\n", file=sys.stderr)
+        print_help(sys.stderr)
+        sys.exit(1)
+    load(command).main([f"cavecode {command}"] + args)
+
+
+if __name__ == "__main__":
+    main()
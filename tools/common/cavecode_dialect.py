@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+CaveCode Dialects v1.0
+
+Cards come in two header dialects:
+
+    v1.0   ==== BLOCK 1 — IDENTITY          (validate_cavecode.py)
+           ==== BLOCK 2 - TUNING KNOBS
+    v1.1   🧱 BLOCK 1 — SHELL               (validate_cavecode_v1_1.py)
+           🖍️ BLOCK 3 — TUNING KNOBS
+
+plus sub-blocks from the structure spec (BLOCK 1A, BLOCK 2B) in either.
+One regex (HEADER_RE) matches every header of both dialects; scan() runs
+it over the whole text once and returns a HeaderMatch per header with
+its dialect, number, sub-block letter and role. classify() names the
+card's dialect from those matches, and canonical_header() maps a role
+to the v1.1 block model every tool targets (CANON_BLOCKS).
+
+Usage:
+    from cavecode_dialect import classify, scan
+    headers = scan(text)
+    print(classify(headers), [(h.number + h.sub, h.role) for h in headers])
+"""
+
+import re
+from typing import Dict, List, Optional
+
+V10 = "v1.0"
+V11 = "v1.1"
+MIXED = "mixed"
+NONE = "none"
+
+DIALECTS = (V10, V11, MIXED, NONE)
+
+# One header of either dialect: "====" or a glyph (or nothing) before BLOCK,
+# a number with an optional sub-block letter, an em-dash (or "-") and a
+# title. A header inside a code artifact may sit in a comment
+# ("// 🪨 BLOCK 1 — IDENTITY", "<!-- ... -->"); the markers around it are
+# kept apart as lead and tail.
+HEADER_RE = re.compile(
+    r"^[ \t]*(?P<lead>(?://+|#+|/?\*+|<!--|;+|--)[ \t]*)?"
+    r"(?:(?P<rule>=+)[ \t]*|(?P<glyph>[^\sA-Za-z0-9=#/*<>;!-]+)[ \t]+)?"
+    r"BLOCK[ \t]+(?P<num>\d+)(?P<sub>[A-Z]?)[ \t]+(?P<dash>—|-)[ \t]+"
+    r"(?P<title>[^\r\n]*?)[ \t=]*(?P<tail>\*/|-->)?[ \t]*\r?$",
+    re.MULTILINE,
+)
+
+# The v1.1 block model: (role, number, glyph, title), in card order
+CANON_BLOCKS = (
+    ("SHELL", "1", "🧱", "SHELL"),
+    ("BEHAVIOR", "2", "🎮", "GAME LOOP / BEHAVIOR"),
+    ("TUNING", "3", "🖍️", "TUNING KNOBS"),
+    ("PUBLIC", "4", "🌐", "PUBLIC TEXT"),
+    ("NOTES", "5", "📝", "HUMAN NOTES"),
+)
+
+# Canonical header per block number (what the fixer enforces)
+CANON_HEADERS = {number: f"{glyph} BLOCK {number} — {title}"
+                 for _, number, glyph, title in CANON_BLOCKS}
+CANON_NUMBERS: Dict[str, str] = {role: number for role, number, _, _ in CANON_BLOCKS}
+CANON_GLYPHS: Dict[str, str] = {role: glyph for role, _, glyph, _ in CANON_BLOCKS}
+
+# Title keywords for each role, checked in this order. v1.0's IDENTITY and
+# LOCKED LOGIC are the v1.1 SHELL and BEHAVIOR blocks.
+ROLE_KEYWORDS = {
+    "SHELL": ("SHELL", "IDENTITY", "OVERVIEW"),
+    "BEHAVIOR": ("BEHAVIOR", "GAME LOOP", "CORE LOOP", "FLOW", "LOGIC"),
+    "TUNING": ("TUNING", "KNOBS", "EDIT ZONE"),
+    "PUBLIC": ("PUBLIC TEXT", "PLAYER-FACING TEXT"),
+    "NOTES": ("NOTES",),
+}
+
+# Header text that marks a block as locked (see block_fingerprints.py),
+# and the explicit marker some titles carry, e.g. "[LOCKED]", "(Locked)"
+LOCKED_RE = re.compile(r"IDENTITY|(?i:\bLOCKED\b)")
+LOCK_MARKER_RE = re.compile(r"[\[(][^\[\]()]*\bLOCKED\b[^\[\]()]*[\])]", re.IGNORECASE)
+
+# The v1.0 block model: number → title. v1.1 artifact cards reuse these
+# titles (IDENTITY (Locked), LOCKED LOGIC) but not this numbering alone,
+# so a card of bare "BLOCK 1 — ..." headers is v1.0 only if every major
+# block sits where v1.0 puts it, with no BEHAVIOR or NOTES block
+V10_LAYOUT = {"1": "IDENTITY", "2": "TUNING KNOBS", "3": "PUBLIC TEXT", "4": "LOCKED LOGIC"}
+
+
+class HeaderMatch:
+    """One block header, e.g. '==== BLOCK 2A — SPEEDS' (number "2", sub "A")."""
+
+    __slots__ = ("lineno", "text", "lead", "tail", "number", "sub", "glyph", "title",
+                 "dialect", "role")
+
+    def __init__(self, lineno: int, m: "re.Match"):
+        self.lineno = lineno                  # 0-based line index
+        self.text = m.group().strip()
+        self.lead = m.group("lead") or ""     # comment opener, e.g. "// "
+        self.tail = m.group("tail") or ""     # comment closer, e.g. "-->"
+        self.number = m.group("num")
+        self.sub = m.group("sub")             # "" for a major block
+        self.glyph = m.group("glyph") or ""
+        self.title = m.group("title")
+        if m.group("rule"):
+            self.dialect: Optional[str] = V10
+        elif self.glyph and m.group("dash") == "—":
+            self.dialect = V11
+        else:
+            self.dialect = None               # bare header, fits either
+        self.role = header_role(self.title)
+
+    def __repr__(self):
+        return f"HeaderMatch({self.lineno}, {self.text!r}, {self.dialect})"
+
+
+def header_role(title: str) -> Optional[str]:
+    upper = title.upper()
+    for role, keywords in ROLE_KEYWORDS.items():
+        if any(k in upper for k in keywords):
+            return role
+    return None
+
+
+def match_header(line: str) -> Optional[HeaderMatch]:
+    """The header on one line, or None."""
+    m = HEADER_RE.match(line.rstrip("\r\n"))
+    return HeaderMatch(0, m) if m else None
+
+
+def scan(text: str) -> List[HeaderMatch]:
+    """Every header in the text, in one pass over it."""
+    headers: List[HeaderMatch] = []
+    if "BLOCK" not in text:
+        return headers
+    lineno = 0
+    pos = 0
+    for m in HEADER_RE.finditer(text):
+        lineno += text.count("\n", pos, m.start())
+        pos = m.start()
+        headers.append(HeaderMatch(lineno, m))
+    return headers
+
+
+def classify(headers: List[HeaderMatch]) -> str:
+    """v1.0, v1.1, mixed (both header styles) or none (no headers)."""
+    if not headers:
+        return NONE
+    found = {h.dialect for h in headers if h.dialect}
+    if len(found) > 1:
+        return MIXED
+    if found:
+        return found.pop()
+    # Only bare headers: the block numbering tells
+    majors = [h for h in headers if not h.sub]
+    if majors and all(V10_LAYOUT.get(h.number, "\0") in h.title.upper() for h in majors):
+        return V10
+    return V11
+
+
+def canonical_header(role: str) -> str:
+    """The v1.1 header for a role, e.g. 'TUNING' → '🖍️ BLOCK 3 — TUNING KNOBS'."""
+    return CANON_HEADERS[CANON_NUMBERS[role]]
+
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+CaveCode Shared Parser v1.0
+
+One linear pass over a card, producing a small document model that every
+tool in this repo reads from:
+
+    Document
+        .lines        card lines (line endings removed)
+        .offsets      character offset of each line in .text
+        .headers      em-dash block headers ("... BLOCK N — TITLE")
+        .block_lines  every line mentioning BLOCK (headers included)
+        .blocks       header + line range + knobs for each block
+        .comments     "#" comment lines
+        .title        value of the first "Title:" line, if any
+
+Usage:
+    from cavecode_parser import parse_file
+    doc = parse_file(Path("card.cavecode"))
+    for block in doc.blocks:
+        print(block.header.text, len(block.knobs))
+"""
+
+import re
+import sys
+from pathlib import Path
+from typing import Any, Iterable, List, Optional
+
+import cavecode_trace as trace
+
+# Characters str.splitlines() treats as line boundaries
+_LINE_BREAKS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+_NUMBER_RE = re.compile(r"-?\d+(\.\d+)?")
+
+
+class Header:
+    """A line that mentions BLOCK, e.g. '🖍️ BLOCK 3 — TUNING KNOBS'."""
+
+    __slots__ = ("lineno", "text", "number", "dashed")
+
+    def __init__(self, lineno: int, text: str):
+        self.lineno = lineno          # 0-based line index
+        self.text = text              # stripped line text
+        self.dashed = "—" in text     # only em-dash lines open a block
+        self.number = header_number(text)
+
+    def __repr__(self):
+        return f"Header({self.lineno}, {self.text!r})"
+
+
+class Knob:
+    """A 'KEY: value  # comment' line inside a block."""
+
+    __slots__ = ("key", "value", "raw", "comment", "lineno")
+
+    def __init__(self, key: str, value: str, raw: str, comment: Optional[str], lineno: int):
+        self.key = key
+        self.value = value            # comment removed, quotes stripped
+        self.raw = raw                # everything after the first ":"
+        self.comment = comment        # inline comment text, without "#"
+        self.lineno = lineno
+
+    @property
+    def typed(self) -> Any:
+        return coerce_value(self.value)
+
+    def __repr__(self):
+        return f"Knob({self.key!r}, {self.value!r})"
+
+
+class Comment:
+    __slots__ = ("lineno", "text")
+
+    def __init__(self, lineno: int, text: str):
+        self.lineno = lineno
+        self.text = text
+
+    def __repr__(self):
+        return f"Comment({self.lineno}, {self.text!r})"
+
+
+class Block:
+    """Everything between one em-dash header and the next (or end of file)."""
+
+    __slots__ = ("header", "start", "end", "knobs", "_doc")
+
+    def __init__(self, doc: "Document", header: Header):
+        self._doc = doc
+        self.header = header
+        self.start = header.lineno + 1   # first body line
+        self.end = len(doc.lines)        # exclusive, fixed when the next header arrives
+        self.knobs: List[Knob] = []
+
+    @property
+    def number(self) -> Optional[str]:
+        return self.header.number
+
+    @property
+    def title(self) -> str:
+        return self.header.text
+
+    @property
+    def lines(self) -> List[str]:
+        return self._doc.lines[self.start : self.end]
+
+    def knob_map(self):
+        return {k.key: k.value for k in self.knobs}
+
+    def __repr__(self):
+        return f"Block({self.header.text!r}, lines {self.start}-{self.end})"
+
+
+class Document:
+    __slots__ = (
+        "path", "text", "lines", "offsets", "headers", "block_lines",
+        "blocks", "comments", "title",
+    )
+
+    def __init__(self, text: str, path: Optional[Path] = None):
+        self.path = path
+        self.text = text
+        self.lines: List[str] = []
+        self.offsets: List[int] = []
+        self.headers: List[Header] = []
+        self.block_lines: List[Header] = []
+        self.blocks: List[Block] = []
+        self.comments: List[Comment] = []
+        self.title: Optional[str] = None
+
+    def find_blocks(self, snippet: str) -> List[Block]:
+        """Blocks whose header text contains snippet."""
+        return [b for b in self.blocks if snippet in b.header.text]
+
+    def knobs_in(self, blocks: Iterable[Block]):
+        """Merged KEY -> value map for the given blocks, later keys win."""
+        knobs = {}
+        for block in blocks:
+            for knob in block.knobs:
+                knobs[knob.key] = knob.value
+        return knobs
+
+    def __repr__(self):
+        return f"Document({self.path}, {len(self.lines)} lines, {len(self.blocks)} blocks)"
+
+
+def header_number(text: str) -> Optional[str]:
+    """
+    Returns the block number token for "BLOCK N —" style lines,
+    or None if the token after "BLOCK " is not an integer.
+    """
+    if "BLOCK " not in text:
+        return None
+    num_part = text.split("BLOCK ", 1)[1].split(" ", 1)[0].strip()
+    try:
+        int(num_part)
+    except ValueError:
+        return None
+    return num_part
+
+
+def split_knob(stripped: str, lineno: int) -> Optional[Knob]:
+    """Parse a stripped 'KEY: value  # comment' line, or None."""
+    if not stripped or stripped.startswith("#") or ":" not in stripped:
+        return None
+    key, raw = stripped.split(":", 1)
+    value = raw.strip()
+    comment = None
+    if "#" in value:
+        value, comment = value.split("#", 1)
+        value = value.strip()
+        comment = comment.strip()
+    value = value.strip('"').strip("'")
+    return Knob(key.strip(), value, raw.strip(), comment, lineno)
+
+
+def coerce_value(value: str) -> Any:
+    """Turn '6' / '0.4' / 'true' into int / float / bool; leave other text alone."""
+    if _NUMBER_RE.fullmatch(value):
+        return float(value) if "." in value else int(value)
+    if value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    return value
+
+
+def parse_text(text: str, path: Optional[Path] = None) -> Document:
+    with trace.phase("parse"):
+        doc = _parse_text(text, path)
+    if trace.enabled():
+        trace.count("lines", len(doc.lines))
+        trace.count("headers", len(doc.headers))
+        trace.count("knobs", sum(len(b.knobs) for b in doc.blocks))
+    return doc
+
+
+def _parse_text(text: str, path: Optional[Path]) -> Document:
+    doc = Document(text, path)
+    lines = doc.lines
+    offsets = doc.offsets
+    current: Optional[Block] = None
+    offset = 0
+
+    for lineno, raw in enumerate(text.splitlines(keepends=True)):
+        offsets.append(offset)
+        offset += len(raw)
+        if raw.endswith("\r\n"):
+            line = raw[:-2]
+        elif raw and raw[-1] in _LINE_BREAKS:
+            line = raw[:-1]
+        else:
+            line = raw
+        lines.append(line)
+
+        stripped = line.strip()
+        if not stripped:
+            continue
+
+        if "BLOCK" in stripped:
+            header = Header(lineno, stripped)
+            doc.block_lines.append(header)
+            if header.dashed:
+                doc.headers.append(header)
+                if current is not None:
+                    current.end = lineno
+                current = Block(doc, header)
+                doc.blocks.append(current)
+                continue
+
+        if stripped.startswith("#"):
+            doc.comments.append(Comment(lineno, stripped))
+            continue
+
+        if doc.title is None and stripped.startswith("Title:"):
+            doc.title = line.split(":", 1)[1].strip()
+
+        if current is not None:
+            knob = split_knob(stripped, lineno)
+            if knob is not None:
+                current.knobs.append(knob)
+
+    if current is not None:
+        current.end = len(lines)
+    return doc
+
+
+def read_text(path: Path) -> str:
+    with trace.phase("read"):
+        if str(path) == "-":
+            return sys.stdin.read()
+        return path.read_text(encoding="utf-8")
+
+
+def parse_file(path: Path) -> Document:
+    return parse_text(read_text(path), path)
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+CaveCode Trace v1.0
+
+Opt-in timing, counters and profiling for every tool. Nothing is
+measured unless CAVECODE_TRACE is set, and then each tool run appends
+one JSON line (a trace record) to that file:
+
+    CAVECODE_TRACE=trace.jsonl python tools/validator/validate_cavecode_v1_1.py cards/
+    CAVECODE_TRACE=- ...                            # records go to stderr
+    CAVECODE_TRACE_PROFILE=cpu,memory CAVECODE_TRACE=trace.jsonl ...
+
+    # Hot spots across every run in the file
+    python tools/common/cavecode_trace.py trace.jsonl
+
+Record:
+    {"type": "trace", "version": 1, "tool": "validate", "pid": ..., "ppid": ...,
+     "worker": false, "argv": [...], "started": <unix time>,
+     "wall_ms": ..., "cpu_ms": ...,
+     "phases":   {"read": {"ms": ..., "calls": ...}, "parse": {...}, ...},
+     "counters": {"files": ..., "lines": ..., "headers": ..., "knobs": ...},
+     "profile":  {"cpu": [{"function": "file:line(name)", "calls": ...,
+                           "self_ms": ..., "total_ms": ...}, ...],
+                  "memory": {"peak_bytes": ..., "top": [{"site": "file:line",
+                             "bytes": ..., "count": ...}, ...]}}}
+
+Phase times are inclusive (a phase inside another counts toward both).
+Worker processes of --jobs runs append their own records with
+"worker": true; "profile" only covers the main process, so profile with
+--jobs 1.
+
+Usage in a tool:
+    import cavecode_trace as trace
+    trace.start("validate")
+    with trace.phase("read"):
+        data = path.read_bytes()
+    trace.count("files")
+"""
+
+import atexit
+import math
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+TRACE_VERSION = 1
+
+PROFILE_TOP = 30          # functions / allocation sites kept per record
+
+_TARGET = os.environ.get("CAVECODE_TRACE") or None
+_PROFILE = {p.strip() for p in os.environ.get("CAVECODE_TRACE_PROFILE", "").split(",") if p.strip()}
+
+# Tool name for worker processes started with spawn, which never call start()
+_TOOL_ENV = "CAVECODE_TRACE_TOOL"
+
+
+class _State:
+    __slots__ = ("tool", "worker", "started", "wall", "cpu", "phases", "counters",
+                 "profiler", "memory")
+
+    def __init__(self, tool: Optional[str], worker: bool):
+        self.tool = tool
+        self.worker = worker
+        self.started = time.time()
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        self.phases: Dict[str, List[float]] = {}    # name -> [seconds, calls]
+        self.counters: Dict[str, int] = {}
+        self.profiler = None
+        self.memory = False
+
+
+_state: Optional[_State] = None
+
+
+def enabled() -> bool:
+    return _TARGET is not None
+
+
+class _Phase:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _add_phase(self.name, time.perf_counter() - self.t0)
+        return False
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+
+def _current() -> _State:
+    global _state
+    if _state is None:
+        # A worker that did not inherit the parent's state
+        _state = _State(os.environ.get(_TOOL_ENV), worker=True)
+    return _state
+
+
+def _add_phase(name: str, seconds: float) -> None:
+    entry = _current().phases.get(name)
+    if entry is None:
+        _state.phases[name] = [seconds, 1]
+    else:
+        entry[0] += seconds
+        entry[1] += 1
+
+
+def phase(name: str):
+    """Context manager timing one phase; free when tracing is off."""
+    if _TARGET is None:
+        return _NO_PHASE
+    return _Phase(name)
+
+
+def count(name: str, n: int = 1) -> None:
+    if _TARGET is None:
+        return
+    counters = _current().counters
+    counters[name] = counters.get(name, 0) + n
+
+
+def start(tool: str) -> None:
+    """Starts the run's record (first call wins); written when the process exits."""
+    global _state
+    if _TARGET is None or (_state is not None and not _state.worker):
+        return
+    _state = _State(tool, worker=False)
+    os.environ[_TOOL_ENV] = tool
+    if "cpu" in _PROFILE:
+        import cProfile
+        _state.profiler = cProfile.Profile()
+        _state.profiler.enable()
+    if "memory" in _PROFILE:
+        import tracemalloc
+        tracemalloc.start()
+        _state.memory = True
+    atexit.register(finish)
+
+
+def flush_worker() -> None:
+    """
+    Called at the end of each *_chunk worker entry point: in a pool worker
+    it appends this chunk's record and resets; in the main process it
+    does nothing (the run's record is written at exit).
+    """
+    global _state
+    if _TARGET is None or _state is None or not _state.worker:
+        return
+    _write(_record(_state))
+    _state = None
+
+
+def finish() -> None:
+    global _state
+    if _state is None or _state.worker:
+        return
+    state, _state = _state, None
+    record = _record(state)
+    profile: Dict[str, Any] = {}
+    if state.profiler is not None:
+        state.profiler.disable()
+        profile["cpu"] = _cpu_profile(state.profiler)
+    if state.memory:
+        profile["memory"] = _memory_profile()
+    if profile:
+        record["profile"] = profile
+    _write(record)
+
+
+def _record(state: _State) -> Dict[str, Any]:
+    return {
+        "type": "trace",
+        "version": TRACE_VERSION,
+        "tool": state.tool,
+        "pid": os.getpid(),
+        "ppid": os.getppid(),
+        "worker": state.worker,
+        "argv": sys.argv[1:] if not state.worker else [],
+        "started": round(state.started, 6),
+        "wall_ms": round((time.perf_counter() - state.wall) * 1000, 3),
+        "cpu_ms": round((time.process_time() - state.cpu) * 1000, 3),
+        "phases": {name: {"ms": round(s * 1000, 3), "calls": n}
+                   for name, (s, n) in state.phases.items()},
+        "counters": dict(state.counters),
+    }
+
+
+def _cpu_profile(profiler) -> List[Dict[str, Any]]:
+    import pstats
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda kv: kv[1][2], reverse=True)[:PROFILE_TOP]
+    return [
+        {"function": f"{filename}:{line}({name})", "calls": nc,
+         "self_ms": round(tt * 1000, 3), "total_ms": round(ct * 1000, 3)}
+        for (filename, line, name), (_, nc, tt, ct, _) in rows
+    ]
+
+
+def _memory_profile() -> Dict[str, Any]:
+    import tracemalloc
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    top = snapshot.statistics("lineno")[:PROFILE_TOP]
+    return {
+        "peak_bytes": peak,
+        "top": [{"site": f"{s.traceback[0].filename}:{s.traceback[0].lineno}",
+                 "bytes": s.size, "count": s.count} for s in top],
+    }
+
+
+def _write(record: Dict[str, Any]) -> None:
+    import json     # only paid for by traced runs
+    line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+    if _TARGET == "-":
+        sys.stderr.flush()
+        os.write(sys.stderr.fileno(), line)
+        return
+    # One O_APPEND write per record, so concurrent runs don't interleave lines
+    fd = os.open(_TARGET, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def _after_fork() -> None:
+    # A forked pool worker starts its own record instead of adding to the parent's
+    global _state
+    if _state is None:
+        return
+    if _state.profiler is not None:
+        _state.profiler.disable()
+    if _state.memory:
+        import tracemalloc
+        tracemalloc.stop()
+    _state = _State(_state.tool, worker=True)
+
+
+if _TARGET is not None and hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+# ----------------------------------------------------------------------
+# Aggregation
+# ----------------------------------------------------------------------
+
+def _percentile(values: List[float], q: float) -> float:
+    # Nearest rank: the smallest value with at least q of the runs at or below it
+    values = sorted(values)
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+def summarize(paths: List[str], out=sys.stdout) -> int:
+    """Per tool: runs, wall time percentiles, phase totals, counters and hottest functions."""
+    import json
+    tools: Dict[str, Dict[str, Any]] = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(record, dict) or record.get("type") != "trace":
+                    continue
+                t = tools.setdefault(record.get("tool") or "?", {
+                    "runs": [], "workers": 0, "phases": {}, "counters": {}, "cpu": {},
+                })
+                if record.get("worker"):
+                    t["workers"] += 1
+                else:
+                    t["runs"].append(record.get("wall_ms", 0.0))
+                for name, p in record.get("phases", {}).items():
+                    agg = t["phases"].setdefault(name, [0.0, 0])
+                    agg[0] += p["ms"]
+                    agg[1] += p["calls"]
+                for name, n in record.get("counters", {}).items():
+                    t["counters"][name] = t["counters"].get(name, 0) + n
+                for row in record.get("profile", {}).get("cpu", []):
+                    agg = t["cpu"].setdefault(row["function"], [0.0, 0])
+                    agg[0] += row["self_ms"]
+                    agg[1] += row["calls"]
+
+    if not tools:
+        print("No trace records found.", file=sys.stderr)
+        return 1
+    for name in sorted(tools):
+        t = tools[name]
+        runs = t["runs"]
+        line = f"{name}: {len(runs)} runs"
+        if t["workers"]:
+            line += f" (+{t['workers']} worker records)"
+        if runs:
+            line += (f", wall p50 {_percentile(runs, 0.5):.1f} ms, "
+                     f"p95 {_percentile(runs, 0.95):.1f} ms, total {sum(runs):.0f} ms")
+        print(line, file=out)
+        for phase_name, (ms, calls) in sorted(t["phases"].items(), key=lambda kv: -kv[1][0]):
+            print(f"    {phase_name:<12} {ms:10.1f} ms  {calls:8d} calls", file=out)
+        if t["counters"]:
+            print("    " + ", ".join(f"{k} {v}" for k, v in sorted(t["counters"].items())), file=out)
+        hottest = sorted(t["cpu"].items(), key=lambda kv: -kv[1][0])[:10]
+        for function, (ms, calls) in hottest:
+            print(f"    {ms:10.1f} ms self  {calls:8d} calls  {function}", file=out)
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python cavecode_trace.py trace.jsonl [more.jsonl ...]", file=sys.stderr)
+        sys.exit(1)
+    sys.exit(summarize(sys.argv[1:]))
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+CaveCode Lazy Card View v1.0
+
+A read-only view of a card that only decodes what is asked for. Opening
+a view scans the raw bytes (memory-mapped for files) for header lines
+and keeps a block offset table; nothing else is decoded or parsed:
+
+    CardView
+        .headers      em-dash block headers, as in Document
+        .blocks       LazyBlock per header: knobs and lines are decoded
+                      and parsed on first access, one block at a time
+        .title        first "Title:" value, found by searching the bytes
+        .find_blocks / .knobs_in   same as Document
+
+So "list block titles" or "get Title" costs one byte scan, and the
+compiler's TUNING KNOBS lookup parses only that block. Results match
+parse_text() exactly; cards that use line breaks other than \\n / \\r\\n
+are rare enough that the view just parses them in full.
+
+Usage:
+    from cavecode_view import open_view
+    with open_view(Path("card.cavecode")) as view:
+        print(view.title, [b.title for b in view.blocks])
+"""
+
+import mmap
+import re
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Union
+
+import cavecode_trace as trace
+from cavecode_parser import Document, Header, Knob, parse_text, split_knob
+
+EM_DASH = "—".encode("utf-8")
+
+# Line breaks str.splitlines() knows, apart from \n and \r\n
+_OTHER_BREAKS = (b"\x0b", b"\x0c", b"\x1c", b"\x1d", b"\x1e", b"\xc2\x85",
+                 b"\xe2\x80\xa8", b"\xe2\x80\xa9")
+_LONE_CR_RE = re.compile(rb"\r(?!\n)")
+
+Buffer = Union[bytes, mmap.mmap]
+
+
+class LazyBlock:
+    """Block with the same interface, whose body is decoded on first use."""
+
+    __slots__ = ("header", "start", "end", "_view", "_span", "_lines", "_knobs")
+
+    def __init__(self, view: "CardView", header: Header, span_start: int, end: int):
+        self._view = view
+        self.header = header
+        self.start = header.lineno + 1
+        self.end = end                     # exclusive line number
+        self._span = [span_start, None]    # body bytes; end filled in by the view
+        self._lines: Optional[List[str]] = None
+        self._knobs: Optional[List[Knob]] = None
+
+    @property
+    def number(self) -> Optional[str]:
+        return self.header.number
+
+    @property
+    def title(self) -> str:
+        return self.header.text
+
+    @property
+    def lines(self) -> List[str]:
+        if self._lines is None:
+            start, end = self._span
+            self._lines = bytes(self._view._buf[start:end]).decode("utf-8").splitlines()
+        return self._lines
+
+    @property
+    def knobs(self) -> List[Knob]:
+        if self._knobs is None:
+            knobs = []
+            for i, line in enumerate(self.lines, self.start):
+                stripped = line.strip()
+                # Same order of checks as parse_text(): comments are never knobs
+                if not stripped or stripped.startswith("#"):
+                    continue
+                knob = split_knob(stripped, i)
+                if knob is not None:
+                    knobs.append(knob)
+            trace.count("knobs", len(knobs))
+            self._knobs = knobs
+        return self._knobs
+
+    def knob_map(self):
+        return {k.key: k.value for k in self.knobs}
+
+    def __repr__(self):
+        return f"LazyBlock({self.header.text!r}, lines {self.start}-{self.end})"
+
+
+class CardView:
+    """Lazy, read-only card. Build it with open_view() or from bytes."""
+
+    def __init__(self, data: Buffer, path: Optional[Path] = None, owner=None):
+        self.path = path
+        self._buf = data
+        self._owner = owner                # mmap to close, if we opened one
+        self._doc: Optional[Document] = None
+        self._blocks: Optional[List[LazyBlock]] = None
+        self._title: Any = False           # False = not looked up yet
+        if has_other_breaks(data):
+            self._doc = parse_text(bytes(data).decode("utf-8"), path)
+
+    # -- lifecycle -----------------------------------------------------
+
+    def close(self) -> None:
+        if self._owner is not None:
+            self._owner.close()
+            self._owner = None
+
+    def __enter__(self) -> "CardView":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # -- lines ---------------------------------------------------------
+
+    def _line(self, pos: int):
+        """(start, end, text) of the line containing byte pos, without its ending."""
+        buf = self._buf
+        start = buf.rfind(b"\n", 0, pos) + 1
+        end = buf.find(b"\n", pos)
+        if end == -1:
+            end = len(buf)
+        raw = bytes(buf[start:end])
+        if raw.endswith(b"\r"):
+            raw = raw[:-1]
+        return start, end, raw
+
+    def _line_count(self, counted: int = 0, lineno: int = 0) -> int:
+        """Number of lines, given lineno lines end before byte counted."""
+        buf = self._buf
+        return lineno + buf[counted:].count(b"\n") + (1 if len(buf) and buf[-1:] != b"\n" else 0)
+
+    # -- headers and blocks ---------------------------------------------
+
+    def _scan(self) -> None:
+        buf = self._buf
+        blocks: List[LazyBlock] = []
+        lineno = 0
+        counted = 0                        # byte offset lineno is valid for
+        pos = buf.find(b"BLOCK")
+        while pos != -1:
+            start, end, raw = self._line(pos)
+            if EM_DASH in raw:
+                # Slices are consecutive, so this copies the file at most once
+                lineno += buf[counted:start].count(b"\n")
+                counted = start
+                header = Header(lineno, raw.decode("utf-8").strip())
+                if blocks:
+                    blocks[-1].end = lineno
+                    blocks[-1]._span[1] = start
+                blocks.append(LazyBlock(self, header, min(end + 1, len(buf)), 0))
+            pos = buf.find(b"BLOCK", end)
+        if blocks:
+            blocks[-1].end = self._line_count(counted, lineno)
+            blocks[-1]._span[1] = len(buf)
+        self._blocks = blocks
+
+    @property
+    def blocks(self) -> List[Any]:
+        if self._doc is not None:
+            return self._doc.blocks
+        if self._blocks is None:
+            with trace.phase("scan"):
+                self._scan()
+            trace.count("headers", len(self._blocks))
+        return self._blocks
+
+    @property
+    def headers(self) -> List[Header]:
+        if self._doc is not None:
+            return self._doc.headers
+        return [b.header for b in self.blocks]
+
+    @property
+    def title(self) -> Optional[str]:
+        if self._doc is not None:
+            return self._doc.title
+        if self._title is False:
+            self._title = None
+            buf = self._buf
+            pos = buf.find(b"Title:")
+            while pos != -1:
+                _, end, raw = self._line(pos)
+                line = raw.decode("utf-8")
+                stripped = line.strip()
+                # Dashed BLOCK lines are headers, never the title
+                if stripped.startswith("Title:") and not ("BLOCK" in stripped and "—" in stripped):
+                    self._title = line.split(":", 1)[1].strip()
+                    break
+                pos = buf.find(b"Title:", end)
+        return self._title
+
+    @property
+    def text(self) -> str:
+        """The whole card, decoded (defeats the point; for callers that need it)."""
+        return bytes(self._buf).decode("utf-8")
+
+    def find_blocks(self, snippet: str) -> List[Any]:
+        """Blocks whose header text contains snippet."""
+        return [b for b in self.blocks if snippet in b.header.text]
+
+    def knobs_in(self, blocks: Iterable[Any]):
+        """Merged KEY -> value map for the given blocks, later keys win."""
+        knobs = {}
+        for block in blocks:
+            for knob in block.knobs:
+                knobs[knob.key] = knob.value
+        return knobs
+
+    def __repr__(self):
+        return f"CardView({self.path})"
+
+
+def has_other_breaks(data: Buffer) -> bool:
+    """True if data has line breaks the byte scan does not handle (memchr-speed checks)."""
+    if any(data.find(b) != -1 for b in _OTHER_BREAKS):
+        return True
+    return data.find(b"\r") != -1 and _LONE_CR_RE.search(data) is not None
+
+
+def open_view(path: Path) -> CardView:
+    """Memory-maps path; close the view (or use it as a context manager) when done."""
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return CardView(b"", path)
+    return CardView(mm, path, owner=mm)
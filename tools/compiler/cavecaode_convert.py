@@ -1,11 +1,71 @@
 #!/usr/bin/env python3
+"""
+CaveCode Config Converter v1.0
+
+Turns a JSON object, a JS config object (`const CONFIG = {...};`) or a
+.env-style KEY=value list into a CaveCode card.
+
+Usage:
+    python cavecaode_convert.py config.json > card.cavecode
+    cat export.json | python cavecaode_convert.py - > card.cavecode
+    python cavecaode_convert.py --original-sidecar export.orig.json export.json > card.cavecode
+    python cavecaode_convert.py --flatten --schema engine.schema.json engine.json > card.cavecode
+
+Large inputs are streamed: the format is detected once from the first
+64 KiB, then top-level entries are decoded one at a time and written
+straight to TUNING KNOBS / PUBLIC TEXT spools (in memory until they grow,
+then on disk), so memory stays flat for multi-hundred-MB exports. The
+original is copied into BLOCK 5 in chunks, or with --original-sidecar
+written to a separate file that BLOCK 5 points to.
+
+Inputs the streaming path cannot reproduce exactly (duplicate keys,
+single-quoted JS objects, trailing text, malformed JSON) fall back to
+the original whole-text conversion, so the card is always the same.
+
+--flatten turns nested objects and arrays into dotted knob paths
+(`physics.gravity.y: -9.8`, `enemies.0.kind: "bat"`) instead of one
+stringified value per top-level key. Nesting is walked with an explicit
+stack, so depth is not limited by Python's recursion limit. A path that
+appears twice keeps its first position and its last value.
+
+--schema PATH writes a JSON sidecar with each knob's type (int, float,
+bool, enum, string, or null / object / array for JSON values that are
+not scalars), zone and value, taken from the decoded input rather than
+the card text. String knobs under arrays whose elements
+share a small set of values (`enemies.*.kind`) are typed as enums.
+"""
+
 import json
-import sys
 import re
+import sys
+import tempfile
+from array import array
 from pathlib import Path
-from typing import Dict, Any, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, TextIO, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+import cavecode_trace as trace
+from cavecode_parser import coerce_value
 
 TEXT_KEYS = ("text", "message", "title", "label", "caption", "prompt")
+TEXT_KEY_RE = re.compile("|".join(TEXT_KEYS))
+TITLE_KEYS = ("title", "TITLE", "name", "NAME")
+DEFAULT_TITLE = "Auto-Converted Card"
+
+CHUNK_SIZE = 1 << 20
+HEAD_SIZE = 1 << 16
+SPOOL_SIZE = 8 << 20
+SPOOL_BATCH = 1024
+
+SCHEMA_VERSION = 1
+# A string knob under an array becomes an enum when its elements share
+# at most this many distinct values (and at least one value repeats)
+ENUM_MAX_VALUES = 16
+
+# json.loads only skips these around a document
+JSON_WHITESPACE = " \t\n\r"
+
+RULE = "========================================"
 
 
 def read_input(path: Path) -> str:
@@ -41,32 +101,37 @@ def strip_js_wrapper(text: str) -> str:
     return inner
 
 
+def parse_key_value_line(line: str) -> Optional[Tuple[str, Any]]:
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    if "=" not in line:
+        return None
+    key, value = line.split("=", 1)
+    key = key.strip()
+    value = value.strip().strip('"').strip("'")
+    # Coerce numbers and booleans the same way card knobs are typed
+    return key, coerce_value(value)
+
+
 def parse_key_values(text: str) -> Dict[str, Any]:
     data: Dict[str, Any] = {}
     for line in text.splitlines():
-        line = line.strip()
-        if not line or line.startswith("#"):
-            continue
-        if "=" not in line:
-            continue
-        key, value = line.split("=", 1)
-        key = key.strip()
-        value = value.strip().strip('"').strip("'")
-        # Try to coerce numbers and booleans
-        if re.fullmatch(r"-?\d+(\.\d+)?", value):
-            value = float(value) if "." in value else int(value)
-        elif value.lower() in ("true", "false"):
-            value = value.lower() == "true"
-        data[key] = value
+        item = parse_key_value_line(line)
+        if item is not None:
+            data[item[0]] = item[1]
     return data
 
 
+def is_public_key(key: str) -> bool:
+    return TEXT_KEY_RE.search(key.lower()) is not None
+
+
 def classify_fields(data: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     knobs: Dict[str, Any] = {}
     public: Dict[str, Any] = {}
     for k, v in data.items():
-        lk = k.lower()
-        if any(tk in lk for tk in TEXT_KEYS):
+        if is_public_key(k):
             public[k] = v
         else:
             knobs[k] = v
@@ -79,92 +144,696 @@ def format_value(v: Any) -> str:
     return str(v)
 
 
+def head_lines(title: str) -> List[str]:
+    """Everything up to the BLOCK 3 rule line."""
+    return [
+        RULE,
+        "🪨 CAVECODE CARD — AUTO-CONVERTED (v1.0)",
+        RULE,
+        "",
+        f"Title: {title}",
+        "Source: auto-converted from existing config.",
+        "",
+        RULE,
+        "🧱 BLOCK 1 — SHELL",
+        RULE,
+        "Short Description:",
+        "    Converted from an existing config into CaveCode format.",
+        "",
+        "Goal:",
+        "    🌐 Let a human tune values in one place without touching code.",
+        "",
+        RULE,
+        "✏️ BLOCK 3 — TUNING KNOBS",
+        RULE,
+    ]
+
+
+NO_KNOBS = "# (no numeric/boolean knobs detected)"
+NO_PUBLIC = "# (no obvious public text fields detected)"
+
+PUBLIC_LINES = ["", RULE, "🌐 BLOCK 4 — PUBLIC TEXT", RULE]
+
+
+def notes_lines(sidecar: Optional[str] = None) -> List[str]:
+    """BLOCK 5 up to where the original goes (or a pointer to the sidecar)."""
+    lines = ["", RULE, "📝 BLOCK 5 — HUMAN NOTES", RULE]
+    if sidecar is not None:
+        return lines + [
+            f"# Original config kept next to this card: {sidecar}",
+            "# (do not edit unless you know what you’re doing)",
+            "",
+        ]
+    return lines + [
+        "# Original snippet (for reference):",
+        "# (do not edit unless you know what you’re doing)",
+        "",
+        "```source",
+    ]
+
+
+def entry_line(key: str, value: Any) -> str:
+    return f"{key}: {format_value(value)}"
+
+
 def generate_cavecode(
     data: Dict[str, Any],
     original: str,
-    title_guess: str = "Auto-Converted Card",
+    title_guess: str = DEFAULT_TITLE,
+    sidecar: Optional[str] = None,
+    schema: Optional["KnobSchema"] = None,
 ) -> str:
     knobs, public = classify_fields(data)
 
-    lines = []
-
-    lines.append("========================================")
-    lines.append("🪨 CAVECODE CARD — AUTO-CONVERTED (v1.0)")
-    lines.append("========================================")
-    lines.append("")
-    lines.append(f"Title: {title_guess}")
-    lines.append("Source: auto-converted from existing config.")
-    lines.append("")
-    lines.append("========================================")
-    lines.append("🧱 BLOCK 1 — SHELL")
-    lines.append("========================================")
-    lines.append("Short Description:")
-    lines.append("    Converted from an existing config into CaveCode format.")
-    lines.append("")
-    lines.append("Goal:")
-    lines.append("    🌐 Let a human tune values in one place without touching code.")
-    lines.append("")
-    lines.append("========================================")
-    lines.append("✏️ BLOCK 3 — TUNING KNOBS")
-    lines.append("========================================")
+    lines = head_lines(title_guess)
     if knobs:
         for k, v in knobs.items():
-            lines.append(f"{k}: {format_value(v)}")
+            lines.append(entry_line(k, v))
+            if schema is not None:
+                schema.add(k, v, "tuning")
     else:
-        lines.append("# (no numeric/boolean knobs detected)")
-    lines.append("")
-    lines.append("========================================")
-    lines.append("🌐 BLOCK 4 — PUBLIC TEXT")
-    lines.append("========================================")
+        lines.append(NO_KNOBS)
+    lines.extend(PUBLIC_LINES)
     if public:
         for k, v in public.items():
-            lines.append(f"{k}: {format_value(v)}")
+            lines.append(entry_line(k, v))
+            if schema is not None:
+                schema.add(k, v, "public")
     else:
-        lines.append("# (no obvious public text fields detected)")
-    lines.append("")
-    lines.append("========================================")
-    lines.append("📝 BLOCK 5 — HUMAN NOTES")
-    lines.append("========================================")
-    lines.append("# Original snippet (for reference):")
-    lines.append("# (do not edit unless you know what you’re doing)")
-    lines.append("")
-    lines.append("```source")
-    lines.append(original.rstrip())
-    lines.append("```")
-    lines.append("")
+        lines.append(NO_PUBLIC)
+    lines.extend(notes_lines(sidecar))
+    if sidecar is None:
+        lines.append(original.rstrip())
+        lines.append("```")
+        lines.append("")
 
     return "\n".join(lines)
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: cavecode_convert.py <input-file | ->", file=sys.stderr)
-        sys.exit(1)
+def guess_title(data: Dict[str, Any]) -> str:
+    for key in TITLE_KEYS:
+        if key in data and isinstance(data[key], str):
+            return data[key]
+    return DEFAULT_TITLE
 
-    path = Path(sys.argv[1])
-    raw = read_input(path)
 
+def convert_text(
+    raw: str,
+    sidecar: Optional[str] = None,
+    flatten: bool = False,
+    schema: Optional["KnobSchema"] = None,
+) -> str:
+    """The whole-text conversion: JSON, then JS wrapper, then KEY=value."""
+    parse = flat_object if flatten else try_parse_json
     # 1) Try straight JSON
-    ok, data = try_parse_json(raw)
-    title_guess = "Auto-Converted Card"
+    ok, data = parse(raw)
 
     if not ok:
         # 2) Try JS wrapper strip
         js_inner = strip_js_wrapper(raw)
-        ok, data = try_parse_json(js_inner)
+        ok, data = parse(js_inner)
 
     if not ok:
         # 3) Fallback: key=value mode
         data = parse_key_values(raw)
 
-    # Try to guess a title from data
-    for key in ("title", "TITLE", "name", "NAME"):
-        if key in data and isinstance(data[key], str):
-            title_guess = data[key]
+    return generate_cavecode(data, raw, title_guess=guess_title(data), sidecar=sidecar,
+                             schema=schema)
+
+
+# ----------------------------------------------------------------------
+# Nested configs (--flatten) and the knob schema
+# ----------------------------------------------------------------------
+
+_WS = r"[ \t\n\r]*"
+_STR = r'[^"\\\x00-\x1f]*'
+_KEY = r'("' + _STR + r'(?:\\.' + _STR + r')*")' + _WS + ":" + _WS
+
+WS_RE = re.compile(_WS)
+KEY_RE = re.compile(_WS + _KEY)
+EMPTY_RE = re.compile(r"\{" + _WS + r"\}|\[" + _WS + r"\]")
+AFTER_RE = re.compile(_WS + r"([,\]}])")
+
+# Scalars only: "{" and "[" never reach it, so it never recurses
+_scan_scalar = json.JSONDecoder().scan_once
+
+
+def _key(raw: str) -> str:
+    return json.loads(raw) if "\\" in raw else raw[1:-1]
+
+
+def walk_value(s: str, pos: int) -> Tuple[List[Tuple[str, Any]], int]:
+    """
+    Decodes the JSON value at s[pos] into (suffix, scalar) pairs, e.g.
+    (".physics.gravity", 9.8), and returns them with the end position.
+    Empty objects and arrays are kept as leaves. Iterative, so nesting
+    depth is unbounded. Raises StopIteration or JSONDecodeError like the
+    json scanner, including when s ends early.
+    """
+    pairs: List[Tuple[str, Any]] = []
+    parts: List[str] = []       # path below the starting value
+    closers: List[str] = []     # "}" or "]" for each open container
+    counts: List[int] = []      # members seen so far in each open container
+    while True:
+        pos = WS_RE.match(s, pos).end()
+        m = EMPTY_RE.match(s, pos)
+        if m:
+            pairs.append(("".join("." + p for p in parts), {} if s[pos] == "{" else []))
+            pos = m.end()
+        elif s.startswith("{", pos):
+            m = KEY_RE.match(s, pos + 1)
+            if m is None:
+                raise json.JSONDecodeError("Expecting property name", s, pos + 1)
+            closers.append("}")
+            counts.append(0)
+            parts.append(_key(m.group(1)))
+            pos = m.end()
+            continue
+        elif s.startswith("[", pos):
+            closers.append("]")
+            counts.append(0)
+            parts.append("0")
+            pos += 1
+            continue
+        else:
+            value, pos = _scan_scalar(s, pos)
+            pairs.append(("".join("." + p for p in parts), value))
+
+        # Close finished containers until the next member (or the end)
+        while closers:
+            m = AFTER_RE.match(s, pos)
+            if m is None:
+                raise json.JSONDecodeError("Expecting ',' delimiter", s, pos)
+            pos = m.end()
+            if m.group(1) == ",":
+                counts[-1] += 1
+                if closers[-1] == "}":
+                    m = KEY_RE.match(s, pos)
+                    if m is None:
+                        raise json.JSONDecodeError("Expecting property name", s, pos)
+                    parts[-1] = _key(m.group(1))
+                    pos = m.end()
+                else:
+                    parts[-1] = str(counts[-1])
+                break
+            if m.group(1) != closers[-1]:
+                raise json.JSONDecodeError("Mismatched bracket", s, pos - 1)
+            closers.pop()
+            counts.pop()
+            parts.pop()
+        else:
+            return pairs, pos
+
+
+def flat_object(text: str) -> Tuple[bool, Dict[str, Any]]:
+    """try_parse_json for --flatten: a JSON object as {dotted path: scalar}."""
+    start = len(text) - len(text.lstrip(JSON_WHITESPACE))
+    if not text.startswith("{", start):
+        return False, {}
+    try:
+        pairs, end = walk_value(text, start)
+    except (StopIteration, json.JSONDecodeError):
+        return False, {}
+    if text[end:].strip(JSON_WHITESPACE):
+        return False, {}
+    data: Dict[str, Any] = {}
+    for suffix, value in pairs:
+        if suffix:          # only an empty top-level object has no path
+            data[suffix[1:]] = value
+    return True, data
+
+
+def flat_entries(members: Iterator[Tuple[str, List[Tuple[str, Any]]]]) -> Iterator[Tuple[str, Any]]:
+    for key, pairs in members:
+        for suffix, value in pairs:
+            yield key + suffix, value
+
+
+def knob_type(value: Any) -> str:
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if value is None:
+        return "null"
+    if isinstance(value, dict):
+        return "object"
+    if isinstance(value, list):
+        return "array"
+    return "string"
+
+
+_INDEX_RE = re.compile(r"(?<=\.)\d+(?=\.|$)")
+
+
+class KnobSchema:
+    """
+    Collects the type of every knob written to the card. Entries are
+    spooled like the card sections; only the per-pattern enum candidates
+    are kept in memory.
+    """
+
+    def __init__(self):
+        # Per zone, so knobs come out in card order however they were added
+        self.spools = {
+            zone: tempfile.SpooledTemporaryFile(SPOOL_SIZE, mode="w+", encoding="utf-8")
+            for zone in ("tuning", "public")
+        }
+        # "enemies.*.kind" -> distinct values seen, or None once it can't be an enum
+        self.patterns: Dict[str, Optional[Dict[str, None]]] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, path: str, value: Any, zone: str) -> None:
+        # Spooled pre-encoded as "pattern<TAB>type<TAB>path<TAB>value"; JSON
+        # text never holds a raw tab, and pattern is empty unless it can be an enum
+        pattern = _INDEX_RE.sub("*", path)
+        candidate = pattern != path and zone == "tuning"
+        self.spools[zone].write("\t".join((
+            json.dumps(pattern, ensure_ascii=False) if candidate else "",
+            knob_type(value),
+            json.dumps(path, ensure_ascii=False),
+            json.dumps(value, ensure_ascii=False),
+        )) + "\n")
+        if not candidate:
+            return
+        self.counts[pattern] = self.counts.get(pattern, 0) + 1
+        values = self.patterns.get(pattern, {})
+        if values is not None and isinstance(value, str):
+            values[value] = None
+            if len(values) > ENUM_MAX_VALUES:
+                values = None
+        else:
+            values = None
+        self.patterns[pattern] = values
+
+    def write(self, out: TextIO, source: str) -> None:
+        """The schema as JSON, one knob per line."""
+        enums = {
+            json.dumps(pattern, ensure_ascii=False):
+                ', "values": ' + json.dumps(list(values), ensure_ascii=False)
+            for pattern, values in self.patterns.items()
+            if values is not None and len(values) < self.counts[pattern]
+        }
+        out.write('{\n  "version": %d,\n  "source": %s,\n  "knobs": {'
+                  % (SCHEMA_VERSION, json.dumps(source, ensure_ascii=False)))
+        sep = "\n"
+        for zone, spool in self.spools.items():
+            spool.seek(0)
+            for line in spool:
+                pattern, kind, path, value = line[:-1].split("\t")
+                values = enums.get(pattern, "") if pattern else ""
+                if values:
+                    kind = "enum"
+                out.write(f'{sep}    {path}: {{"type": "{kind}", "zone": "{zone}", '
+                          f'"value": {value}{values}}}')
+                sep = ",\n"
+        out.write("\n  }\n}\n" if sep != "\n" else "}\n}\n")
+
+    def close(self) -> None:
+        for spool in self.spools.values():
+            spool.close()
+
+
+def write_schema(schema: KnobSchema, source: str, path: Path) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        schema.write(f, source)
+
+
+# ----------------------------------------------------------------------
+# Streaming path
+# ----------------------------------------------------------------------
+
+class NotStreamable(Exception):
+    """The input needs the whole-text conversion to come out the same."""
+
+
+class Source:
+    """
+    Reads the input in chunks. stdin is teed into a spool as it is read,
+    so the original can be replayed later (BLOCK 5, sidecar, fallback).
+    Call original() only once parsing is done: for stdin it first drains
+    whatever the parser has not read yet.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.stdin = path == Path("-")
+        if self.stdin:
+            self.stream: TextIO = sys.stdin
+            self.copy = tempfile.SpooledTemporaryFile(SPOOL_SIZE, mode="w+", encoding="utf-8")
+        else:
+            self.stream = open(path, encoding="utf-8")
+            self.copy = None
+
+    def read(self, size: int = CHUNK_SIZE) -> str:
+        chunk = self.stream.read(size)
+        if self.copy is not None and chunk:
+            self.copy.write(chunk)
+        return chunk
+
+    def original(self) -> Iterator[str]:
+        """The full input again, in chunks."""
+        if self.copy is not None:
+            while self.read():
+                pass
+            self.copy.seek(0)
+            stream = self.copy
+        else:
+            stream = open(self.path, encoding="utf-8")
+        try:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+        finally:
+            if stream is not self.copy:
+                stream.close()
+
+    def close(self) -> None:
+        if not self.stdin:
+            self.stream.close()
+        if self.copy is not None:
+            self.copy.close()
+
+
+class _NeedMore(Exception):
+    pass
+
+
+# After "{": the closing "}" of an empty object, or the first key
+FIRST_RE = re.compile(_WS + r"(?:(\})|" + _KEY + ")")
+# After a value: the closing "}", or "," and the next key
+NEXT_RE = re.compile(_WS + r"(?:(\})|," + _WS + _KEY + ")")
+
+
+class ObjectMembers:
+    """
+    Iterates (key, value) over the members of the JSON object whose "{"
+    is at buf[pos], decoding one member at a time (one regex match for
+    the punctuation and key, one C scanner call for the value). Stops
+    after the closing "}"; whatever was read past it is left in .rest.
+    Raises NotStreamable on anything json.loads would reject.
+
+    decode replaces the scanner for member values (walk_value for
+    --flatten, which yields the member's (suffix, scalar) pairs).
+    """
+
+    def __init__(self, source: Source, buf: str, pos: int, decode: Optional[Callable] = None):
+        self.source = source
+        self.buf = buf
+        self.pos = pos + 1
+        self.rest = ""
+        self.decode = decode
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        scan = self.decode or json.JSONDecoder().scan_once
+        buf, pos = self.buf, self.pos
+        key: Optional[str] = None      # set once pos points at that key's value
+        eof = False
+        want = CHUNK_SIZE
+        while True:
+            try:
+                if key is None:
+                    m = FIRST_RE.match(buf, pos)
+                    if m is None or m.end() == len(buf):
+                        raise _NeedMore
+                    if m.group(1):
+                        self.rest = buf[m.end():]
+                        return
+                    key = _key(m.group(2))
+                    pos = m.end()
+                value, p = scan(buf, pos)
+                # Also catches a number cut off at the end of the buffer
+                m = NEXT_RE.match(buf, p)
+                if m is None or (m.end() == len(buf) and not m.group(1)):
+                    raise _NeedMore
+            except RecursionError:
+                # Nested too deeply for json.loads as well
+                raise NotStreamable
+            except (_NeedMore, StopIteration, json.JSONDecodeError):
+                if eof:
+                    raise NotStreamable
+                # Drop what is done and read more; reads grow so retries stay linear
+                buf = buf[pos:]
+                pos = 0
+                chunk = self.source.read(max(want, len(buf)))
+                want *= 2
+                eof = not chunk
+                buf += chunk
+                continue
+            want = CHUNK_SIZE
+            yield key, value
+            if m.group(1):
+                self.rest = buf[m.end():]
+                return
+            key = _key(m.group(2))
+            pos = m.end()
+
+
+def iter_key_value_lines(source: Source, buf: str) -> Iterator[Tuple[str, Any]]:
+    """
+    KEY=value lines, for input whose head has no "{". A "{" further on
+    could still make it a JS wrapper, which only the whole-text path can
+    decide, so that raises NotStreamable.
+    """
+    pending = buf
+    while True:
+        chunk = source.read()
+        if not chunk:
             break
+        if "{" in chunk:
+            raise NotStreamable
+        pending += chunk
+        cut = pending.rfind("\n")
+        if cut == -1:
+            continue
+        complete, pending = pending[: cut + 1], pending[cut + 1 :]
+        for line in complete.splitlines():
+            item = parse_key_value_line(line)
+            if item is not None:
+                yield item
+    for line in pending.splitlines():
+        item = parse_key_value_line(line)
+        if item is not None:
+            yield item
+
+
+def check_after_object(source: Source, rest: str, js: bool) -> None:
+    """
+    JSON: only whitespace may follow the object. JS: no later "}" (the
+    whole-text path slices up to the last one).
+    """
+    while True:
+        if js:
+            if "}" in rest:
+                raise NotStreamable
+        elif rest.strip(JSON_WHITESPACE):
+            raise NotStreamable
+        rest = source.read()
+        if not rest:
+            return
+
+
+def has_duplicates(hashes: "array[int]") -> bool:
+    # Bucketed so the temporary sets stay small
+    buckets = [array("q") for _ in range(256)]
+    for h in hashes:
+        buckets[h & 0xFF].append(h)
+    return any(len(set(b)) != len(b) for b in buckets)
+
+
+def write_lines(out: TextIO, lines: List[str]) -> None:
+    out.write("".join(line + "\n" for line in lines))
+
+
+def copy_spool(spool, out: TextIO) -> None:
+    spool.seek(0)
+    while True:
+        chunk = spool.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        out.write(chunk)
+
+
+def copy_rstripped(chunks: Iterator[str], out: TextIO) -> None:
+    """Writes chunks with trailing whitespace of the whole text dropped."""
+    pending = ""
+    for chunk in chunks:
+        body = chunk.rstrip()
+        if body:
+            out.write(pending + body)
+            pending = chunk[len(body):]
+        else:
+            pending += chunk
+
+
+def stream_convert(
+    source: Source,
+    out: TextIO,
+    sidecar: Optional[str] = None,
+    flatten: bool = False,
+    schema: Optional[KnobSchema] = None,
+) -> None:
+    """
+    Converts source into a card on out without holding the whole input.
+    Raises NotStreamable before writing anything if the input needs the
+    whole-text path (schema is then half-filled; use a fresh one).
+    """
+    # Detect the format once: JSON object, JS wrapper around one, or KEY=value
+    head = source.read(HEAD_SIZE)
+    start = head.lstrip(JSON_WHITESPACE)
+    js = False
+    members: Optional[ObjectMembers] = None
+    decode = walk_value if flatten else None
+    if start.startswith("{"):
+        members = ObjectMembers(source, head, len(head) - len(start), decode)
+    elif "{" in head:
+        js = True
+        members = ObjectMembers(source, head, head.index("{"), decode)
+    if members is None:
+        entries = iter_key_value_lines(source, head)
+    elif flatten:
+        entries = flat_entries(iter(members))
+    else:
+        entries = iter(members)
+
+    knobs = tempfile.SpooledTemporaryFile(SPOOL_SIZE, mode="w+", encoding="utf-8")
+    public = tempfile.SpooledTemporaryFile(SPOOL_SIZE, mode="w+", encoding="utf-8")
+    try:
+        # 8 bytes per key instead of the keys themselves; checked at the end
+        key_hashes = array("q")
+        titles: Dict[str, str] = {}
+        has_knobs = has_public = False
+        knob_lines: List[str] = []
+        public_lines: List[str] = []
+        with trace.phase("extract"):
+            for key, value in entries:
+                key_hashes.append(hash(key))
+                if key in TITLE_KEYS and isinstance(value, str):
+                    titles[key] = value
+                if is_public_key(key):
+                    public_lines.append(entry_line(key, value) + "\n")
+                    if schema is not None:
+                        schema.add(key, value, "public")
+                    has_public = True
+                    if len(public_lines) >= SPOOL_BATCH:
+                        public.write("".join(public_lines))
+                        public_lines.clear()
+                else:
+                    knob_lines.append(entry_line(key, value) + "\n")
+                    if schema is not None:
+                        schema.add(key, value, "tuning")
+                    has_knobs = True
+                    if len(knob_lines) >= SPOOL_BATCH:
+                        knobs.write("".join(knob_lines))
+                        knob_lines.clear()
+        knobs.write("".join(knob_lines))
+        public.write("".join(public_lines))
+        if members is not None:
+            check_after_object(source, members.rest, js)
+        if has_duplicates(key_hashes):
+            # A repeated key (or flattened path) keeps its first position but its
+            # last value; leave that to the dict path (a hash collision just costs
+            # the slower path)
+            raise NotStreamable
+        trace.count("keys", len(key_hashes))
+
+        with trace.phase("write"):
+            title = next((titles[k] for k in TITLE_KEYS if k in titles), DEFAULT_TITLE)
+            write_lines(out, head_lines(title))
+            if has_knobs:
+                copy_spool(knobs, out)
+            else:
+                write_lines(out, [NO_KNOBS])
+            write_lines(out, PUBLIC_LINES)
+            if has_public:
+                copy_spool(public, out)
+            else:
+                write_lines(out, [NO_PUBLIC])
+    finally:
+        knobs.close()
+        public.close()
+
+    with trace.phase("write"):
+        if sidecar is not None:
+            # notes_lines ends with a blank line; "\n".join() leaves no newline after it
+            lines = notes_lines(sidecar)
+            write_lines(out, lines[:-1])
+            return
+        write_lines(out, notes_lines())
+        copy_rstripped(source.original(), out)
+        out.write("\n```\n")
+
 
-    cavecode = generate_cavecode(data, raw, title_guess=title_guess)
-    sys.stdout.write(cavecode)
+def write_sidecar(source: Source, path: Path) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk in source.original():
+            f.write(chunk)
+
+
+USAGE = ("Usage: cavecode_convert.py [--flatten] [--schema PATH] "
+         "[--original-sidecar PATH] <input-file | ->")
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv if argv is None else argv
+    trace.start("convert")
+    args = argv[1:]
+    sidecar: Optional[Path] = None
+    schema_path: Optional[Path] = None
+    flatten = False
+    target: Optional[str] = None
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == "--original-sidecar" and i + 1 < len(args):
+            sidecar = Path(args[i + 1])
+            i += 2
+        elif arg == "--schema" and i + 1 < len(args):
+            schema_path = Path(args[i + 1])
+            i += 2
+        elif arg == "--flatten":
+            flatten = True
+            i += 1
+        elif target is None:
+            target = arg
+            i += 1
+        else:
+            print(USAGE, file=sys.stderr)
+            sys.exit(1)
+    if target is None:
+        print(USAGE, file=sys.stderr)
+        sys.exit(1)
+
+    source = Source(Path(target))
+    note = sidecar.name if sidecar is not None else None
+    schema = KnobSchema() if schema_path is not None else None
+    try:
+        try:
+            stream_convert(source, sys.stdout, note, flatten, schema)
+        except NotStreamable:
+            trace.count("fallbacks")
+            raw = "".join(source.original())
+            if schema is not None:
+                schema.close()
+                schema = KnobSchema()
+            with trace.phase("convert_text"):
+                text = convert_text(raw, note, flatten, schema)
+            with trace.phase("write"):
+                sys.stdout.write(text)
+        if sidecar is not None:
+            with trace.phase("sidecar"):
+                write_sidecar(source, sidecar)
+        if schema is not None:
+            with trace.phase("schema"):
+                write_schema(schema, target, schema_path)
+    finally:
+        source.close()
+        if schema is not None:
+            schema.close()
 
 
 if __name__ == "__main__":
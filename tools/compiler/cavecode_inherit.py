@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+CaveCode Knob Inheritance v1.0
+
+A card can take its tuning knobs from other cards and only list what it
+changes:
+
+    🖍️ BLOCK 3 — TUNING KNOBS
+    EXTENDS: ../runner-config/runner-config.cavecode
+    SPEED_BASE: 7.5
+
+EXTENDS (or INCLUDE, same meaning) names a card relative to this one;
+several parents go on one line separated by commas or on several lines.
+The resolved knob map is each parent's resolved map in order (later
+parents win), then the card's own knobs on top. Only the tuning blocks
+take part, and the EXTENDS / INCLUDE lines are not knobs themselves.
+
+KnobResolver keeps the inheritance graph in memory: each card is read
+and parsed once, and each resolved map is memoized. Before a memoized
+map is reused, the card and its ancestors are checked with one stat()
+each; a card whose (mtime, size) changed is re-read, and the maps of
+every card below it are rebuilt on their next use. Compiling 1,000
+variants of one base therefore reads and resolves the base once.
+
+A cycle (a → b → a) or a parent that cannot be read is an
+InheritanceError naming the chain.
+
+Usage:
+    python cavecode_inherit.py show card.cavecode      # resolved knobs and where each comes from
+    python cavecode_inherit.py check <file | dir | glob> ...   # graph, cycles, missing parents
+"""
+
+import hashlib
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+import cavecode_trace as trace
+from cavecode_view import CardView
+
+# Knob keys that name parent cards
+INHERIT_KEYS = ("EXTENDS", "INCLUDE")
+# A line the parser would read as one of those knobs: the key is whatever
+# precedes the first ":", with surrounding whitespace stripped
+INHERIT_LINE_RE = re.compile(
+    rb"^[^\S\r\n]*(?:" + b"|".join(k.encode() for k in INHERIT_KEYS) + rb")[^\S\r\n]*:",
+    re.MULTILINE,
+)
+
+USAGE = __doc__.split("Usage:")[1].rstrip()
+
+# (mtime_ns, size)
+Stamp = Tuple[int, int]
+
+
+class InheritanceError(Exception):
+    pass
+
+
+class Resolved:
+    """A card's knobs after inheritance, with the card each value came from."""
+
+    __slots__ = ("knobs", "origins", "digest")
+
+    def __init__(self, knobs: Dict[str, str], origins: Dict[str, str], digest: str):
+        self.knobs = knobs
+        self.origins = origins
+        self.digest = digest          # hash of the card and all its ancestors
+
+
+class Node:
+    """One card in the inheritance graph."""
+
+    __slots__ = ("path", "stamp", "digest", "own", "parents", "memo")
+
+    def __init__(self, path: str, stamp: Optional[Stamp], data: bytes, blocks: Callable):
+        self.path = path
+        self.stamp = stamp
+        self.digest = hashlib.sha256(data).hexdigest()
+        self.own: Dict[str, str] = {}
+        self.parents: List[str] = []
+        base = os.path.dirname(path)
+        for block in blocks(CardView(data, Path(path))):
+            for knob in block.knobs:
+                if knob.key in INHERIT_KEYS:
+                    self.parents.extend(os.path.normpath(os.path.join(base, p.strip()))
+                                        for p in knob.value.split(",") if p.strip())
+                else:
+                    self.own[knob.key] = knob.value
+        # (parents' Resolved objects it was built from, result)
+        self.memo: Optional[Tuple[Tuple[Resolved, ...], Resolved]] = None
+
+
+def has_parents(data: bytes) -> bool:
+    """Cheap check before parsing: could this card extend another?"""
+    return INHERIT_LINE_RE.search(data) is not None
+
+
+def file_stamp(path: str) -> Optional[Stamp]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class KnobResolver:
+    """
+    Memoized inheritance resolution. blocks(card) picks the blocks whose
+    knobs count (the compiler passes its tuning_blocks).
+    """
+
+    def __init__(self, blocks: Callable):
+        self.blocks = blocks
+        self.nodes: Dict[str, Node] = {}
+
+    def node(self, path: str, data: Optional[bytes] = None) -> Node:
+        """The graph node for path, re-read if the file changed since last time."""
+        stamp = file_stamp(path)
+        node = self.nodes.get(path)
+        if node is not None and node.stamp == stamp and stamp is not None:
+            return node
+        if data is None:
+            if stamp is None:
+                raise InheritanceError(f"Cannot read card: {path}")
+            with trace.phase("read"):
+                try:
+                    data = Path(path).read_bytes()
+                except OSError as e:
+                    raise InheritanceError(f"Cannot read card: {e}")
+        with trace.phase("inherit-parse"):
+            try:
+                node = Node(path, stamp, data, self.blocks)
+            except UnicodeDecodeError as e:
+                raise InheritanceError(f"Cannot read card: {path}: {e}")
+        trace.count("inherit_parsed")
+        self.nodes[path] = node
+        return node
+
+    def resolve(self, path: str, data: Optional[bytes] = None) -> Resolved:
+        """Resolved knobs for the card at path (data: its bytes, if already read)."""
+        return self._resolve(os.path.normpath(path), data, [], {})
+
+    def _resolve(self, path: str, data: Optional[bytes], chain: List[str],
+                 done: Dict[str, Resolved]) -> Resolved:
+        # done: cards already checked in this pass, so a base shared by
+        # many paths through the graph is stat'ed and checked once
+        if path in done:
+            return done[path]
+        if path in chain:
+            cycle = chain[chain.index(path):] + [path]
+            raise InheritanceError("Inheritance cycle: " + " → ".join(cycle))
+        try:
+            node = self.node(path, data)
+        except InheritanceError as e:
+            if chain:
+                raise InheritanceError(f"{e} (extended by {chain[-1]})") from None
+            raise
+        chain.append(path)
+        try:
+            parents = tuple(self._resolve(p, None, chain, done) for p in node.parents)
+        finally:
+            chain.pop()
+
+        memo = node.memo
+        if memo is not None and len(memo[0]) == len(parents) and all(
+                a is b for a, b in zip(memo[0], parents)):
+            trace.count("inherit_hits")
+            done[path] = memo[1]
+            return memo[1]
+
+        with trace.phase("inherit"):
+            knobs: Dict[str, str] = {}
+            origins: Dict[str, str] = {}
+            digest = hashlib.sha256(node.digest.encode())
+            for parent in parents:
+                knobs.update(parent.knobs)
+                origins.update(parent.origins)
+                digest.update(parent.digest.encode())
+            knobs.update(node.own)
+            origins.update(dict.fromkeys(node.own, path))
+            resolved = Resolved(knobs, origins, digest.hexdigest())
+        node.memo = (parents, resolved)
+        done[path] = resolved
+        return resolved
+
+    def graph(self, paths: List[str]) -> Tuple[Dict[str, List[str]], List[str]]:
+        """({card: parents} for paths and their ancestors, errors), without resolving."""
+        edges: Dict[str, List[str]] = {}
+        errors: List[str] = []
+        todo = [os.path.normpath(p) for p in paths]
+        while todo:
+            path = todo.pop()
+            if path in edges:
+                continue
+            try:
+                node = self.node(path)
+            except InheritanceError as e:
+                errors.append(str(e))
+                edges[path] = []
+                continue
+            edges[path] = node.parents
+            todo.extend(node.parents)
+        return edges, errors
+
+
+def find_cycles(edges: Dict[str, List[str]]) -> List[List[str]]:
+    """Each cycle in the graph once, as a chain that ends where it starts."""
+    cycles: List[List[str]] = []
+    state: Dict[str, int] = {}        # 1: on the current path, 2: done
+    for start in edges:
+        if start in state:
+            continue
+        path: List[str] = []
+        stack = [(start, iter(edges.get(start, ())))]
+        state[start] = 1
+        path.append(start)
+        while stack:
+            node, parents = stack[-1]
+            parent = next(parents, None)
+            if parent is None:
+                stack.pop()
+                path.pop()
+                state[node] = 2
+            elif state.get(parent) == 1:
+                cycles.append(path[path.index(parent):] + [parent])
+            elif parent not in state:
+                state[parent] = 1
+                path.append(parent)
+                stack.append((parent, iter(edges.get(parent, ()))))
+    return cycles
+
+
+# ----------------------------------------------------------------------
+# Commands
+# ----------------------------------------------------------------------
+
+def cmd_show(resolver: KnobResolver, args: List[str]) -> int:
+    if len(args) != 1:
+        print("Usage:" + USAGE, file=sys.stderr)
+        return 2
+    try:
+        resolved = resolver.resolve(args[0])
+    except InheritanceError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 1
+    card = os.path.normpath(args[0])
+    width = max((len(k) for k in resolved.knobs), default=0)
+    for key, value in resolved.knobs.items():
+        origin = resolved.origins[key]
+        print(f"{key:<{width}}  {value}" + ("" if origin == card else f"    (from {origin})"))
+    return 0
+
+
+def cmd_check(resolver: KnobResolver, args: List[str]) -> int:
+    from cavecode_to_code import collect_cards
+
+    paths = [card for card, _ in collect_cards(args)]
+    if not paths:
+        print("Usage:" + USAGE, file=sys.stderr)
+        return 2
+    with trace.phase("graph"):
+        edges, errors = resolver.graph(paths)
+        cycles = find_cycles(edges)
+    children: Dict[str, int] = {}
+    for parents in edges.values():
+        for p in parents:
+            children[p] = children.get(p, 0) + 1
+    for base, n in sorted(children.items(), key=lambda item: (-item[1], item[0])):
+        print(f"{base}: extended by {n} card(s)")
+    for cycle in cycles:
+        print("ERROR: Inheritance cycle: " + " → ".join(cycle))
+    for error in errors:
+        print(f"ERROR: {error}")
+    extending = sum(1 for parents in edges.values() if parents)
+    print(f"\n{len(edges)} cards, {extending} extend others, {len(children)} bases, "
+          f"{len(cycles)} cycles, {len(errors)} unreadable")
+    return 1 if cycles or errors else 0
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv if argv is None else argv
+    trace.start("inherit")
+    commands = {"show": cmd_show, "check": cmd_check}
+    if len(argv) < 2 or argv[1] not in commands:
+        print("Usage:" + USAGE, file=sys.stderr)
+        sys.exit(2)
+    from cavecode_to_code import tuning_blocks
+    sys.exit(commands[argv[1]](KnobResolver(tuning_blocks), argv[2:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+CaveCode Code Templates v1.0
+
+Per-language program templates for cavecode_to_code.py.
+
+Each template is written with {{slot}} placeholders and compiled once
+per process into a str.format_map() pattern, so rendering a card is one
+C-level format call plus the constant lines for its knobs. Every value
+that lands in generated source goes through that language's escaper:
+
+    python   string literals and the module docstring
+    js       string literals (incl. U+2028/U+2029) and // comments
+    java     string literals (octal escapes, never \\u) and // comments
+
+Knobs from 🖍️ BLOCK 3 — TUNING KNOBS become typed constants (int, float,
+bool or string, following coerce_value), with keys turned into valid
+identifiers for the target language.
+
+Usage:
+    from cavecode_templates import render
+    code = render("java", title, message, class_name, knobs)
+"""
+
+import keyword
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+from cavecode_parser import coerce_value
+
+SLOT_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+CONSTANTS_COMMENT = "🖍️ BLOCK 3 — TUNING KNOBS"
+
+JS_SAFE_INT = 2 ** 53 - 1
+JAVA_INT_RANGE = (-(2 ** 31), 2 ** 31 - 1)
+JAVA_LONG_RANGE = (-(2 ** 63), 2 ** 63 - 1)
+
+TEMPLATES = {
+    "python": '''"""
+{{title}}
+Auto-generated from CaveCode by cavecode_to_code.py
+"""
+
+{{constants}}def main():
+    message = {{message}}
+    print(message)
+
+
+if __name__ == "__main__":
+    main()
+''',
+    "js": '''// {{title}}
+// Auto-generated from CaveCode by cavecode_to_code.js (python script output)
+
+{{constants}}function main() {
+    const message = {{message}};
+    console.log(message);
+}
+
+main();
+''',
+    "java": '''// {{title}}
+// Auto-generated from CaveCode by cavecode_to_code.py
+
+public class {{class_name}} {
+{{constants}}    public static void main(String[] args) {
+        String message = {{message}};
+        System.out.println(message);
+    }
+}
+''',
+}
+
+
+# ----------------------------------------------------------------------
+# Escaping
+# ----------------------------------------------------------------------
+
+def _control_table(fmt: str) -> Dict[int, str]:
+    """C0 controls and DEL mapped through fmt (e.g. '\\\\x{:02x}')."""
+    table = {c: fmt.format(c) for c in range(0x20)}
+    table[0x7F] = fmt.format(0x7F)
+    return table
+
+
+_COMMON = {ord("\\"): "\\\\", ord('"'): '\\"', ord("\n"): "\\n", ord("\r"): "\\r", ord("\t"): "\\t"}
+
+PYTHON_STRING = {**_control_table("\\x{:02x}"), **_COMMON}
+JS_STRING = {**_control_table("\\x{:02x}"), **_COMMON,
+             0x2028: "\\u2028", 0x2029: "\\u2029"}
+# Java turns \uXXXX into raw characters before parsing, so a \u000a
+# escape would end the literal; octal escapes are safe.
+JAVA_STRING = {**_control_table("\\{:03o}"), **_COMMON}
+
+# Title text inside comments / docstrings: keep it on one line
+_ONE_LINE = {ord("\n"): " ", ord("\r"): " ", 0x2028: " ", 0x2029: " "}
+
+
+def python_string(value: str) -> str:
+    return '"' + value.translate(PYTHON_STRING) + '"'
+
+
+def js_string(value: str) -> str:
+    return '"' + value.translate(JS_STRING) + '"'
+
+
+def java_string(value: str) -> str:
+    return '"' + value.translate(JAVA_STRING) + '"'
+
+
+def python_docstring_text(value: str) -> str:
+    return value.translate(_ONE_LINE).replace("\\", "\\\\").replace('"""', '\\"\\"\\"')
+
+
+def js_comment_text(value: str) -> str:
+    return value.translate(_ONE_LINE)
+
+
+def java_comment_text(value: str) -> str:
+    # Even inside comments, an odd run of backslashes before "u" is a unicode escape
+    return value.translate(_ONE_LINE).replace("\\", "\\\\")
+
+
+# ----------------------------------------------------------------------
+# Identifiers and typed constants
+# ----------------------------------------------------------------------
+
+JS_RESERVED = frozenset("""
+    break case catch class const continue debugger default delete do else enum export
+    extends false finally for function if import in instanceof let new null return
+    static super switch this throw true try typeof var void while with yield await
+    implements interface package private protected public arguments eval undefined
+    NaN Infinity
+""".split())
+
+JAVA_RESERVED = frozenset("""
+    abstract assert boolean break byte case catch char class const continue default do
+    double else enum extends final finally float for goto if implements import
+    instanceof int interface long native new package private protected public return
+    short static strictfp super switch synchronized this throw throws transient try
+    void volatile while true false null var yield record sealed permits _
+""".split())
+
+RESERVED = {
+    "python": frozenset(keyword.kwlist),
+    "js": JS_RESERVED,
+    "java": JAVA_RESERVED,
+}
+
+# Names each template itself declares or calls at the level of the
+# constants; a knob by one of these names would shadow it
+TEMPLATE_NAMES = {
+    "python": frozenset(("main", "print", "__name__")),
+    "js": frozenset(("main", "console")),
+    "java": frozenset(("main", "System")),
+}
+
+_NON_IDENT_RE = re.compile(r"[^A-Za-z0-9_]")
+
+
+def identifier(name: str, lang: str) -> str:
+    """An ASCII identifier for name that is not a keyword in lang."""
+    ident = _NON_IDENT_RE.sub("_", name) or "_"
+    if ident[0].isdigit():
+        ident = "_" + ident
+    if ident in RESERVED[lang]:
+        ident += "_"
+    return ident
+
+
+def python_constant(name: str, value: Any) -> str:
+    if isinstance(value, str):
+        return f"{name} = {python_string(value)}"
+    return f"{name} = {value!r}"
+
+
+def js_constant(name: str, value: Any) -> str:
+    if isinstance(value, bool):
+        literal = "true" if value else "false"
+    elif isinstance(value, str):
+        literal = js_string(value)
+    elif isinstance(value, int) and abs(value) > JS_SAFE_INT:
+        literal = f"{value}n"      # BigInt keeps the exact value
+    else:
+        literal = repr(value)
+    return f"const {name} = {literal};"
+
+
+def java_constant(name: str, value: Any) -> str:
+    if isinstance(value, bool):
+        kind, literal = "boolean", "true" if value else "false"
+    elif isinstance(value, int) and JAVA_INT_RANGE[0] <= value <= JAVA_INT_RANGE[1]:
+        kind, literal = "int", str(value)
+    elif isinstance(value, int) and JAVA_LONG_RANGE[0] <= value <= JAVA_LONG_RANGE[1]:
+        kind, literal = "long", f"{value}L"
+    elif isinstance(value, float):
+        kind, literal = "double", repr(value)
+    else:
+        kind, literal = "String", java_string(str(value))
+    return f"    public static final {kind} {name} = {literal};"
+
+
+# ----------------------------------------------------------------------
+# Languages
+# ----------------------------------------------------------------------
+
+class Language:
+    """How one target language quotes, comments and declares constants."""
+
+    __slots__ = ("name", "string", "comment_text", "constant", "comment_prefix", "trailer")
+
+    def __init__(
+        self,
+        name: str,
+        string: Callable[[str], str],
+        comment_text: Callable[[str], str],
+        constant: Callable[[str, Any], str],
+        comment_prefix: str,
+        trailer: str,
+    ):
+        self.name = name
+        self.string = string
+        self.comment_text = comment_text
+        self.constant = constant
+        self.comment_prefix = comment_prefix    # comment line in front of the constants
+        self.trailer = trailer                  # blank lines after the constants
+
+
+LANGUAGES: Dict[str, Language] = {
+    "python": Language("python", python_string, python_docstring_text, python_constant,
+                       "# ", "\n\n"),
+    "js": Language("js", js_string, js_comment_text, js_constant, "// ", "\n"),
+    "java": Language("java", java_string, java_comment_text, java_constant, "    // ", "\n"),
+}
+
+
+class Template:
+    """A template compiled once into a format_map() pattern."""
+
+    __slots__ = ("name", "pattern", "slots")
+
+    def __init__(self, name: str, source: str):
+        self.name = name
+        parts: List[str] = []
+        slots: List[str] = []
+        last = 0
+        for m in SLOT_RE.finditer(source):
+            # Literal braces (JS/Java bodies) are doubled so format_map leaves them alone
+            parts.append(source[last:m.start()].replace("{", "{{").replace("}", "}}"))
+            parts.append("{" + m.group(1) + "}")
+            slots.append(m.group(1))
+            last = m.end()
+        parts.append(source[last:].replace("{", "{{").replace("}", "}}"))
+        self.pattern = "".join(parts)
+        self.slots = tuple(slots)
+
+    def render(self, values: Dict[str, str]) -> str:
+        return self.pattern.format_map(values)
+
+
+@lru_cache(maxsize=None)
+def get_template(lang: str) -> Template:
+    """Compiled template for lang, built on first use and reused for the whole run."""
+    return Template(lang, TEMPLATES[lang])
+
+
+def constants_section(lang: Language, knobs: Dict[str, str], class_name: str = "") -> str:
+    if not knobs:
+        return ""
+    lines = [lang.comment_prefix + CONSTANTS_COMMENT]
+    # A knob never takes a name the template uses (or the Java class name)
+    seen = set(TEMPLATE_NAMES[lang.name])
+    if class_name:
+        seen.add(class_name)
+    for key, value in knobs.items():
+        name = identifier(key, lang.name)
+        while name in seen:
+            name += "_"
+        seen.add(name)
+        lines.append(lang.constant(name, coerce_value(value)))
+    return "\n".join(lines) + "\n" + lang.trailer
+
+
+def render(lang: str, title: str, message: str, class_name: str, knobs: Dict[str, str]) -> str:
+    language = LANGUAGES[lang]
+    class_name = java_class_name(class_name)
+    return get_template(lang).render({
+        "title": language.comment_text(title),
+        "message": language.string(message),
+        "class_name": class_name,
+        "constants": constants_section(language, knobs, class_name if lang == "java" else ""),
+    })
+
+
+def java_class_name(class_name: str) -> str:
+    return identifier(class_name, "java")
@@ -4,147 +4,431 @@ CaveCode → Code Compiler Pass v1.0
 
 Takes a CaveCode spec that includes an OUTPUT_MESSAGE knob (and optional
 CLASS_NAME) and emits a simple "Hello, World"-style program in the
-requested language.
+requested language. Every knob in 🖍️ BLOCK 3 — TUNING KNOBS is carried
+over as a typed constant; see cavecode_templates.py.
 
 Usage:
     python cavecode_to_code.py --lang python  path/to/card.cavecode
     python cavecode_to_code.py --lang js      path/to/card.cavecode
     python cavecode_to_code.py --lang java    path/to/card.cavecode
+
+    # Batch: every card, every language, one parse per card
+    python cavecode_to_code.py --lang python,js,java --out build/ cards/
+    python cavecode_to_code.py --lang all --out build/ --jobs 8 "cards/**/*.cavecode"
+
+Batch output tree:
+    OUT/python/<card>.py
+    OUT/js/<card>.js
+    OUT/java/<card>/<CLASS_NAME>.java
+    OUT/.cavecode-build.json     build manifest
+
+The manifest records a hash of each card (plus the compiler itself) per
+target, so a rebuild only regenerates targets whose inputs changed.
+--force rebuilds everything.
+
+Cards are read through the lazy CardView (tools/common/cavecode_view.py):
+only the header lines, the Title: line and the TUNING KNOBS block are
+ever decoded, however large the rest of the card is.
+
+A card whose TUNING KNOBS say "EXTENDS: base.cavecode" gets the base's
+knobs under its own (see cavecode_inherit.py). Bases are read and
+resolved once per process and shared by every card that extends them.
 """
 
+import glob
+import hashlib
+import json
+import os
 import sys
-import re
+import tempfile
+import time
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple, Union
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+import cavecode_trace as trace
+from cavecode_parser import Block, Document, parse_file
+from cavecode_view import CardView, open_view
+from cavecode_inherit import INHERIT_KEYS, InheritanceError, KnobResolver, has_parents
+from cavecode_templates import java_class_name, render
+
+# A fully parsed card or a lazy view of one; both have .blocks and .title
+Card = Union[Document, CardView]
+
+LANGUAGES = ("python", "js", "java")
+LANG_ALIASES = {"javascript": "js", "py": "python"}
+
+MANIFEST_NAME = ".cavecode-build.json"
+MANIFEST_VERSION = 1
 
+USAGE = (
+    "Usage: cavecode_to_code.py --lang [python|js|java] path/to/file.cavecode\n"
+    "       cavecode_to_code.py --lang python,js,java|all --out DIR [--jobs N] [--force] "
+    "<file | dir | glob> ..."
+)
 
-def parse_args(argv):
-    lang = None
-    path = None
+
+class Options:
+    __slots__ = ("langs", "targets", "out", "jobs", "force")
+
+    def __init__(self):
+        self.langs: List[str] = []
+        self.targets: List[str] = []
+        self.out: Optional[Path] = None
+        self.jobs = os.cpu_count() or 1
+        self.force = False
+
+
+def parse_args(argv) -> Options:
+    opts = Options()
     i = 1
     while i < len(argv):
         if argv[i] == "--lang" and i + 1 < len(argv):
-            lang = argv[i + 1].lower()
+            for lang in argv[i + 1].lower().split(","):
+                if lang == "all":
+                    opts.langs.extend(LANGUAGES)
+                elif lang:
+                    opts.langs.append(LANG_ALIASES.get(lang, lang))
+            i += 2
+        elif argv[i] == "--out" and i + 1 < len(argv):
+            opts.out = Path(argv[i + 1])
             i += 2
+        elif argv[i] in ("-j", "--jobs") and i + 1 < len(argv):
+            try:
+                opts.jobs = max(1, int(argv[i + 1]))
+            except ValueError:
+                print(USAGE, file=sys.stderr)
+                sys.exit(1)
+            i += 2
+        elif argv[i] == "--force":
+            opts.force = True
+            i += 1
         else:
-            path = argv[i]
+            opts.targets.append(argv[i])
             i += 1
-    if not lang or not path:
-        print("Usage: cavecode_to_code.py --lang [python|js|java] path/to/file.cavecode",
-              file=sys.stderr)
+    if not opts.langs or not opts.targets:
+        print(USAGE, file=sys.stderr)
         sys.exit(1)
-    if lang not in ("python", "js", "javascript", "java"):
-        print(f"Unsupported language: {lang}", file=sys.stderr)
+    for lang in opts.langs:
+        if lang not in LANGUAGES:
+            print(f"Unsupported language: {lang}", file=sys.stderr)
+            sys.exit(1)
+    opts.langs = list(dict.fromkeys(opts.langs))
+    if opts.out is None and (len(opts.langs) > 1 or len(opts.targets) > 1):
+        print("Multiple languages or inputs need --out DIR", file=sys.stderr)
         sys.exit(1)
-    if lang == "javascript":
-        lang = "js"
-    return lang, Path(path)
+    return opts
+
+
+def tuning_blocks(doc: Card) -> List[Block]:
+    return [
+        b for b in doc.blocks
+        if b.header.text.startswith("🖍️ BLOCK 3") or "TUNING KNOBS" in b.header.text
+    ]
 
 
-def read_file(path: Path) -> str:
-    return path.read_text(encoding="utf-8")
+def public_text_blocks(doc: Card) -> List[Block]:
+    return [
+        b for b in doc.blocks
+        if b.header.text.startswith("🌐 BLOCK 4") or "PUBLIC TEXT" in b.header.text
+    ]
 
 
-def extract_knobs(text: str) -> Dict[str, str]:
+def extract_knobs(doc: Card, data: Optional[bytes] = None) -> Dict[str, str]:
     """
-    Very simple parser: within the 🖍️ BLOCK 3 — TUNING KNOBS section,
-    look for lines like KEY: value and capture them.
+    Within the 🖍️ BLOCK 3 — TUNING KNOBS section, collect the
+    KEY: value lines the parser already split out. A card that EXTENDS
+    others gets its inherited knobs too (data: the card's bytes, if read).
     """
-    knobs: Dict[str, str] = {}
-    inside_knobs = False
-    for line in text.splitlines():
-        stripped = line.strip()
-        if stripped.startswith("🖍️ BLOCK 3") or "TUNING KNOBS" in stripped:
-            inside_knobs = True
-            continue
-        if stripped.startswith("🌐 BLOCK 4") or stripped.startswith("📝 BLOCK 5"):
-            inside_knobs = False
-        if not inside_knobs:
-            continue
-        if not stripped or stripped.startswith("#"):
-            continue
-        if ":" not in stripped:
-            continue
-        key, value = stripped.split(":", 1)
-        key = key.strip()
-        value = value.strip()
-        # Remove trailing inline comments like "# something"
-        if "#" in value:
-            value = value.split("#", 1)[0].strip()
-        # Strip surrounding quotes
-        value = value.strip('"').strip("'")
-        knobs[key] = value
-    return knobs
-
-
-def extract_title(text: str) -> Optional[str]:
-    for line in text.splitlines():
-        if line.strip().startswith("Title:"):
-            return line.split(":", 1)[1].strip()
-    return None
-
-
-def generate_python(title: str, output_message: str) -> str:
-    return f'''"""
-{title}
-Auto-generated from CaveCode by cavecode_to_code.py
-"""
+    knobs = doc.knobs_in(tuning_blocks(doc))
+    if not any(k in knobs for k in INHERIT_KEYS):
+        return knobs
+    return RESOLVER.resolve(str(doc.path or "-"), data).knobs
 
-def main():
-    message = "{output_message}"
-    print(message)
 
+# Parents are read and resolved once per process, however many cards extend them
+RESOLVER = KnobResolver(tuning_blocks)
+
+
+def extract_public_text(doc: Card) -> Dict[str, str]:
+    """Same as extract_knobs, for the 🌐 BLOCK 4 — PUBLIC TEXT section."""
+    return doc.knobs_in(public_text_blocks(doc))
 
-if __name__ == "__main__":
-    main()
-'''
 
+def extract_title(doc: Card) -> Optional[str]:
+    return doc.title
 
-def generate_js(title: str, output_message: str) -> str:
-    return f'''// {title}
-// Auto-generated from CaveCode by cavecode_to_code.js (python script output)
 
-function main() {{
-    const message = "{output_message}";
-    console.log(message);
-}}
+def generate_python(title: str, output_message: str, knobs: Optional[Dict[str, str]] = None) -> str:
+    return render("python", title, output_message, "", knobs or {})
 
-main();
-'''
 
+def generate_js(title: str, output_message: str, knobs: Optional[Dict[str, str]] = None) -> str:
+    return render("js", title, output_message, "", knobs or {})
 
-def generate_java(title: str, output_message: str, class_name: str) -> str:
-    return f'''// {title}
-// Auto-generated from CaveCode by cavecode_to_code.py
 
-public class {class_name} {{
-    public static void main(String[] args) {{
-        String message = "{output_message}";
-        System.out.println(message);
-    }}
-}}
-'''
+def generate_java(title: str, output_message: str, class_name: str,
+                  knobs: Optional[Dict[str, str]] = None) -> str:
+    return render("java", title, output_message, class_name, knobs or {})
 
 
-def main():
-    lang, path = parse_args(sys.argv)
-    text = read_file(path)
-    knobs = extract_knobs(text)
-    title = extract_title(text) or "CaveCode Program"
+def generate(lang: str, doc: Card, data: Optional[bytes] = None) -> Tuple[str, str]:
+    """Returns (code, class name) for one language from a parsed card or a view."""
+    knobs = extract_knobs(doc, data)
+    title = extract_title(doc) or "CaveCode Program"
 
     output_message = knobs.get("OUTPUT_MESSAGE", "Hello from CaveCode!")
     class_name = knobs.get("CLASS_NAME", "CaveCodeProgram")
 
+    if lang not in LANGUAGES:
+        raise SystemExit(f"Unexpected lang: {lang}")
+    # Templates are compiled on first use and reused for every card after that
+    code = render(lang, title, output_message, class_name, knobs)
+    return code, java_class_name(class_name)
+
+
+# ----------------------------------------------------------------------
+# Batch builds
+# ----------------------------------------------------------------------
+
+def compiler_fingerprint() -> str:
+    # Editing the generators or templates invalidates every target they produced
+    h = hashlib.sha256(Path(__file__).read_bytes())
+    h.update((Path(__file__).parent / "cavecode_templates.py").read_bytes())
+    h.update((Path(__file__).parent / "cavecode_inherit.py").read_bytes())
+    return h.hexdigest()[:16]
+
+
+def collect_cards(targets: List[str]) -> List[Tuple[str, str]]:
+    """(card path, output stem relative to the out dir) for each input, each card once."""
+    cards: List[Tuple[str, str]] = []
+    seen = set()
+
+    def add(card: str, stem: str) -> None:
+        key = os.path.normpath(os.path.abspath(card))
+        if key not in seen:
+            seen.add(key)
+            cards.append((card, stem))
+
+    for target in targets:
+        if os.path.isdir(target):
+            root = Path(target)
+            for p in sorted(root.rglob("*.cavecode")):
+                add(str(p), str(p.relative_to(root).with_suffix("")))
+        elif glob.has_magic(target):
+            for p in sorted(glob.glob(target, recursive=True)):
+                add(p, Path(p).stem)
+        else:
+            add(target, Path(target).stem)
+    return cards
+
+
+def stem_clashes(cards: List[Tuple[str, str]]) -> List[str]:
+    """One message per output stem that more than one card would write."""
+    by_stem: Dict[str, List[str]] = {}
+    for card, stem in cards:
+        by_stem.setdefault(stem, []).append(card)
+    return [
+        f"{', '.join(paths)} would all compile to the output name '{stem}'"
+        for stem, paths in by_stem.items() if len(paths) > 1
+    ]
+
+
+def output_path(out: Path, lang: str, stem: str, class_name: str) -> Path:
     if lang == "python":
-        code = generate_python(title, output_message)
-    elif lang == "js":
-        code = generate_js(title, output_message)
-    elif lang == "java":
-        code = generate_java(title, output_message, class_name)
+        return out / "python" / f"{stem}.py"
+    if lang == "js":
+        return out / "js" / f"{stem}.js"
+    return out / "java" / stem / f"{class_name}.java"
+
+
+def write_atomic(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with open(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+# One card's work: (card, stem, langs, {lang: previous manifest entry})
+Job = Tuple[str, str, List[str], Dict[str, Dict[str, str]]]
+# (card, {lang: new manifest entry}, built langs, error)
+JobResult = Tuple[str, Dict[str, Dict[str, str]], List[str], Optional[str]]
+
+
+def build_card(
+    card: str, stem: str, langs: List[str], previous: Dict[str, Dict[str, str]],
+    data: bytes, out: str, fingerprint: str, force: bool,
+) -> JobResult:
+    """
+    Builds one card from its raw bytes. The card is hashed first; if all
+    its targets are up to date it is never decoded or parsed. Otherwise
+    it is parsed once and every stale language is generated from that one
+    parse. A card that extends others is hashed together with its
+    ancestors, so editing a base rebuilds every card below it.
+    """
+    with trace.phase("hash"):
+        digest = hashlib.sha256(data).hexdigest()
+    if has_parents(data):
+        try:
+            digest = RESOLVER.resolve(card, data).digest
+        except InheritanceError as e:
+            return card, previous, [], str(e)
+
+    entries = dict(previous)    # keep other languages' entries
+    stale = []
+    for lang in langs:
+        prev = previous.get(lang)
+        key = f"{fingerprint}:{lang}:{digest}"
+        if force or not prev or prev.get("input") != key or not (Path(out) / prev["output"]).exists():
+            stale.append(lang)
+    if not stale:
+        return card, entries, [], None
+
+    doc = CardView(data, Path(card))
+    try:
+        with trace.phase("generate"):
+            generated = [(lang,) + generate(lang, doc, data) for lang in stale]
+    except UnicodeDecodeError as e:
+        return card, previous, [], f"Cannot read file: {e}"
+    except InheritanceError as e:
+        return card, previous, [], str(e)
+    trace.count("targets", len(generated))
+    for lang, code, class_name in generated:
+        target = output_path(Path(out), lang, stem, class_name)
+        with trace.phase("write"):
+            write_atomic(target, code)
+        rel = str(target.relative_to(out))
+        old = previous.get(lang, {}).get("output")
+        if old and old != rel:
+            # e.g. CLASS_NAME changed: drop the old .java
+            try:
+                os.unlink(Path(out) / old)
+            except OSError:
+                pass
+        entries[lang] = {"input": f"{fingerprint}:{lang}:{digest}", "output": rel}
+    return card, entries, stale, None
+
+
+def build_chunk(jobs: List[Job], out: str, fingerprint: str, force: bool) -> List[JobResult]:
+    """Worker entry point: build_card() for each card of one chunk."""
+    results: List[JobResult] = []
+    for card, stem, langs, previous in jobs:
+        trace.count("files")
+        try:
+            with trace.phase("read"):
+                data = Path(card).read_bytes()
+        except OSError as e:
+            results.append((card, previous, [], f"Cannot read file: {e}"))
+            continue
+        results.append(build_card(card, stem, langs, previous, data, out, fingerprint, force))
+    trace.flush_worker()
+    return results
+
+
+def load_manifest(out: Path) -> Dict[str, Dict[str, Dict[str, str]]]:
+    try:
+        data = json.loads((out / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get("cards", {})
+
+
+def save_manifest(out: Path, cards: Dict[str, Dict[str, Dict[str, str]]]) -> None:
+    text = json.dumps({"version": MANIFEST_VERSION, "cards": cards}, indent=1, sort_keys=True)
+    write_atomic(out / MANIFEST_NAME, text + "\n")
+
+
+def run_batch(opts: Options) -> int:
+    cards = collect_cards(opts.targets)
+    if not cards:
+        print("ERROR: No cards to compile.", file=sys.stderr)
+        return 1
+    clashes = stem_clashes(cards)
+    if clashes:
+        for clash in clashes:
+            print(f"ERROR: {clash}; compile them into separate --out folders "
+                  f"or pass their common parent folder", file=sys.stderr)
+        return 1
+    out = opts.out
+    out.mkdir(parents=True, exist_ok=True)
+    with trace.phase("manifest"):
+        manifest = load_manifest(out)
+    fingerprint = compiler_fingerprint()
+
+    jobs: List[Job] = [
+        (card, stem, opts.langs, manifest.get(card, {})) for card, stem in cards
+    ]
+    # A few chunks per worker so one slow card doesn't stall the pool
+    chunk_size = max(1, min(256, len(jobs) // (opts.jobs * 4) or 1))
+    chunks = [jobs[i : i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+
+    started = time.perf_counter()
+    built = skipped = failed = 0
+
+    def collect(results: List[JobResult]) -> None:
+        nonlocal built, skipped, failed
+        for card, entries, langs, error in results:
+            if error:
+                failed += 1
+                print(f"ERROR: {card}: {error}", file=sys.stderr)
+                continue
+            manifest[card] = entries
+            built += len(langs)
+            skipped += len(opts.langs) - len(langs)
+            for lang in langs:
+                print(f"{card} → {entries[lang]['output']}")
+
+    if opts.jobs <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            collect(build_chunk(chunk, str(out), fingerprint, opts.force))
     else:
-        raise SystemExit(f"Unexpected lang: {lang}")
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        with ProcessPoolExecutor(max_workers=opts.jobs) as pool:
+            futures = [
+                pool.submit(build_chunk, chunk, str(out), fingerprint, opts.force)
+                for chunk in chunks
+            ]
+            for future in as_completed(futures):
+                collect(future.result())
+
+    with trace.phase("manifest"):
+        save_manifest(out, manifest)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(
+        f"\nBuilt {built} targets, {skipped} up to date, {failed} cards failed "
+        f"({len(cards)} cards × {len(opts.langs)} languages, {elapsed:.0f} ms)"
+    )
+    return 1 if failed else 0
 
-    sys.stdout.write(code)
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv if argv is None else argv
+    trace.start("compile")
+    opts = parse_args(argv)
+    if opts.out is not None:
+        sys.exit(run_batch(opts))
+
+    target = Path(opts.targets[0])
+    try:
+        if str(target) == "-":
+            doc = parse_file(target)
+            with trace.phase("generate"):
+                code, _ = generate(opts.langs[0], doc, doc.text.encode("utf-8"))
+        else:
+            with open_view(target) as doc, trace.phase("generate"):
+                code, _ = generate(opts.langs[0], doc)
+    except InheritanceError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    with trace.phase("write"):
+        sys.stdout.write(code)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+CaveCode Dialect Classifier / Upgrader v1.0
+
+Usage:
+    python cavecode_upgrade.py classify [--json] [--jobs N] <file | dir | glob> ...
+    python cavecode_upgrade.py upgrade card.cavecode > upgraded.cavecode
+    python cavecode_upgrade.py upgrade --in-place|--diff [--jobs N] <file | dir | glob> ...
+
+classify reads each card once, matches every header of either dialect
+with one regex (common/cavecode_dialect.py) and prints the card's
+dialect with its block model:
+
+    v1.0   cards/old.cavecode   1:SHELL 2:TUNING 2A:? 3:PUBLIC 4:BEHAVIOR
+    v1.1   cards/new.cavecode   1:SHELL 2:BEHAVIOR 3:TUNING 4:PUBLIC 5:NOTES
+
+so v1.0 cards go to validate_cavecode.py and v1.1 cards to
+validate_cavecode_v1_1.py without guessing. "mixed" cards use both
+header styles; "none" have no block headers.
+
+upgrade rewrites v1.0 cards as v1.1 cards:
+
+    ==== BLOCK 1 — IDENTITY       →  🧱 BLOCK 1 — SHELL [LOCKED]
+    ==== BLOCK 2 — TUNING KNOBS   →  🖍️ BLOCK 3 — TUNING KNOBS
+    ==== BLOCK 3 — PUBLIC TEXT    →  🌐 BLOCK 4 — PUBLIC TEXT
+    ==== BLOCK 4 — LOCKED LOGIC   →  🎮 BLOCK 2 — GAME LOOP / BEHAVIOR [LOCKED]
+
+Blocks move into v1.1 order with their sub-blocks (2A → 3A) and their
+content untouched; a header inside a comment ("// ==== BLOCK 1 — ...")
+keeps its comment markers. Blocks locked by their old title keep a lock
+marker ("[LOCKED]", or the title's own "(Locked)"), so the --locks check
+of validate_cavecode_v1_1.py still covers them. Required v1.1 blocks the
+card lacks (usually HUMAN NOTES) are added with a one-line placeholder,
+and any other blocks follow as BLOCK 6, 7, ... v1.1 and "none" cards are
+left alone; mixed cards are reported and skipped.
+
+--in-place replaces each upgraded card atomically; --diff prints a
+unified diff per card and touches nothing (exit 1 if any card would
+change, like the fixer).
+"""
+
+import difflib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fixer"))
+import cavecode_trace as trace
+from cavecode_dialect import (CANON_BLOCKS, CANON_HEADERS, DIALECTS, LOCK_MARKER_RE, LOCKED_RE,
+                              MIXED, V10, HeaderMatch, classify, scan)
+from cavecode_fix_v1 import collect_paths, replace_atomic
+
+USAGE = __doc__.split("classify reads")[0].split("Usage:")[1].rstrip()
+
+# Body of a required block the v1.0 card did not have
+PLACEHOLDER = "(Added when this card was upgraded from CaveCode v1.0.)"
+
+# Numbers for v1.0 blocks outside the v1.1 model start after it
+FIRST_EXTRA = len(CANON_BLOCKS) + 1
+
+# (path, dialect, blocks, error)
+Classified = Tuple[str, Optional[str], List[Dict[str, Any]], Optional[str]]
+# (path, status, diff, error); status is "upgraded", "current", "mixed" or "error"
+Upgraded = Tuple[str, str, Optional[str], Optional[str]]
+
+
+def read_card(path: str) -> str:
+    with trace.phase("read"):
+        data = Path(path).read_bytes()
+    trace.count("files")
+    trace.count("bytes", len(data))
+    return data.decode("utf-8")
+
+
+def block_model(headers: List[HeaderMatch]) -> List[Dict[str, Any]]:
+    return [{"line": h.lineno + 1, "block": h.number + h.sub, "role": h.role,
+             "dialect": h.dialect, "title": h.title} for h in headers]
+
+
+# ----------------------------------------------------------------------
+# Upgrade
+# ----------------------------------------------------------------------
+
+class Group:
+    """A major block and the sub-blocks that follow it, as line lists."""
+
+    __slots__ = ("role", "parts")
+
+    def __init__(self, role: Optional[str]):
+        self.role = role
+        self.parts: List[Tuple[HeaderMatch, List[str]]] = []
+
+
+def lock_marker(title: str) -> str:
+    """
+    What keeps a locked block locked once its title is replaced: the
+    title's own marker ("[LOCKED]", "(Locked)"), or " [LOCKED]" for a
+    title that was locked by name (IDENTITY, LOCKED LOGIC).
+    """
+    m = LOCK_MARKER_RE.search(title)
+    if m:
+        return " " + m.group()
+    return " [LOCKED]" if LOCKED_RE.search(title) else ""
+
+
+def upgrade_text(text: str, headers: List[HeaderMatch]) -> str:
+    """The v1.1 version of a v1.0 card (headers from scan(text))."""
+    cr = "\r" if "\r\n" in text else ""
+    lines = text.split("\n")
+    final_newline = text.endswith("\n")
+    if final_newline:
+        lines.pop()
+
+    groups: List[Group] = []
+    for i, h in enumerate(headers):
+        end = headers[i + 1].lineno if i + 1 < len(headers) else len(lines)
+        if not h.sub or not groups:
+            groups.append(Group(h.role if not h.sub else None))
+        groups[-1].parts.append((h, lines[h.lineno + 1 : end]))
+
+    by_role: Dict[str, Group] = {}
+    extras: List[Group] = []
+    for group in groups:
+        if group.role and group.role not in by_role:
+            by_role[group.role] = group
+        else:
+            extras.append(group)
+
+    def line(h: HeaderMatch, text: str) -> str:
+        # Headers inside comments stay inside the same comment markers
+        return h.lead + text + (" " + h.tail if h.tail else "") + cr
+
+    out: List[List[str]] = []       # one line list per block
+    for role, number, glyph, _ in CANON_BLOCKS:
+        group = by_role.get(role)
+        if group is None:
+            out.append([line(headers[0], CANON_HEADERS[number]), line(headers[0], PLACEHOLDER)])
+            continue
+        for h, body in group.parts:
+            if h.sub:
+                header = f"{glyph} BLOCK {number}{h.sub} — {h.title}"
+            else:
+                header = CANON_HEADERS[number] + lock_marker(h.title)
+            out.append([line(h, header)] + body)
+    for n, group in enumerate(extras, FIRST_EXTRA):
+        glyph = "🪨" if "LOCKED" in group.parts[0][0].title.upper() else "🎮"
+        for h, body in group.parts:
+            out.append([line(h, f"{glyph} BLOCK {n}{h.sub} — {h.title}")] + body)
+
+    result = lines[: headers[0].lineno]
+    for i, block in enumerate(out):
+        result.extend(block)
+        # Blocks that moved still get a blank line before the next header
+        if i + 1 < len(out) and block[-1].strip():
+            result.append(cr)
+    return "\n".join(result) + ("\n" if final_newline else "")
+
+
+# ----------------------------------------------------------------------
+# Batch workers
+# ----------------------------------------------------------------------
+
+def classify_chunk(paths: List[str]) -> List[Classified]:
+    results: List[Classified] = []
+    for p in paths:
+        try:
+            text = read_card(p)
+        except (OSError, UnicodeDecodeError) as e:
+            results.append((p, None, [], str(e)))
+            continue
+        with trace.phase("scan"):
+            headers = scan(text)
+        trace.count("headers", len(headers))
+        results.append((p, classify(headers), block_model(headers), None))
+    trace.flush_worker()
+    return results
+
+
+def upgrade_chunk(paths: List[str], in_place: bool) -> List[Upgraded]:
+    results: List[Upgraded] = []
+    for p in paths:
+        try:
+            text = read_card(p)
+        except (OSError, UnicodeDecodeError) as e:
+            results.append((p, "error", None, str(e)))
+            continue
+        with trace.phase("scan"):
+            headers = scan(text)
+        dialect = classify(headers)
+        if dialect != V10:
+            results.append((p, "mixed" if dialect == MIXED else "current", None, None))
+            continue
+        with trace.phase("upgrade"):
+            upgraded = upgrade_text(text, headers)
+        diff = None
+        try:
+            if in_place:
+                with trace.phase("write"):
+                    replace_atomic(Path(p), lambda out: out.write(upgraded))
+            else:
+                with trace.phase("diff"):
+                    diff = "".join(difflib.unified_diff(
+                        text.splitlines(keepends=True), upgraded.splitlines(keepends=True),
+                        f"a/{p}", f"b/{p}"))
+        except OSError as e:
+            results.append((p, "error", None, str(e)))
+            continue
+        results.append((p, "upgraded", diff, None))
+    trace.flush_worker()
+    return results
+
+
+def iter_chunks(worker, paths: List[str], jobs: int, *args) -> Iterator:
+    """Yields per-file results of worker(chunk, *args) as each chunk finishes."""
+    chunk_size = max(1, min(256, len(paths) // (jobs * 4) or 1))
+    chunks = [paths[i : i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    if jobs <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from worker(chunk, *args)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(worker, chunk, *args) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+# ----------------------------------------------------------------------
+# Commands
+# ----------------------------------------------------------------------
+
+def parse_args(args: List[str], flags: Tuple[str, ...]) -> Tuple[set, int, List[str]]:
+    """(flags given, jobs, targets)."""
+    given = set()
+    jobs = os.cpu_count() or 1
+    targets: List[str] = []
+    i = 0
+    while i < len(args):
+        if args[i] in flags:
+            given.add(args[i])
+            i += 1
+        elif args[i] in ("-j", "--jobs") and i + 1 < len(args):
+            try:
+                jobs = max(1, int(args[i + 1]))
+            except ValueError:
+                print("Usage:" + USAGE, file=sys.stderr)
+                sys.exit(2)
+            i += 2
+        else:
+            targets.append(args[i])
+            i += 1
+    return given, jobs, targets
+
+
+def cmd_classify(args: List[str]) -> int:
+    given, jobs, targets = parse_args(args, ("--json",))
+    paths = collect_paths(targets)
+    if not paths:
+        print("Usage:" + USAGE, file=sys.stderr)
+        return 2
+
+    results = sorted(iter_chunks(classify_chunk, paths, jobs))
+    counts = dict.fromkeys(DIALECTS, 0)
+    errors = 0
+    records = []
+    for p, dialect, blocks, error in results:
+        if error is not None:
+            errors += 1
+            print(f"ERROR: {p}: {error}", file=sys.stderr)
+            continue
+        counts[dialect] += 1
+        if "--json" in given:
+            records.append({"path": p, "dialect": dialect, "blocks": blocks})
+        else:
+            model = " ".join(f"{b['block']}:{b['role'] or '?'}" for b in blocks)
+            print(f"{dialect:<6} {p}  {model}".rstrip())
+
+    if "--json" in given:
+        print(json.dumps(records, ensure_ascii=False, indent=1))
+    summary = ", ".join(f"{counts[d]} {d}" for d in DIALECTS)
+    print(f"{len(results) - errors} cards: {summary}" + (f", {errors} errors" if errors else ""),
+          file=sys.stderr)
+    return 2 if errors else 0
+
+
+def cmd_upgrade(args: List[str]) -> int:
+    given, jobs, targets = parse_args(args, ("-i", "--in-place", "--diff"))
+    in_place = bool(given & {"-i", "--in-place"})
+    if not targets or (in_place and "--diff" in given) or (not given and len(targets) != 1):
+        print("Usage:" + USAGE, file=sys.stderr)
+        return 2
+
+    if not given:
+        try:
+            text = read_card(targets[0])
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"ERROR: {targets[0]}: {e}", file=sys.stderr)
+            return 2
+        headers = scan(text)
+        dialect = classify(headers)
+        if dialect == MIXED:
+            print(f"ERROR: {targets[0]}: mixes v1.0 and v1.1 headers; upgrade it by hand",
+                  file=sys.stderr)
+            return 2
+        sys.stdout.write(upgrade_text(text, headers) if dialect == V10 else text)
+        return 0
+
+    paths = collect_paths(targets)
+    counts = {"upgraded": 0, "current": 0, "mixed": 0, "error": 0}
+    started = time.perf_counter()
+    for p, status, diff, error in iter_chunks(upgrade_chunk, paths, jobs, in_place):
+        counts[status] += 1
+        if error is not None:
+            print(f"ERROR: {p}: {error}", file=sys.stderr)
+        elif status == "mixed":
+            print(f"SKIP: {p}: mixes v1.0 and v1.1 headers; upgrade it by hand", file=sys.stderr)
+        elif diff:
+            sys.stdout.write(diff)
+        elif status == "upgraded":
+            print(f"upgraded {p}", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+
+    verb = "Upgraded" if in_place else "Would upgrade"
+    print(f"{verb} {counts['upgraded']} of {len(paths)} cards "
+          f"({counts['current']} not v1.0, {counts['mixed']} mixed, {counts['error']} errors) "
+          f"in {elapsed:.2f} s", file=sys.stderr)
+    if counts["error"]:
+        return 2
+    return 1 if counts["upgraded"] and not in_place else 0
+
+
+COMMANDS = {"classify": cmd_classify, "upgrade": cmd_upgrade}
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv if argv is None else argv
+    trace.start("upgrade")
+    if len(argv) < 2 or argv[1] not in COMMANDS:
+        print("Usage:" + USAGE, file=sys.stderr)
+        sys.exit(2)
+    sys.exit(COMMANDS[argv[1]](argv[2:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,574 @@
+#!/usr/bin/env python3
+"""
+CaveCode Card Export v1.0
+
+Compiles a card into artifacts an engine can load without parsing
+`KEY: value  # comment` lines itself, and turns either artifact back
+into the exact card.
+
+Usage:
+    python cavecode_export.py export [--format json|bin|both] [--out DIR] <file | dir> ...
+    python cavecode_export.py import <card.json | card.cvcb> [-o PATH]
+    python cavecode_export.py show <card.json | card.cvcb> [KEY ...] [--json]
+
+Examples:
+    python cavecode_export.py export examples/runner-config/runner-config.cavecode
+    python cavecode_export.py export --format bin --out build/knobs cards/
+    python cavecode_export.py show build/knobs/runner-config.cvcb GRAVITY MAX_LIVES
+    python cavecode_export.py import build/knobs/runner-config.cvcb -o runner-config.cavecode
+
+Artifacts (written next to each card unless --out is given):
+
+    <card>.json   canonical JSON: sorted keys, no whitespace, UTF-8.
+                  Blocks with their typed knobs, plus every card line.
+    <card>.cvcb   packed binary, little-endian, built to be mmap'ed:
+
+        header    "CVCB", version, flags, section counts / offsets, sha256
+        strings   (count + 1) u32 offsets, then one UTF-8 blob; every
+                  key, value, comment and line is stored once
+        lines     u32 string id per card line (+ per-line endings if mixed)
+        blocks    header text, number, line range, knob range
+        knobs     32-byte records: 8-byte value (i64 / f64 / string id),
+                  key, block, line, comment, type
+        index     knob ids sorted by key bytes, for binary search
+
+    PackedCard (below) is the reference loader: it reads values straight
+    out of the mapped file, so opening a card costs one header read.
+
+Knob values are typed the same way as everywhere else (coerce_value):
+int, float, bool or string. Both artifacts carry FORMAT_VERSION; loaders
+refuse versions newer than they know.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+import cavecode_trace as trace
+from cavecode_parser import parse_text
+
+FORMAT_NAME = "cavecode-export"
+FORMAT_VERSION = 1
+
+MAGIC = b"CVCB"
+NONE = 0xFFFFFFFF
+FLAG_FINAL_NEWLINE = 1
+
+# magic, version, flags, title, newline, strings (count, offset), lines
+# (count, offset), blocks (count, offset), knobs (count, offset), index
+# offset, endings offset (0 = every line ends with newline), sha256
+HEADER = struct.Struct("<4sHH12I32s")
+# header text, number, header line, end line (exclusive), first knob, knob count
+BLOCK = struct.Struct("<6I")
+# value, key, block, line, comment, type
+KNOB = struct.Struct("<8sIIIIB7x")
+
+T_STR, T_INT, T_FLOAT, T_BOOL, T_BIGINT = range(5)
+TYPE_NAMES = {T_STR: "str", T_INT: "int", T_FLOAT: "float", T_BOOL: "bool", T_BIGINT: "int"}
+INT64 = (-(2 ** 63), 2 ** 63 - 1)
+
+EXTENSIONS = {"json": ".json", "bin": ".cvcb"}
+
+_MISSING = object()
+
+USAGE = __doc__.split("Examples:")[0].split("Usage:")[1].rstrip()
+
+
+class ExportError(Exception):
+    pass
+
+
+# ----------------------------------------------------------------------
+# Card -> model
+# ----------------------------------------------------------------------
+
+def type_of(value: Any) -> str:
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    return "str"
+
+
+def line_endings(text: str, count: int) -> List[str]:
+    """The terminator of each of the card's lines ("" for an unterminated last line)."""
+    endings = [raw[len(raw.splitlines()[0]):] for raw in text.splitlines(keepends=True)]
+    assert len(endings) == count
+    return endings
+
+
+def card_model(text: str, source: str) -> Dict[str, Any]:
+    """Everything an artifact holds, as plain JSON-ready data."""
+    doc = parse_text(text)
+    endings = line_endings(text, len(doc.lines))
+    final_newline = bool(endings) and endings[-1] != ""
+    terminated = endings if final_newline else endings[:-1]
+    kinds = set(terminated)
+
+    model: Dict[str, Any] = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "source": source,
+        "sha256": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        "title": doc.title,
+        "final_newline": final_newline,
+        "lines": doc.lines,
+        "blocks": [],
+    }
+    if len(kinds) <= 1:
+        model["newline"] = kinds.pop() if kinds else "\n"
+    else:
+        model["newline"] = None
+        model["endings"] = terminated
+
+    for block in doc.blocks:
+        knobs = []
+        for knob in block.knobs:
+            typed = knob.typed
+            entry = {"key": knob.key, "value": typed, "type": type_of(typed), "line": knob.lineno}
+            if knob.comment is not None:
+                entry["comment"] = knob.comment
+            knobs.append(entry)
+        model["blocks"].append({
+            "header": block.header.text,
+            "number": block.number,
+            "line": block.header.lineno,
+            "end": block.end,
+            "knobs": knobs,
+        })
+    return model
+
+
+def card_text(lines: List[str], newline: Optional[str], endings: Optional[List[str]],
+              final_newline: bool) -> str:
+    """Reassembles a card from its lines (the reverse importer)."""
+    if newline is not None:
+        text = newline.join(lines)
+        return text + newline if final_newline and lines else text
+    parts = []
+    for i, line in enumerate(lines):
+        parts.append(line)
+        if i < len(endings):
+            parts.append(endings[i])
+    return "".join(parts)
+
+
+def canonical_json(model: Dict[str, Any]) -> str:
+    return json.dumps(model, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+# ----------------------------------------------------------------------
+# Packed binary
+# ----------------------------------------------------------------------
+
+class StringTable:
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.data: List[bytes] = []
+
+    def add(self, text: Optional[str]) -> int:
+        if text is None:
+            return NONE
+        sid = self.ids.get(text)
+        if sid is None:
+            sid = self.ids[text] = len(self.data)
+            self.data.append(text.encode("utf-8"))
+        return sid
+
+    def pack(self) -> bytes:
+        offsets = [0]
+        for item in self.data:
+            offsets.append(offsets[-1] + len(item))
+        return struct.pack(f"<{len(offsets)}I", *offsets) + b"".join(self.data)
+
+
+def _pad8(buf: bytearray) -> int:
+    buf.extend(b"\0" * (-len(buf) % 8))
+    return len(buf)
+
+
+def pack_value(value: Any, strings: StringTable) -> Tuple[bytes, int]:
+    if isinstance(value, bool):
+        return struct.pack("<q", int(value)), T_BOOL
+    if isinstance(value, int):
+        if INT64[0] <= value <= INT64[1]:
+            return struct.pack("<q", value), T_INT
+        return struct.pack("<Q", strings.add(str(value))), T_BIGINT
+    if isinstance(value, float):
+        return struct.pack("<d", value), T_FLOAT
+    return struct.pack("<Q", strings.add(value)), T_STR
+
+
+def pack_model(model: Dict[str, Any]) -> bytes:
+    strings = StringTable()
+    title = strings.add(model["title"])
+    newline = strings.add(model["newline"])
+    line_ids = [strings.add(line) for line in model["lines"]]
+    ending_ids = [strings.add(e) for e in model.get("endings", [])]
+
+    blocks = []
+    knobs = []
+    keys: List[bytes] = []
+    for b, block in enumerate(model["blocks"]):
+        blocks.append(BLOCK.pack(strings.add(block["header"]), strings.add(block["number"]),
+                                 block["line"], block["end"], len(knobs), len(block["knobs"])))
+        for knob in block["knobs"]:
+            value, kind = pack_value(knob["value"], strings)
+            knobs.append(KNOB.pack(value, strings.add(knob["key"]), b, knob["line"],
+                                   strings.add(knob.get("comment")), kind))
+            keys.append(knob["key"].encode("utf-8"))
+    # Stable sort: equal keys stay in card order, so the last one wins like knobs_in()
+    index = sorted(range(len(keys)), key=keys.__getitem__)
+
+    buf = bytearray(HEADER.size)
+    str_off = _pad8(buf)
+    buf += strings.pack()
+    line_off = _pad8(buf)
+    buf += struct.pack(f"<{len(line_ids)}I", *line_ids)
+    endings_off = 0
+    if ending_ids:
+        endings_off = _pad8(buf)
+        buf += struct.pack(f"<{len(ending_ids)}I", *ending_ids)
+    block_off = _pad8(buf)
+    buf += b"".join(blocks)
+    knob_off = _pad8(buf)
+    buf += b"".join(knobs)
+    index_off = _pad8(buf)
+    buf += struct.pack(f"<{len(index)}I", *index)
+
+    flags = FLAG_FINAL_NEWLINE if model["final_newline"] else 0
+    buf[:HEADER.size] = HEADER.pack(
+        MAGIC, FORMAT_VERSION, flags, title, newline,
+        len(strings.data), str_off, len(line_ids), line_off, len(blocks), block_off,
+        len(knobs), knob_off, index_off, endings_off, bytes.fromhex(model["sha256"]),
+    )
+    return bytes(buf)
+
+
+class PackedCard:
+    """
+    Read-only view of a .cvcb file through mmap. Nothing is decoded up
+    front; get() binary-searches the key index in the mapped bytes.
+    """
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < HEADER.size:
+            raise ExportError(f"{path}: not a CaveCode binary export")
+        (magic, version, self.flags, self._title, self._newline,
+         self._str_count, str_off, self.line_count, self._line_off,
+         self.block_count, self._block_off, self.knob_count, self._knob_off,
+         self._index_off, self._endings_off, sha) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ExportError(f"{path}: not a CaveCode binary export")
+        if version > FORMAT_VERSION:
+            raise ExportError(f"{path}: format version {version} is newer than {FORMAT_VERSION}")
+        self._str_off = str_off
+        self._blob = str_off + 4 * (self._str_count + 1)
+        self.sha256 = sha.hex()
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __enter__(self) -> "PackedCard":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _bytes(self, sid: int) -> bytes:
+        start, end = struct.unpack_from("<2I", self._mm, self._str_off + 4 * sid)
+        return self._mm[self._blob + start : self._blob + end]
+
+    def string(self, sid: int) -> Optional[str]:
+        return None if sid == NONE else self._bytes(sid).decode("utf-8")
+
+    @property
+    def title(self) -> Optional[str]:
+        return self.string(self._title)
+
+    def _value(self, raw: bytes, kind: int) -> Any:
+        if kind == T_INT:
+            return struct.unpack("<q", raw)[0]
+        if kind == T_FLOAT:
+            return struct.unpack("<d", raw)[0]
+        if kind == T_BOOL:
+            return raw != b"\0" * 8
+        text = self.string(struct.unpack("<Q", raw)[0])
+        return int(text) if kind == T_BIGINT else text
+
+    def _knob_key(self, i: int) -> bytes:
+        return self._bytes(struct.unpack_from("<I", self._mm, self._knob_off + KNOB.size * i + 8)[0])
+
+    def knob(self, i: int) -> Dict[str, Any]:
+        raw, key, block, line, comment, kind = KNOB.unpack_from(self._mm, self._knob_off + KNOB.size * i)
+        return {
+            "key": self.string(key), "value": self._value(raw, kind), "type": TYPE_NAMES[kind],
+            "block": block, "line": line, "comment": self.string(comment),
+        }
+
+    def _indexed(self, pos: int) -> int:
+        return struct.unpack_from("<I", self._mm, self._index_off + 4 * pos)[0]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Value of key (the last one in card order if repeated), or default."""
+        want = key.encode("utf-8")
+        lo, hi = 0, self.knob_count
+        while lo < hi:           # rightmost entry <= want
+            mid = (lo + hi) // 2
+            if self._knob_key(self._indexed(mid)) <= want:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0:
+            return default
+        i = self._indexed(lo - 1)
+        if self._knob_key(i) != want:
+            return default
+        raw, _key, _block, _line, _comment, kind = KNOB.unpack_from(self._mm, self._knob_off + KNOB.size * i)
+        return self._value(raw, kind)
+
+    def knobs(self) -> Iterator[Dict[str, Any]]:
+        for i in range(self.knob_count):
+            yield self.knob(i)
+
+    def blocks(self) -> Iterator[Dict[str, Any]]:
+        for b in range(self.block_count):
+            header, number, line, end, first, count = BLOCK.unpack_from(
+                self._mm, self._block_off + BLOCK.size * b)
+            yield {
+                "header": self.string(header), "number": self.string(number),
+                "line": line, "end": end, "knobs": [self.knob(i) for i in range(first, first + count)],
+            }
+
+    def text(self) -> str:
+        line_ids = struct.unpack_from(f"<{self.line_count}I", self._mm, self._line_off)
+        lines = [self.string(sid) for sid in line_ids]
+        endings = None
+        if self._endings_off:
+            count = self.line_count if self.flags & FLAG_FINAL_NEWLINE else max(0, self.line_count - 1)
+            endings = [self.string(sid) for sid in
+                       struct.unpack_from(f"<{count}I", self._mm, self._endings_off)]
+        return card_text(lines, self.string(self._newline), endings,
+                         bool(self.flags & FLAG_FINAL_NEWLINE))
+
+
+# ----------------------------------------------------------------------
+# JSON artifact
+# ----------------------------------------------------------------------
+
+def load_json(path: Path) -> Dict[str, Any]:
+    model = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(model, dict) or model.get("format") != FORMAT_NAME:
+        raise ExportError(f"{path}: not a CaveCode JSON export")
+    if model.get("version", 0) > FORMAT_VERSION:
+        raise ExportError(f"{path}: format version {model['version']} is newer than {FORMAT_VERSION}")
+    return model
+
+
+def json_text(model: Dict[str, Any]) -> str:
+    return card_text(model["lines"], model["newline"], model.get("endings"), model["final_newline"])
+
+
+# ----------------------------------------------------------------------
+# Commands
+# ----------------------------------------------------------------------
+
+def iter_cards(targets: List[str]) -> Iterator[Path]:
+    for target in targets:
+        path = Path(target)
+        if path.is_dir():
+            yield from sorted(path.rglob("*.cavecode"))
+        else:
+            yield path
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with open(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def export_card(card: Path, formats: List[str], out: Optional[Path]) -> List[Path]:
+    # newline="" keeps \r\n so the importer can give back the same bytes
+    with open(card, encoding="utf-8", newline="") as f, trace.phase("read"):
+        text = f.read()
+    model = card_model(text, card.name)
+    with trace.phase("verify"):
+        if json_text(model) != text:
+            raise ExportError(f"{card}: card does not survive a round trip")
+
+    written = []
+    base = (out or card.parent) / card.stem
+    for fmt in formats:
+        path = base.with_name(base.name + EXTENSIONS[fmt])
+        with trace.phase(fmt):
+            data = canonical_json(model).encode("utf-8") if fmt == "json" else pack_model(model)
+        with trace.phase("write"):
+            write_atomic(path, data)
+        written.append(path)
+    return written
+
+
+def open_artifact(path: Path):
+    """A PackedCard for .cvcb files, the JSON model for anything else."""
+    with open(path, "rb") as f:
+        magic = f.read(len(MAGIC))
+    if magic == MAGIC:
+        return PackedCard(path)
+    return load_json(path)
+
+
+def artifact_knobs(artifact) -> Iterator[Dict[str, Any]]:
+    if isinstance(artifact, PackedCard):
+        yield from artifact.knobs()
+        return
+    for b, block in enumerate(artifact["blocks"]):
+        for knob in block["knobs"]:
+            yield dict(knob, block=b, comment=knob.get("comment"))
+
+
+def cmd_export(args: List[str]) -> int:
+    formats = ["json", "bin"]
+    out: Optional[Path] = None
+    targets: List[str] = []
+    i = 0
+    while i < len(args):
+        if args[i] == "--format" and i + 1 < len(args):
+            fmt = args[i + 1]
+            if fmt not in ("json", "bin", "both"):
+                print(f"Unknown format: {fmt} (json, bin or both)", file=sys.stderr)
+                return 1
+            formats = ["json", "bin"] if fmt == "both" else [fmt]
+            i += 2
+        elif args[i] == "--out" and i + 1 < len(args):
+            out = Path(args[i + 1])
+            i += 2
+        else:
+            targets.append(args[i])
+            i += 1
+    if not targets:
+        print("Usage:" + USAGE, file=sys.stderr)
+        return 1
+
+    failed = 0
+    count = 0
+    for card in iter_cards(targets):
+        try:
+            for path in export_card(card, formats, out):
+                print(f"{card} → {path}")
+            count += 1
+            trace.count("files")
+        except (OSError, UnicodeDecodeError, ExportError) as e:
+            print(f"ERROR: {card}: {e}", file=sys.stderr)
+            failed += 1
+    print(f"Exported {count} card(s), {failed} failed.")
+    return 1 if failed else 0
+
+
+def cmd_import(args: List[str]) -> int:
+    out: Optional[Path] = None
+    source: Optional[str] = None
+    i = 0
+    while i < len(args):
+        if args[i] in ("-o", "--out") and i + 1 < len(args):
+            out = Path(args[i + 1])
+            i += 2
+        elif source is None:
+            source = args[i]
+            i += 1
+        else:
+            print("Usage:" + USAGE, file=sys.stderr)
+            return 1
+    if source is None:
+        print("Usage:" + USAGE, file=sys.stderr)
+        return 1
+
+    try:
+        artifact = open_artifact(Path(source))
+        if isinstance(artifact, PackedCard):
+            with artifact:
+                text = artifact.text()
+        else:
+            text = json_text(artifact)
+    except (OSError, ValueError, ExportError) as e:
+        print(f"ERROR: {source}: {e}", file=sys.stderr)
+        return 1
+
+    if out is None:
+        sys.stdout.write(text)
+    else:
+        write_atomic(out, text.encode("utf-8"))
+    return 0
+
+
+def cmd_show(args: List[str]) -> int:
+    as_json = "--json" in args
+    args = [a for a in args if a != "--json"]
+    if not args:
+        print("Usage:" + USAGE, file=sys.stderr)
+        return 1
+    source, keys = args[0], args[1:]
+
+    try:
+        artifact = open_artifact(Path(source))
+    except (OSError, ValueError, ExportError) as e:
+        print(f"ERROR: {source}: {e}", file=sys.stderr)
+        return 1
+
+    try:
+        if keys:
+            if isinstance(artifact, PackedCard):
+                found = {k: artifact.get(k, _MISSING) for k in keys}
+            else:
+                merged = {k["key"]: k["value"] for k in artifact_knobs(artifact)}
+                found = {k: merged.get(k, _MISSING) for k in keys}
+            missing = [k for k, v in found.items() if v is _MISSING]
+            found = {k: v for k, v in found.items() if v is not _MISSING}
+        else:
+            found = {k["key"]: k["value"] for k in artifact_knobs(artifact)}
+            missing = []
+    finally:
+        if isinstance(artifact, PackedCard):
+            artifact.close()
+
+    if as_json:
+        print(json.dumps(found, ensure_ascii=False))
+    else:
+        for key, value in found.items():
+            print(f"{key} = {json.dumps(value, ensure_ascii=False)}")
+    for key in missing:
+        print(f"{key}: not found", file=sys.stderr)
+    return 1 if missing else 0
+
+
+COMMANDS = {"export": cmd_export, "import": cmd_import, "show": cmd_show}
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv if argv is None else argv
+    trace.start("export")
+    if len(argv) < 2 or argv[1] not in COMMANDS:
+        print("Usage:" + USAGE, file=sys.stderr)
+        sys.exit(1)
+    sys.exit(COMMANDS[argv[1]](argv[2:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,34 +4,62 @@ CaveCode Fixer / Normalizer v1.0
 
 Usage:
     python cavecode_fix_v1.py input.cavecode > output.cavecode
+    cat dump.cavecode | python cavecode_fix_v1.py - > fixed.cavecode
+    python cavecode_fix_v1.py --in-place [--jobs N] <file | dir | glob> ...
+    python cavecode_fix_v1.py --diff [--jobs N] <file | dir | glob> ... > fixes.patch
 
 What it does:
     - Normalizes block headers to the official glyph + title set
     - Fixes old or incorrect glyphs (e.g. ✏️ → 🖍️ for tuning knobs)
     - Leaves inner content alone
 
+Input is streamed line by line, so memory stays flat even for
+multi-megabyte dumps.
+
+Batch mode (--in-place or --diff) spreads files over --jobs worker
+processes (default: all CPUs). Only header candidates (lines with an
+em-dash) are checked against CANON_HEADERS (from
+common/cavecode_dialect.py), and files that are already canonical are
+never written. v1.0 "==== BLOCK" headers are left alone;
+cavecode_upgrade.py converts those cards. --in-place writes each changed
+file to a temp file next to it and renames it over the original; --diff
+prints a unified diff per changed file instead and touches nothing. A
+summary with throughput goes to stderr.
+
 This is meant as a gentle corrector, not a linter.
 """
 
+import glob
+import io
+import os
+import re
+import stat
 import sys
+import tempfile
+import time
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, Iterable, Iterator, List, Optional, TextIO, Tuple
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+import cavecode_trace as trace
+from cavecode_dialect import CANON_HEADERS  # canonical header per block number
+from cavecode_parser import header_number
 
-# Canonical headers we enforce, keyed by block number
-CANON_HEADERS = {
-    "1": "🧱 BLOCK 1 — SHELL",
-    "2": "🎮 BLOCK 2 — GAME LOOP / BEHAVIOR",
-    "3": "🖍️ BLOCK 3 — TUNING KNOBS",
-    "4": "🌐 BLOCK 4 — PUBLIC TEXT",
-    "5": "📝 BLOCK 5 — HUMAN NOTES",
-}
+# Read / write buffer size; memory use stays around this regardless of input size
+BUFFER_SIZE = 1 << 16
 
-def read_lines(path: Path) -> List[str]:
-    if str(path) == "-":
-        return sys.stdin.read().splitlines(keepends=True)
-    return path.read_text(encoding="utf-8").splitlines(keepends=True)
 
+# A line that could be a header, with its ending. Lines end at \n, \r\n or
+# \r, as when reading with newline="", and only em-dash lines can change.
+CANDIDATE_RE = re.compile(r"(?<![^\r\n])[^\r\n]*—[^\r\n]*(?:\r\n|\r|\n)?")
+
+DIFF_CONTEXT = 3
+
+USAGE = (
+    "Usage: cavecode_fix_v1.py <input-file | ->\n"
+    "       cavecode_fix_v1.py --in-place|--diff [--jobs N] [--chunk-size N] "
+    "<file | dir | glob> ..."
+)
 
 def is_block_header(line: str) -> Tuple[bool, str]:
     """
@@ -40,19 +68,16 @@ def is_block_header(line: str) -> Tuple[bool, str]:
     """
     stripped = line.strip()
     # Look for "BLOCK X —"
-    marker = "BLOCK "
-    dash = "—"
-    if marker not in stripped or dash not in stripped:
+    if "—" not in stripped:
         return False, ""
-    try:
-        after_block = stripped.split(marker, 1)[1]
-        num_part = after_block.split(" ", 1)[0]
-        num_part = num_part.strip()
-        # basic numeric check
-        int(num_part)
-        return True, num_part
-    except Exception:
+    # "==== BLOCK N —" is the v1.0 dialect, which cavecode_upgrade.py converts
+    if stripped.startswith("="):
+        return False, ""
+    num_part = header_number(stripped)
+    if num_part is None:
         return False, ""
+    trace.count("headers_matched")
+    return True, num_part
 
 
 def fix_header_line(line: str) -> str:
@@ -71,28 +96,279 @@ def fix_header_line(line: str) -> str:
         # Unknown block number, leave it alone
         return line
 
-    # Preserve trailing newline if present
-    newline = ""
-    if line.endswith("\n"):
-        newline = "\n"
+    # Preserve the line ending (\n, \r\n or \r) if present
+    body = line.rstrip("\r\n")
+    if body != canonical:
+        trace.count("headers_fixed")
+    return canonical + line[len(body):]
+
 
-    return canonical + newline
+def read_lines(path: Path) -> Iterator[str]:
+    """
+    Streams lines (with their original endings) from a file or stdin.
+    Only one buffer's worth of input is held in memory at a time.
+    """
+    if str(path) == "-":
+        stream = open(sys.stdin.fileno(), encoding="utf-8", newline="",
+                      buffering=BUFFER_SIZE, closefd=False)
+    else:
+        stream = open(path, encoding="utf-8", newline="", buffering=BUFFER_SIZE)
+    with stream:
+        yield from stream
 
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: cavecode_fix_v1.py <input-file | ->", file=sys.stderr)
-        sys.exit(1)
+def fix_lines(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        yield fix_header_line(line)
 
-    path = Path(sys.argv[1])
-    lines = read_lines(path)
 
-    fixed_lines: List[str] = []
+def write_lines(lines: Iterable[str], out: TextIO) -> None:
+    """Joins lines into ~BUFFER_SIZE writes instead of one write per line."""
+    batch: List[str] = []
+    size = 0
     for line in lines:
-        fixed = fix_header_line(line)
-        fixed_lines.append(fixed)
+        batch.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            out.write("".join(batch))
+            batch.clear()
+            size = 0
+    if batch:
+        out.write("".join(batch))
+
+
+def replace_atomic(path: Path, write: Callable[[TextIO], None]) -> None:
+    """
+    Writes through write() into a temp file in the same directory, then
+    atomically renames it over path (keeping its permissions).
+    """
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with open(fd, "w", encoding="utf-8", newline="", buffering=BUFFER_SIZE) as out:
+            write(out)
+            out.flush()
+            os.fsync(out.fileno())
+        os.chmod(tmp_name, stat.S_IMODE(os.stat(path).st_mode))
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def fix_in_place(path: Path) -> None:
+    """Streams path through the fixer and atomically replaces it."""
+    replace_atomic(path, lambda out: write_lines(fix_lines(read_lines(path)), out))
+
+
+# ----------------------------------------------------------------------
+# Batch mode
+# ----------------------------------------------------------------------
+
+def fix_text(text: str) -> str:
+    """Same result as fix_lines() over the whole text, touching only header candidates."""
+    if "—" not in text:
+        return text
+    return CANDIDATE_RE.sub(lambda m: fix_header_line(m.group()), text)
+
+
+def _diff_line(prefix: str, line: str, last: bool) -> str:
+    if line.endswith("\n"):
+        return prefix + line
+    if last:
+        return prefix + line + "\n\\ No newline at end of file\n"
+    return prefix + line + "\n"
+
+
+def _diff_range(start: int, length: int) -> str:
+    if length == 1:
+        return str(start + 1)
+    return f"{start + 1 if length else start},{length}"
+
+
+def unified_diff(name: str, old: List[str], new: List[str], context: int = DIFF_CONTEXT) -> str:
+    """
+    Unified diff between two line lists of the same length (the fixer
+    only ever replaces lines one for one), built in one pass.
+    """
+    changed = [i for i, (a, b) in enumerate(zip(old, new)) if a != b]
+    if not changed:
+        return ""
+    hunks: List[Tuple[int, int]] = []
+    start = end = changed[0]
+    for i in changed[1:]:
+        if i - end > 2 * context:
+            hunks.append((start, end))
+            start = i
+        end = i
+    hunks.append((start, end))
+
+    last = len(old) - 1
+    out = [f"--- a/{name}\n", f"+++ b/{name}\n"]
+    for start, end in hunks:
+        lo = max(0, start - context)
+        hi = min(len(old), end + context + 1)
+        span = _diff_range(lo, hi - lo)
+        out.append(f"@@ -{span} +{span} @@\n")
+        i = lo
+        while i < hi:
+            if old[i] == new[i]:
+                out.append(_diff_line(" ", old[i], i == last))
+                i += 1
+                continue
+            j = i
+            while j < hi and old[j] != new[j]:
+                j += 1
+            out.extend(_diff_line("-", old[k], k == last) for k in range(i, j))
+            out.extend(_diff_line("+", new[k], k == last) for k in range(i, j))
+            i = j
+    return "".join(out)
+
+
+# (path, status, diff, bytes read, error); status is "changed", "unchanged" or "error"
+Result = Tuple[str, str, Optional[str], int, Optional[str]]
+
+
+def fix_chunk(paths: List[str], in_place: bool) -> List[Result]:
+    """Worker entry point: check (and fix or diff) one chunk of files."""
+    results: List[Result] = []
+    for p in paths:
+        trace.count("files")
+        try:
+            with trace.phase("read"):
+                data = Path(p).read_bytes()
+                text = data.decode("utf-8")
+        except (OSError, UnicodeDecodeError) as e:
+            results.append((p, "error", None, 0, str(e)))
+            continue
+        trace.count("bytes", len(data))
+        with trace.phase("fix"):
+            fixed = fix_text(text)
+        if fixed == text:
+            results.append((p, "unchanged", None, len(data), None))
+            continue
+        diff = None
+        try:
+            if in_place:
+                with trace.phase("write"):
+                    replace_atomic(Path(p), lambda out: out.write(fixed))
+            else:
+                with trace.phase("diff"):
+                    old = list(io.StringIO(text, newline=""))
+                    diff = unified_diff(p, old, [fix_header_line(line) for line in old])
+        except OSError as e:
+            results.append((p, "error", None, len(data), str(e)))
+            continue
+        results.append((p, "changed", diff, len(data), None))
+    trace.flush_worker()
+    return results
+
+
+def collect_paths(targets: List[str]) -> List[str]:
+    """Expand directories (recursively, *.cavecode) and glob patterns into a flat file list."""
+    paths: List[str] = []
+    for target in targets:
+        if os.path.isdir(target):
+            paths.extend(sorted(str(p) for p in Path(target).rglob("*.cavecode")))
+        elif glob.has_magic(target):
+            paths.extend(sorted(glob.glob(target, recursive=True)))
+        else:
+            paths.append(target)
+    return paths
+
+
+def iter_results(paths: List[str], jobs: int, chunk_size: int, in_place: bool) -> Iterator[Result]:
+    """Yields per-file results as soon as each chunk finishes."""
+    chunks = [paths[i : i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    if jobs <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from fix_chunk(chunk, in_place)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(fix_chunk, chunk, in_place) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def run_batch(targets: List[str], in_place: bool, jobs: int, chunk_size: int) -> int:
+    paths = collect_paths(targets)
+    if not paths:
+        print("ERROR: No files to fix.", file=sys.stderr)
+        return 1
+    if chunk_size <= 0:
+        # A few chunks per worker so one slow file doesn't stall the pool
+        chunk_size = max(1, min(256, len(paths) // (jobs * 4) or 1))
+
+    counts = {"changed": 0, "unchanged": 0, "error": 0}
+    total_bytes = 0
+    started = time.perf_counter()
+    for p, status, diff, size, error in iter_results(paths, jobs, chunk_size, in_place):
+        counts[status] += 1
+        total_bytes += size
+        if error is not None:
+            print(f"ERROR: {p}: {error}", file=sys.stderr)
+        elif diff:
+            sys.stdout.write(diff)
+        elif status == "changed":
+            print(f"fixed {p}", file=sys.stderr)
+    elapsed = max(time.perf_counter() - started, 1e-9)
+
+    verb = "Fixed" if in_place else "Would fix"
+    print(
+        f"{verb} {counts['changed']} of {len(paths)} files "
+        f"({counts['unchanged']} unchanged, {counts['error']} errors) — "
+        f"{total_bytes / 1e6:.1f} MB in {elapsed:.2f} s, "
+        f"{len(paths) / elapsed:.0f} files/s, {total_bytes / 1e6 / elapsed:.1f} MB/s",
+        file=sys.stderr,
+    )
+    if counts["error"]:
+        return 2
+    # Like diff(1): --diff exits 1 when something would change
+    return 1 if counts["changed"] and not in_place else 0
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv if argv is None else argv
+    trace.start("fix")
+    args = argv[1:]
+    mode = None
+    jobs = os.cpu_count() or 1
+    chunk_size = 0
+    targets: List[str] = []
+    i = 0
+    while i < len(args):
+        if args[i] in ("-i", "--in-place", "--diff"):
+            mode = "diff" if args[i] == "--diff" else "in-place"
+            i += 1
+        elif args[i] in ("-j", "--jobs") and i + 1 < len(args):
+            try:
+                jobs = max(1, int(args[i + 1]))
+            except ValueError:
+                print(USAGE, file=sys.stderr)
+                sys.exit(1)
+            i += 2
+        elif args[i] == "--chunk-size" and i + 1 < len(args):
+            try:
+                chunk_size = int(args[i + 1])
+            except ValueError:
+                print(USAGE, file=sys.stderr)
+                sys.exit(1)
+            i += 2
+        else:
+            targets.append(args[i])
+            i += 1
+    if not targets or (mode is None and len(targets) != 1):
+        print(USAGE, file=sys.stderr)
+        sys.exit(1)
+
+    if mode is not None:
+        sys.exit(run_batch(targets, mode == "in-place", jobs, chunk_size))
 
-    sys.stdout.write("".join(fixed_lines))
+    path = Path(targets[0])
+    with open(sys.stdout.fileno(), "w", encoding="utf-8", newline="",
+              buffering=BUFFER_SIZE, closefd=False) as out, trace.phase("stream"):
+        write_lines(fix_lines(read_lines(path)), out)
 
 
 if __name__ == "__main__":
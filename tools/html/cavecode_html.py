@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""
+CaveCode HTML Artifact Tool v1.0
+
+Single-file HTML/JS artifacts carry their CaveCode blocks in comments,
+with knobs written as JavaScript:
+
+    🖍️ BLOCK 2 — HUMAN EDIT ZONE      const REFRESH_RATE = 30;   // seconds
+    🌐 BLOCK 3 — PUBLIC TEXT          const UI_TEXT = { TITLE: 'Monitor', ... };
+    🪨 BLOCK 4 — LOCKED LOGIC         the app itself
+
+This tool reads those knobs into the same knob model the card tools use
+and rewrites their values in place.
+
+Usage:
+    python cavecode_html.py show [--json] <file | dir | glob> ...
+    python cavecode_html.py check <file | dir | glob> ...
+    python cavecode_html.py set [--dry-run] KEY=VALUE [KEY=VALUE ...] <file | dir | glob> ...
+
+Examples:
+    python cavecode_html.py show examples/ai-generated/Claude/universal_thershold_monitor.html
+    python cavecode_html.py check artifacts/
+    python cavecode_html.py set REFRESH_RATE=45 UI_TEXT.TITLE="Base Monitor" deployed/
+
+Knobs:
+    UPPER_CASE consts with a plain value (string, number, true / false)
+    are "tuning" knobs; the entries of the UI_TEXT object are "public"
+    knobs. Arrays and objects (e.g. DEFAULT_RESOURCES) are left alone.
+    KEY in set matches either kind; UI_TEXT.KEY only matches UI_TEXT.
+
+Each artifact is read as a byte stream, line by line, and reading stops
+at the LOCKED LOGIC header: the app code below it is never read. Every
+knob remembers the byte span of its value, so set writes only those
+bytes. If the new values have the same byte length as the old ones, they
+are written into the file where they stand; otherwise the file is
+rebuilt in a temp file by copying the untouched byte ranges around the
+new values and renamed over the original. A file is only changed if
+every value in it could be set.
+
+check reports PASS / PASS WITH WARNINGS / FAIL like the card validator.
+"""
+
+import glob
+import json
+import os
+import re
+import stat
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+import cavecode_trace as trace
+from cavecode_parser import Header, coerce_value
+
+BUFFER_SIZE = 1 << 16
+
+EXTENSIONS = (".html", ".htm", ".js")
+
+# Blocks every artifact needs, matched by title keywords
+REQUIRED_BLOCKS = {
+    "IDENTITY": ("IDENTITY", "SHELL"),
+    "EDIT ZONE": ("HUMAN EDIT ZONE", "TUNING KNOBS"),
+    "PUBLIC TEXT": ("PUBLIC TEXT",),
+    "LOCKED LOGIC": ("LOCKED LOGIC",),
+}
+
+CONST_RE = re.compile(r"\s*(?:export\s+)?const\s+([A-Z][A-Z0-9_]*)\s*=\s*")
+UI_TEXT_RE = re.compile(r"\s*(?:export\s+)?const\s+UI_TEXT\s*=\s*\{\s*$")
+ENTRY_RE = re.compile(r"""\s*(?:([A-Z][A-Z0-9_]*)|'([A-Z][A-Z0-9_]*)'|"([A-Z][A-Z0-9_]*)")\s*:\s*""")
+NUMBER_RE = re.compile(r"-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+# What may follow a value: ; or , then an optional // or /* */ comment
+TAIL_RE = re.compile(r"\s*[;,]?\s*(?://\s?(?P<line>.*?)|/\*\s?(?P<block>.*?)\s*\*/)?\s*$")
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "v": "\v", "0": "\0"}
+
+USAGE = __doc__.split("Examples:")[0].split("Usage:")[1].rstrip()
+
+
+class ArtifactError(Exception):
+    pass
+
+
+class HtmlKnob:
+    """One knob, with the byte span of its value literal in the file."""
+
+    __slots__ = ("key", "value", "zone", "block", "lineno", "comment", "start", "end", "raw", "quote")
+
+    def __init__(self, key: str, value: Any, zone: str, block: int, lineno: int,
+                 comment: Optional[str], start: int, raw: bytes, quote: str):
+        self.key = key
+        self.value = value            # str, int, float or bool
+        self.zone = zone              # "tuning" (const) or "public" (UI_TEXT)
+        self.block = block            # index into Artifact.blocks, -1 before the first
+        self.lineno = lineno          # 0-based
+        self.comment = comment
+        self.start = start            # byte offsets of the literal, quotes included
+        self.end = start + len(raw)
+        self.raw = raw                # the literal as it is in the file
+        self.quote = quote            # quote character of a string literal, else ""
+
+    @property
+    def name(self) -> str:
+        return f"UI_TEXT.{self.key}" if self.zone == "public" else self.key
+
+    def __repr__(self):
+        return f"HtmlKnob({self.name!r}, {self.value!r}, bytes {self.start}-{self.end})"
+
+
+class Artifact:
+    __slots__ = ("path", "title", "blocks", "knobs", "skipped", "issues", "has_ui_text", "lines_read")
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.title: Optional[str] = None
+        self.blocks: List[Header] = []
+        self.knobs: List[HtmlKnob] = []
+        self.skipped: List[str] = []      # array / object consts, left alone
+        self.issues: List[str] = []       # values we could not read
+        self.has_ui_text = False
+        self.lines_read = 0
+
+    def find(self, name: str) -> List[HtmlKnob]:
+        """Knobs matching KEY (either zone) or UI_TEXT.KEY."""
+        if name.startswith("UI_TEXT."):
+            return [k for k in self.knobs if k.zone == "public" and k.key == name[8:]]
+        return [k for k in self.knobs if k.key == name]
+
+
+# ----------------------------------------------------------------------
+# Reading
+# ----------------------------------------------------------------------
+
+def type_of(value: Any) -> str:
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    return "str"
+
+
+def _unescape(body: str) -> str:
+    if "\\" not in body:
+        return body
+    out = []
+    i = 0
+    while i < len(body):
+        c = body[i]
+        if c != "\\" or i + 1 == len(body):
+            out.append(c)
+            i += 1
+            continue
+        n = body[i + 1]
+        if n == "u" and re.fullmatch(r"[0-9a-fA-F]{4}", body[i + 2 : i + 6]):
+            out.append(chr(int(body[i + 2 : i + 6], 16)))
+            i += 6
+            continue
+        out.append(_ESCAPES.get(n, n))
+        i += 2
+    return "".join(out)
+
+
+def scan_literal(line: str, pos: int) -> Optional[Tuple[Any, int, str]]:
+    """(value, end, quote) for a plain JS literal starting at pos, or None."""
+    if pos >= len(line):
+        return None
+    c = line[pos]
+    if c in "'\"`":
+        i = pos + 1
+        while i < len(line):
+            if line[i] == "\\":
+                i += 2
+                continue
+            if line[i] == c:
+                body = line[pos + 1 : i]
+                if c == "`" and "${" in body:
+                    return None
+                return _unescape(body), i + 1, c
+            i += 1
+        return None
+    for word, value in (("true", True), ("false", False)):
+        if line.startswith(word, pos) and not line[pos + len(word) : pos + len(word) + 1].isalnum():
+            return value, pos + len(word), ""
+    m = NUMBER_RE.match(line, pos)
+    if m:
+        text = m.group()
+        value = float(text) if any(ch in text for ch in ".eE") else int(text)
+        return value, m.end(), ""
+    return None
+
+
+def iter_lines(path: Path) -> Iterator[Tuple[int, bytes]]:
+    """(byte offset, raw line) pairs, streamed from the file."""
+    offset = 0
+    with open(path, "rb", buffering=BUFFER_SIZE) as f:
+        for raw in f:
+            yield offset, raw
+            offset += len(raw)
+
+
+def read_artifact(path: Path) -> Artifact:
+    """One streaming pass up to the LOCKED LOGIC header."""
+    art = Artifact(path)
+    in_ui_text = False
+    for lineno, (offset, raw) in enumerate(iter_lines(path)):
+        art.lines_read += 1
+        line = raw.decode("utf-8").rstrip("\r\n")
+        stripped = line.strip()
+        if not stripped:
+            continue
+
+        if "BLOCK" in stripped and "—" in stripped:
+            header = Header(lineno, stripped)
+            if header.number is not None:
+                art.blocks.append(header)
+                in_ui_text = False
+                if "LOCKED LOGIC" in stripped:
+                    break
+                continue
+
+        if art.title is None and stripped.startswith("Title:"):
+            art.title = stripped.split(":", 1)[1].strip()
+            continue
+
+        if in_ui_text:
+            if stripped.startswith("}"):
+                in_ui_text = False
+                continue
+            m = ENTRY_RE.match(line)
+            if m:
+                key = m.group(1) or m.group(2) or m.group(3)
+                _add_knob(art, key, "public", line, m.end(), lineno, offset)
+            continue
+
+        if UI_TEXT_RE.match(line):
+            in_ui_text = art.has_ui_text = True
+            continue
+        m = CONST_RE.match(line)
+        if m:
+            rest = line[m.end():].lstrip()
+            if rest[:1] in ("[", "{"):
+                art.skipped.append(m.group(1))
+            else:
+                _add_knob(art, m.group(1), "tuning", line, m.end(), lineno, offset)
+    trace.count("lines", art.lines_read)
+    trace.count("knobs", len(art.knobs))
+    return art
+
+
+def _add_knob(art: Artifact, key: str, zone: str, line: str, pos: int, lineno: int, offset: int) -> None:
+    literal = scan_literal(line, pos)
+    tail = TAIL_RE.match(line, literal[1]) if literal else None
+    if tail is None:
+        art.issues.append(f"line {lineno + 1}: {key} is not a plain string, number or true/false value")
+        return
+    value, end, quote = literal
+    comment = tail.group("line") if tail.group("line") is not None else tail.group("block")
+    # Byte offsets: the line is UTF-8, so count the encoded prefix
+    start = offset + len(line[:pos].encode("utf-8"))
+    art.knobs.append(HtmlKnob(key, value, zone, len(art.blocks) - 1, lineno,
+                              comment or None, start, line[pos:end].encode("utf-8"), quote))
+
+
+def artifact_model(art: Artifact) -> Dict[str, Any]:
+    """The card tools' knob model (see cavecode_export.card_model), plus byte spans."""
+    model: Dict[str, Any] = {"source": str(art.path), "title": art.title, "blocks": []}
+    for header in art.blocks:
+        model["blocks"].append({"header": header.text, "number": header.number,
+                                "line": header.lineno, "knobs": []})
+    loose: List[Dict[str, Any]] = []
+    for knob in art.knobs:
+        entry = {"key": knob.key, "value": knob.value, "type": type_of(knob.value),
+                 "zone": knob.zone, "line": knob.lineno, "span": [knob.start, knob.end]}
+        if knob.comment is not None:
+            entry["comment"] = knob.comment
+        (model["blocks"][knob.block]["knobs"] if knob.block >= 0 else loose).append(entry)
+    if loose:
+        model["knobs"] = loose
+    return model
+
+
+# ----------------------------------------------------------------------
+# Checking
+# ----------------------------------------------------------------------
+
+def check_artifact(art: Artifact) -> List[str]:
+    messages: List[str] = []
+    titles = [h.text.split("—", 1)[1] for h in art.blocks]
+    for name, keywords in REQUIRED_BLOCKS.items():
+        if not any(k in t for t in titles for k in keywords):
+            messages.append(f"ERROR: Missing required block: {name}")
+
+    tuning = [k for k in art.knobs if k.zone == "tuning"]
+    public = [k for k in art.knobs if k.zone == "public"]
+    if not tuning:
+        messages.append("ERROR: No knobs found (const NAME = value;) before LOCKED LOGIC.")
+    if not art.has_ui_text:
+        messages.append("WARN: No UI_TEXT object found in PUBLIC TEXT.")
+    elif not public:
+        messages.append("WARN: UI_TEXT has no entries.")
+
+    for zone, knobs in (("const", tuning), ("UI_TEXT key", public)):
+        seen: Dict[str, int] = {}
+        for k in knobs:
+            if k.key in seen:
+                messages.append(f"ERROR: Duplicate {zone} {k.key} on lines {seen[k.key] + 1} and {k.lineno + 1}")
+            seen.setdefault(k.key, k.lineno)
+    for k in public:
+        if k.value == "":
+            messages.append(f"WARN: UI_TEXT.{k.key} is empty (line {k.lineno + 1})")
+    messages.extend(f"WARN: {issue}" for issue in art.issues)
+    return messages
+
+
+def summarize(messages: List[str]) -> str:
+    if any(m.startswith("ERROR") for m in messages):
+        return "FAIL"
+    return "PASS WITH WARNINGS" if messages else "PASS"
+
+
+# ----------------------------------------------------------------------
+# Rewriting
+# ----------------------------------------------------------------------
+
+def js_literal(value: str, knob: HtmlKnob) -> str:
+    """value (as typed on the command line) in the knob's own type and quoting."""
+    if knob.quote:
+        q = knob.quote
+        escaped = value.replace("\\", "\\\\").replace(q, "\\" + q)
+        if q != "`":
+            escaped = escaped.replace("\n", "\\n").replace("\r", "\\r")
+        else:
+            escaped = escaped.replace("${", "\\${")
+        # Inside an inline <script>, "</script>" or "<!--" in the value
+        # would end the script or change how the HTML parser reads it
+        escaped = escaped.replace("</", "<\\/").replace("<!--", "<\\!--")
+        return q + escaped + q
+    typed = coerce_value(value)
+    if isinstance(knob.value, bool):
+        if not isinstance(typed, bool):
+            raise ArtifactError(f"{knob.name} is true/false, got {value!r}")
+        return "true" if typed else "false"
+    if isinstance(typed, bool) or not isinstance(typed, (int, float)):
+        raise ArtifactError(f"{knob.name} is a number, got {value!r}")
+    return value.strip()
+
+
+def plan_edits(art: Artifact, updates: Dict[str, str]) -> Tuple[List[Tuple[HtmlKnob, bytes]], List[str]]:
+    """(knob, new literal bytes) for every value that changes, and names not in this artifact."""
+    edits: List[Tuple[HtmlKnob, bytes]] = []
+    absent: List[str] = []
+    for name, value in updates.items():
+        found = art.find(name)
+        if not found:
+            absent.append(name)
+            continue
+        if len(found) > 1:
+            raise ArtifactError(f"{name} is defined {len(found)} times"
+                                + ("" if name.startswith("UI_TEXT.") else f" (try UI_TEXT.{name})"))
+        knob = found[0]
+        literal = js_literal(value, knob).encode("utf-8")
+        if literal != knob.raw:
+            edits.append((knob, literal))
+    edits.sort(key=lambda e: e[0].start)
+    return edits, absent
+
+
+def apply_edits(path: Path, edits: List[Tuple[HtmlKnob, bytes]]) -> str:
+    """
+    Writes the new literals at their byte spans and returns "in place" or
+    "rebuilt". Each span is checked to still hold the literal that was
+    read, so a file edited in the meantime is never patched blind.
+    """
+    with open(path, "r+b") as f:
+        for knob, _ in edits:
+            f.seek(knob.start)
+            if f.read(len(knob.raw)) != knob.raw:
+                raise ArtifactError(f"{knob.name} changed on disk since it was read")
+        if all(len(new) == knob.end - knob.start for knob, new in edits):
+            for knob, new in edits:
+                f.seek(knob.start)
+                f.write(new)
+            return "in place"
+
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+        try:
+            with open(fd, "wb", buffering=BUFFER_SIZE) as out:
+                pos = 0
+                for knob, new in edits:
+                    _copy_range(f, out, pos, knob.start)
+                    out.write(new)
+                    pos = knob.end
+                f.seek(pos)
+                while True:
+                    chunk = f.read(BUFFER_SIZE)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                out.flush()
+                os.fsync(out.fileno())
+            os.chmod(tmp_name, stat.S_IMODE(os.stat(path).st_mode))
+            os.replace(tmp_name, path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+    return "rebuilt"
+
+
+def _copy_range(src, dst, start: int, end: int) -> None:
+    src.seek(start)
+    left = end - start
+    while left > 0:
+        chunk = src.read(min(BUFFER_SIZE, left))
+        if not chunk:
+            break
+        dst.write(chunk)
+        left -= len(chunk)
+
+
+# ----------------------------------------------------------------------
+# Commands
+# ----------------------------------------------------------------------
+
+def iter_artifacts(targets: List[str]) -> Iterator[Path]:
+    for target in targets:
+        if os.path.isdir(target):
+            yield from sorted(p for p in Path(target).rglob("*") if p.suffix in EXTENSIONS)
+        elif glob.has_magic(target):
+            yield from (Path(p) for p in sorted(glob.glob(target, recursive=True)))
+        else:
+            yield Path(target)
+
+
+def load(path: Path) -> Artifact:
+    trace.count("files")
+    with trace.phase("read"):
+        return read_artifact(path)
+
+
+def cmd_show(args: List[str]) -> int:
+    as_json = "--json" in args
+    targets = [a for a in args if a != "--json"]
+    if not targets:
+        print("Usage:" + USAGE, file=sys.stderr)
+        return 1
+    failed = 0
+    models = []
+    for path in iter_artifacts(targets):
+        try:
+            art = load(path)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"ERROR: {path}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        if as_json:
+            models.append(artifact_model(art))
+            continue
+        print(f"{path}" + (f" — {art.title}" if art.title else ""))
+        for knob in art.knobs:
+            print(f"    {knob.name} = {json.dumps(knob.value, ensure_ascii=False)}")
+    if as_json:
+        print(json.dumps(models, ensure_ascii=False, indent=1))
+    return 1 if failed else 0
+
+
+def cmd_check(args: List[str]) -> int:
+    if not args:
+        print("Usage:" + USAGE, file=sys.stderr)
+        return 1
+    counts = {"PASS": 0, "PASS WITH WARNINGS": 0, "FAIL": 0}
+    for path in iter_artifacts(args):
+        try:
+            art = load(path)
+        except (OSError, UnicodeDecodeError) as e:
+            status, messages = "FAIL", [f"ERROR: Cannot read file: {e}"]
+        else:
+            with trace.phase("rules"):
+                messages = check_artifact(art)
+            status = summarize(messages)
+        counts[status] += 1
+        print(f"{path}: {status}")
+        for m in messages:
+            print(f"    - {m}")
+    total = sum(counts.values())
+    print(f"\nSummary: {total} files — {counts['PASS']} PASS, "
+          f"{counts['PASS WITH WARNINGS']} PASS WITH WARNINGS, {counts['FAIL']} FAIL")
+    return 1 if counts["FAIL"] or not total else 0
+
+
+def cmd_set(args: List[str]) -> int:
+    dry_run = "--dry-run" in args
+    args = [a for a in args if a != "--dry-run"]
+    updates: Dict[str, str] = {}
+    targets: List[str] = []
+    for arg in args:
+        name, sep, value = arg.partition("=")
+        if sep and re.fullmatch(r"(UI_TEXT\.)?[A-Z][A-Z0-9_]*", name) and not os.path.exists(arg):
+            updates[name] = value
+        else:
+            targets.append(arg)
+    if not updates or not targets:
+        print("Usage:" + USAGE, file=sys.stderr)
+        return 1
+
+    changed = unchanged = without = failed = 0
+    for path in iter_artifacts(targets):
+        try:
+            art = load(path)
+            edits, absent = plan_edits(art, updates)
+            for name in absent:
+                print(f"{path}: no {name}, skipped", file=sys.stderr)
+            if not edits:
+                if len(absent) == len(updates):
+                    without += 1
+                else:
+                    unchanged += 1
+                continue
+            with trace.phase("write"):
+                how = None if dry_run else apply_edits(path, edits)
+        except (OSError, UnicodeDecodeError, ArtifactError) as e:
+            print(f"ERROR: {path}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        changed += 1
+        for knob, new in edits:
+            print(f"{path}: {knob.name} {knob.raw.decode('utf-8')} → {new.decode('utf-8')}")
+        print(f"{path}: {len(edits)} value(s) " + ("to write" if dry_run else f"written ({how})"))
+    verb = "would change" if dry_run else "changed"
+    print(f"\n{changed} file(s) {verb}, {unchanged} already set, "
+          f"{without} without these knobs, {failed} failed.")
+    return 1 if failed else 0
+
+
+COMMANDS = {"show": cmd_show, "check": cmd_check, "set": cmd_set}
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv if argv is None else argv
+    trace.start("html")
+    if len(argv) < 2 or argv[1] not in COMMANDS:
+        print("Usage:" + USAGE, file=sys.stderr)
+        sys.exit(1)
+    sys.exit(COMMANDS[argv[1]](argv[2:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+CaveCode Knob Index v1.0
+
+Keeps a SQLite index of every TUNING KNOBS and PUBLIC TEXT entry across
+a card repository, so questions like "which cards set MAX_LIVES > 3?"
+or "where is SPEED_BASE defined?" are answered without opening cards.
+
+Usage:
+    python cavecode_index.py build [--db PATH] <dir | file> ...
+    python cavecode_index.py query [--db PATH] [--name NAME] [--block TEXT]
+                                   [--zone tuning|public] [--value TEXT]
+                                   [--min N] [--max N] [--gt N] [--lt N] [--json]
+
+Examples:
+    python cavecode_index.py build cards/ examples/
+    python cavecode_index.py query --name MAX_LIVES --gt 3
+    python cavecode_index.py query --name SPEED_BASE
+    python cavecode_index.py query --name "*_TEXT" --zone public
+
+Knobs are picked out with the same block selection the compiler uses
+(tuning_blocks / public_text_blocks in cavecode_to_code.py). Rebuilds
+are incremental: unchanged files (same mtime and size, or same content
+hash) are skipped, changed files are re-indexed, deleted files dropped.
+NAME accepts * and ? wildcards.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "compiler"))
+import cavecode_trace as trace
+from cavecode_parser import coerce_value, parse_text
+from cavecode_to_code import public_text_blocks, tuning_blocks
+
+DEFAULT_DB = ".cavecode-index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id       INTEGER PRIMARY KEY,
+    path     TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size     INTEGER NOT NULL,
+    sha256   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS knobs (
+    file_id  INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    zone     TEXT NOT NULL,
+    block    TEXT NOT NULL,
+    line     INTEGER NOT NULL,
+    name     TEXT NOT NULL,
+    value    TEXT NOT NULL,
+    type     TEXT NOT NULL,
+    num      REAL
+);
+CREATE INDEX IF NOT EXISTS knobs_name ON knobs(name, num);
+CREATE INDEX IF NOT EXISTS knobs_block ON knobs(block);
+CREATE INDEX IF NOT EXISTS knobs_file ON knobs(file_id);
+"""
+
+USAGE = __doc__.split("Examples:")[0].strip()
+
+
+def open_index(db_path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def type_of(value) -> Tuple[str, Optional[float]]:
+    if isinstance(value, bool):
+        return "bool", float(value)
+    if isinstance(value, int):
+        return "int", float(value)
+    if isinstance(value, float):
+        return "float", value
+    return "str", None
+
+
+def knob_rows(text: str, path: Path) -> Iterator[Tuple]:
+    """(zone, block, line, name, value, type, num) for each indexed knob."""
+    doc = parse_text(text, path)
+    for zone, blocks in (("tuning", tuning_blocks(doc)), ("public", public_text_blocks(doc))):
+        for block in blocks:
+            for knob in block.knobs:
+                kind, num = type_of(knob.typed)
+                yield zone, block.header.text, knob.lineno + 1, knob.key, knob.value, kind, num
+
+
+def iter_cards(targets: Iterable[str]) -> Iterator[str]:
+    for target in targets:
+        if os.path.isdir(target):
+            for p in sorted(Path(target).rglob("*.cavecode")):
+                yield os.path.normpath(str(p))
+        else:
+            yield os.path.normpath(target)
+
+
+def build(conn: sqlite3.Connection, targets: List[str]) -> Tuple[int, int, int]:
+    """Returns (indexed, skipped, removed) file counts."""
+    known = {
+        row[0]: row[1:]
+        for row in conn.execute("SELECT path, id, mtime_ns, size, sha256 FROM files")
+    }
+    seen = set()
+    indexed = skipped = removed = 0
+
+    with conn:
+        for path in iter_cards(targets):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            seen.add(path)
+            prev = known.get(path)
+            if prev and prev[1] == st.st_mtime_ns and prev[2] == st.st_size:
+                skipped += 1
+                continue
+
+            with trace.phase("read"):
+                data = Path(path).read_bytes()
+            digest = hashlib.sha256(data).hexdigest()
+            if prev and prev[3] == digest:
+                # Touched but not changed: just remember the new stat
+                conn.execute("UPDATE files SET mtime_ns = ?, size = ? WHERE id = ?",
+                             (st.st_mtime_ns, st.st_size, prev[0]))
+                skipped += 1
+                continue
+
+            try:
+                text = data.decode("utf-8")
+            except UnicodeDecodeError:
+                print(f"WARN: {path}: not UTF-8, skipped", file=sys.stderr)
+                if prev:
+                    # Its old knobs no longer describe the file (knobs cascade)
+                    conn.execute("DELETE FROM files WHERE id = ?", (prev[0],))
+                    removed += 1
+                continue
+
+            if prev:
+                file_id = prev[0]
+                conn.execute("DELETE FROM knobs WHERE file_id = ?", (file_id,))
+                conn.execute("UPDATE files SET mtime_ns = ?, size = ?, sha256 = ? WHERE id = ?",
+                             (st.st_mtime_ns, st.st_size, digest, file_id))
+            else:
+                file_id = conn.execute(
+                    "INSERT INTO files (path, mtime_ns, size, sha256) VALUES (?, ?, ?, ?)",
+                    (path, st.st_mtime_ns, st.st_size, digest),
+                ).lastrowid
+            with trace.phase("store"):
+                conn.executemany(
+                    "INSERT INTO knobs (file_id, zone, block, line, name, value, type, num)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((file_id,) + row for row in knob_rows(text, Path(path))),
+                )
+            indexed += 1
+            trace.count("files")
+
+        # Drop files that vanished from the paths we were just given
+        roots = [os.path.normpath(t) for t in targets if os.path.isdir(t)]
+        named = {os.path.normpath(t) for t in targets}
+        for path, (file_id, *_rest) in known.items():
+            if path in seen:
+                continue
+            if path in named or any(path.startswith(root + os.sep) for root in roots):
+                conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+                removed += 1
+
+    return indexed, skipped, removed
+
+
+def query(
+    conn: sqlite3.Connection,
+    name: Optional[str] = None,
+    block: Optional[str] = None,
+    zone: Optional[str] = None,
+    value: Optional[str] = None,
+    minimum: Optional[float] = None,
+    maximum: Optional[float] = None,
+    above: Optional[float] = None,
+    below: Optional[float] = None,
+) -> List[Tuple]:
+    """Returns (path, line, zone, block, name, value, type) rows."""
+    where = []
+    params: List = []
+    if name:
+        where.append("k.name GLOB ?")
+        params.append(name)
+    if block:
+        where.append("instr(k.block, ?) > 0")
+        params.append(block)
+    if zone:
+        where.append("k.zone = ?")
+        params.append(zone)
+    if value is not None:
+        where.append("k.value = ?")
+        params.append(value)
+    for op, bound in ((">=", minimum), ("<=", maximum), (">", above), ("<", below)):
+        if bound is not None:
+            where.append(f"k.num {op} ?")
+            params.append(bound)
+
+    sql = (
+        "SELECT f.path, k.line, k.zone, k.block, k.name, k.value, k.type"
+        " FROM knobs k JOIN files f ON f.id = k.file_id"
+    )
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY f.path, k.line"
+    return conn.execute(sql, params).fetchall()
+
+
+def parse_args(argv):
+    if len(argv) < 2 or argv[1] not in ("build", "query"):
+        print(USAGE, file=sys.stderr)
+        sys.exit(1)
+    opts = {"command": argv[1], "db": DEFAULT_DB, "targets": [], "json": False}
+    numeric = {"--min": "minimum", "--max": "maximum", "--gt": "above", "--lt": "below"}
+    text = {"--name": "name", "--block": "block", "--zone": "zone", "--value": "value"}
+    i = 2
+    while i < len(argv):
+        arg = argv[i]
+        if arg == "--db" and i + 1 < len(argv):
+            opts["db"] = argv[i + 1]
+            i += 2
+        elif arg in numeric and i + 1 < len(argv):
+            try:
+                opts[numeric[arg]] = float(argv[i + 1])
+            except ValueError:
+                print(USAGE, file=sys.stderr)
+                sys.exit(1)
+            i += 2
+        elif arg in text and i + 1 < len(argv):
+            opts[text[arg]] = argv[i + 1]
+            i += 2
+        elif arg == "--json":
+            opts["json"] = True
+            i += 1
+        else:
+            opts["targets"].append(arg)
+            i += 1
+    return opts
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv if argv is None else argv
+    trace.start("index")
+    opts = parse_args(argv)
+    conn = open_index(Path(opts["db"]))
+
+    if opts["command"] == "build":
+        if not opts["targets"]:
+            print("Usage: cavecode_index.py build [--db PATH] <dir | file> ...", file=sys.stderr)
+            sys.exit(1)
+        indexed, skipped, removed = build(conn, opts["targets"])
+        (files,) = conn.execute("SELECT COUNT(*) FROM files").fetchone()
+        (knobs,) = conn.execute("SELECT COUNT(*) FROM knobs").fetchone()
+        print(f"Indexed {indexed}, unchanged {skipped}, removed {removed} — "
+              f"{files} files / {knobs} knobs in {opts['db']}")
+        return
+
+    with trace.phase("query"):
+        rows = query(
+            conn,
+            name=opts.get("name"),
+            block=opts.get("block"),
+            zone=opts.get("zone"),
+            value=opts.get("value"),
+            minimum=opts.get("minimum"),
+            maximum=opts.get("maximum"),
+            above=opts.get("above"),
+            below=opts.get("below"),
+        )
+    for path, line, zone, block, name, value, kind in rows:
+        if opts["json"]:
+            print(json.dumps({
+                "path": path, "line": line, "zone": zone, "block": block,
+                "name": name, "value": coerce_value(value), "type": kind,
+            }, ensure_ascii=False))
+        else:
+            print(f"{path}:{line}  {name} = {value}  [{block}]")
+    if not rows:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+CaveCode Structural Diff / Merge v1.0
+
+Compares cards block by block and knob by knob instead of line by line,
+so only changes that mean something are reported:
+
+    BLOCK 3 — TUNING KNOBS
+        ~ SPEED_BASE: 6.0 → 7.5
+        + GRAVITY: 0.4
+        - OLD_FLAG: true
+
+Blocks are matched by number and knobs by key. Headers are compared after
+the fixer's normalization (cavecode_fix_v1.fix_header_line), so a glyph
+or title fixed by the fixer is not a change; neither is a value written
+differently (6 vs 6.0), re-aligned, or a moved line within a block.
+
+Usage:
+    python cavecode_merge.py diff [--json] OLD NEW
+    python cavecode_merge.py merge [-o OUT | --in-place] BASE OURS THEIRS
+
+    # As a git merge driver (.gitattributes: *.cavecode merge=cavecode)
+    git config merge.cavecode.driver "python tools/merge/cavecode_merge.py merge --in-place %O %A %B"
+
+Merging is a three-way merge per block and per knob:
+
+    - a knob changed on one side only takes that side's line
+    - both sides changing a knob to the same value is not a conflict
+    - the non-knob text of a block (comments, prose) merges as a whole:
+      the side that changed it wins, and both changing it is a conflict
+    - blocks added on either side are kept; a block deleted on one side
+      and left alone on the other is deleted
+
+Conflicts are written between <<<<<<< ours / ======= / >>>>>>> theirs
+markers and listed on stderr. diff exits 1 when the cards differ; merge
+exits 1 when there are conflicts (0 for a clean merge).
+
+Every step is a dict lookup or a list comparison, so both commands run in
+time linear in the size of the cards.
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "fixer"))
+import cavecode_trace as trace
+from cavecode_fix_v1 import fix_header_line
+from cavecode_parser import Knob, coerce_value, parse_text
+
+PREAMBLE = ""     # section key of the lines before the first header
+
+USAGE = __doc__.split("Merging is")[0].split("Usage:")[1].rstrip()
+
+
+class Section:
+    """The preamble or one block: header, body lines and knobs by key."""
+
+    __slots__ = ("key", "header", "lines", "knobs", "_text")
+
+    def __init__(self, key: str, header: Optional[str], lines: List[str], knobs: List[Knob], first: int):
+        self.key = key
+        self.header = header          # raw header line, None for the preamble
+        self.lines = lines            # body lines
+        # key -> (index into lines, knob); repeated keys become KEY#2, KEY#3, ...
+        self.knobs: Dict[str, Tuple[int, Knob]] = {}
+        seen: Dict[str, int] = {}
+        for knob in knobs:
+            n = seen[knob.key] = seen.get(knob.key, 0) + 1
+            name = knob.key if n == 1 else f"{knob.key}#{n}"
+            while name in self.knobs:       # a literal "KEY#2" knob already took it
+                n = seen[knob.key] = n + 1
+                name = f"{knob.key}#{n}"
+            self.knobs[name] = (knob.lineno - first, knob)
+        self._text: Optional[Tuple[str, ...]] = None
+
+    @property
+    def title(self) -> str:
+        return self.header.strip() if self.header is not None else "(before the first block)"
+
+    def norm_header(self) -> Optional[str]:
+        return fix_header_line(self.header.strip()) if self.header is not None else None
+
+    def text(self) -> Tuple[str, ...]:
+        """Non-knob lines, trailing whitespace and trailing blank lines dropped."""
+        if self._text is None:
+            knob_lines = {i for i, _ in self.knobs.values()}
+            text = [line.rstrip() for i, line in enumerate(self.lines) if i not in knob_lines]
+            while text and not text[-1]:
+                text.pop()
+            self._text = tuple(text)
+        return self._text
+
+    def knob_sig(self, name: str):
+        entry = self.knobs.get(name)
+        return None if entry is None else knob_sig(entry[1])
+
+    def sig(self):
+        return (self.norm_header(), self.text(),
+                {name: knob_sig(k) for name, (_, k) in self.knobs.items()})
+
+    def knob_line(self, name: str) -> str:
+        return self.lines[self.knobs[name][0]]
+
+
+class Card:
+    __slots__ = ("sections", "newline", "final_newline")
+
+    def __init__(self, sections: Dict[str, Section], newline: str, final_newline: bool):
+        self.sections = sections      # in card order
+        self.newline = newline
+        self.final_newline = final_newline
+
+
+def semantic(value: str) -> Tuple[str, Any]:
+    """6, 6.0 and "6" compare equal; true never equals 1."""
+    typed = coerce_value(value)
+    if isinstance(typed, bool):
+        return "bool", typed
+    if isinstance(typed, (int, float)):
+        return "num", typed
+    return "str", typed
+
+
+def knob_sig(knob: Knob):
+    return semantic(knob.value), knob.comment
+
+
+def read_card(text: str, path: Optional[Path] = None) -> Card:
+    with trace.phase("parse"):
+        doc = parse_text(text, path)
+    sections: Dict[str, Section] = {}
+    first = doc.blocks[0].header.lineno if doc.blocks else len(doc.lines)
+    sections[PREAMBLE] = Section(PREAMBLE, None, doc.lines[:first], [], 0)
+    seen: Dict[str, int] = {}
+    for block in doc.blocks:
+        base = block.number or block.header.text
+        n = seen[base] = seen.get(base, 0) + 1
+        key = base if n == 1 else f"{base}#{n}"
+        sections[key] = Section(key, doc.lines[block.header.lineno], block.lines,
+                                block.knobs, block.start)
+    newline = "\r\n" if "\r\n" in text else "\n"
+    return Card(sections, newline, text.endswith(("\n", "\r")))
+
+
+def load_card(path: Path) -> Card:
+    with trace.phase("read"):
+        # newline="" keeps \r\n, so the merged card keeps the line endings
+        with open(path, encoding="utf-8", newline="") as f:
+            text = f.read()
+    trace.count("files")
+    return read_card(text, path)
+
+
+# ----------------------------------------------------------------------
+# Diff
+# ----------------------------------------------------------------------
+
+def diff_cards(old: Card, new: Card) -> List[Dict[str, Any]]:
+    """Semantic changes from old to new, in card order."""
+    changes: List[Dict[str, Any]] = []
+    keys = list(old.sections) + [k for k in new.sections if k not in old.sections]
+    for key in keys:
+        a = old.sections.get(key)
+        b = new.sections.get(key)
+        if a is None or b is None:
+            s = a or b
+            changes.append({"kind": "block-added" if a is None else "block-removed",
+                            "block": key, "header": s.title, "lines": len(s.lines)})
+            continue
+        where = {"block": key, "header": b.title}
+        if a.norm_header() != b.norm_header():
+            changes.append(dict(where, kind="header-changed", old=a.title, new=b.title))
+        for name, (_, knob) in a.knobs.items():
+            other = b.knobs.get(name)
+            if other is None:
+                changes.append(dict(where, kind="knob-removed", key=name, old=knob.value))
+            elif semantic(knob.value) != semantic(other[1].value):
+                changes.append(dict(where, kind="knob-changed", key=name,
+                                    old=knob.value, new=other[1].value))
+            elif knob.comment != other[1].comment:
+                changes.append(dict(where, kind="comment-changed", key=name,
+                                    old=knob.comment, new=other[1].comment))
+        for name, (_, knob) in b.knobs.items():
+            if name not in a.knobs:
+                changes.append(dict(where, kind="knob-added", key=name, new=knob.value))
+        if a.text() != b.text():
+            added, removed = _line_delta(a.text(), b.text())
+            changes.append(dict(where, kind="text-changed", added=added, removed=removed))
+    return changes
+
+
+def _line_delta(old: Tuple[str, ...], new: Tuple[str, ...]) -> Tuple[int, int]:
+    """(added, removed) line counts, ignoring order (linear, via counts)."""
+    counts: Dict[str, int] = {}
+    for line in old:
+        counts[line] = counts.get(line, 0) + 1
+    added = 0
+    for line in new:
+        if counts.get(line, 0) > 0:
+            counts[line] -= 1
+        else:
+            added += 1
+    return added, sum(counts.values())
+
+
+def print_changes(changes: List[Dict[str, Any]], out=sys.stdout) -> None:
+    current = None
+    for c in changes:
+        kind = c["kind"]
+        if kind in ("block-added", "block-removed"):
+            sign = "+" if kind == "block-added" else "-"
+            print(f"{sign} {c['header']} ({c['lines']} lines)", file=out)
+            current = None
+            continue
+        if c["block"] != current:
+            print(c["header"], file=out)
+            current = c["block"]
+        if kind == "header-changed":
+            print(f"    ~ header: {c['old']} → {c['new']}", file=out)
+        elif kind == "knob-changed":
+            print(f"    ~ {c['key']}: {c['old']} → {c['new']}", file=out)
+        elif kind == "comment-changed":
+            print(f"    ~ {c['key']} comment: {c['old']!r} → {c['new']!r}", file=out)
+        elif kind == "knob-added":
+            print(f"    + {c['key']}: {c['new']}", file=out)
+        elif kind == "knob-removed":
+            print(f"    - {c['key']}: {c['old']}", file=out)
+        elif kind == "text-changed":
+            print(f"    ~ text: {c['added']} lines added, {c['removed']} removed", file=out)
+
+
+# ----------------------------------------------------------------------
+# Merge
+# ----------------------------------------------------------------------
+
+class Merge:
+    """Three-way merge of BASE, OURS and THEIRS into lines of the result."""
+
+    def __init__(self, base: Card, ours: Card, theirs: Card):
+        self.base = base
+        self.ours = ours
+        self.theirs = theirs
+        self.out: List[str] = []
+        self.conflicts: List[str] = []
+
+    def conflict(self, what: str, ours: List[str], theirs: List[str]) -> None:
+        self.conflicts.append(what)
+        self.out.append("<<<<<<< ours")
+        self.out.extend(ours)
+        self.out.append("=======")
+        self.out.extend(theirs)
+        self.out.append(">>>>>>> theirs")
+
+    def run(self) -> List[str]:
+        with trace.phase("merge"):
+            for key in self.order():
+                self.merge_section(key, self.base.sections.get(key),
+                                   self.ours.sections.get(key), self.theirs.sections.get(key))
+        return self.out
+
+    def order(self) -> List[str]:
+        """Ours' block order; blocks only theirs has go after their predecessor in theirs."""
+        after: Dict[Optional[str], List[str]] = {}
+        prev: Optional[str] = None
+        for key in self.theirs.sections:
+            if key not in self.ours.sections:
+                after.setdefault(prev, []).append(key)
+            else:
+                prev = key
+        order: List[str] = list(after.pop(None, []))
+        for key in self.ours.sections:
+            order.append(key)
+            order.extend(after.pop(key, []))
+        for keys in after.values():
+            order.extend(keys)
+        return order
+
+    @staticmethod
+    def lines_of(s: Section) -> List[str]:
+        return ([s.header] if s.header is not None else []) + s.lines
+
+    def merge_section(self, key: str, b: Optional[Section], o: Optional[Section], t: Optional[Section]) -> None:
+        if o is None and t is None:
+            return                                    # deleted on both sides
+        if o is None or t is None:
+            kept = o or t
+            if b is None:
+                self.out.extend(self.lines_of(kept))  # added on one side
+            elif kept.sig() != b.sig():
+                what = f"{kept.title}: changed by {'ours' if o else 'theirs'}, " \
+                       f"deleted by {'theirs' if o else 'ours'}"
+                self.conflict(what, self.lines_of(o) if o else [], self.lines_of(t) if t else [])
+            return                                    # else deleted, untouched on the other side
+        if b is None:
+            b = Section(key, None, [], [], 0)         # added on both sides: merge against nothing
+
+        # Header: compared as the fixer would write it
+        header = o.header
+        if o.header is not None:
+            hb, ho, ht = b.norm_header(), o.norm_header(), t.norm_header()
+            if ho == ht or ht == hb:
+                header = o.header if ho != hb or o.header != b.header else t.header
+            elif ho == hb:
+                header = t.header
+            else:
+                self.conflict(f"{o.title}: header", [o.header], [t.header])
+                header = None
+
+        # Text: the side that changed it wins
+        tb, to, tt = b.text(), o.text(), t.text()
+        if to == tt or tt == tb:
+            skeleton = o
+        elif to == tb:
+            skeleton = t
+        else:
+            if header is not None:
+                self.out.append(header)
+            self.conflict(f"{o.title}: text", o.lines, t.lines)
+            return
+        if header is not None:
+            self.out.append(header)
+
+        # Knobs: per key
+        merged: Dict[str, Optional[List[str]]] = {}
+        names = list(o.knobs) + [n for n in t.knobs if n not in o.knobs]
+        for name in names:
+            sb, so, st = b.knob_sig(name), o.knob_sig(name), t.knob_sig(name)
+            if so == st or st == sb:
+                merged[name] = [o.knob_line(name)] if so is not None else None
+            elif so == sb:
+                merged[name] = [t.knob_line(name)] if st is not None else None
+            else:
+                self.conflicts.append(f"{o.title}: {name}")
+                merged[name] = (["<<<<<<< ours"] + ([o.knob_line(name)] if so is not None else [])
+                                + ["======="] + ([t.knob_line(name)] if st is not None else [])
+                                + [">>>>>>> theirs"])
+
+        # Lay the merged knobs over the skeleton side's lines
+        by_index = {i: name for name, (i, _) in skeleton.knobs.items()}
+        start = len(self.out)
+        insert_at: Optional[int] = None
+        for i, line in enumerate(skeleton.lines):
+            name = by_index.get(i)
+            if name is None:
+                self.out.append(line)
+                continue
+            lines = merged.pop(name, None)
+            if lines:
+                self.out.extend(lines)
+            insert_at = len(self.out)
+        pending = [lines for lines in merged.values() if lines]
+        if pending:
+            if insert_at is None:
+                # No knob lines to follow: before the block's trailing blank lines
+                insert_at = len(self.out)
+                while insert_at > start and not self.out[insert_at - 1].strip():
+                    insert_at -= 1
+            self.out[insert_at:insert_at] = [line for lines in pending for line in lines]
+
+
+def merge_cards(base: Card, ours: Card, theirs: Card) -> Tuple[str, List[str]]:
+    """(merged card text, conflict descriptions)."""
+    merge = Merge(base, ours, theirs)
+    lines = merge.run()
+    text = ours.newline.join(lines)
+    if lines and ours.final_newline:
+        text += ours.newline
+    return text, merge.conflicts
+
+
+# ----------------------------------------------------------------------
+# Commands
+# ----------------------------------------------------------------------
+
+def cmd_diff(args: List[str]) -> int:
+    as_json = "--json" in args
+    paths = [a for a in args if a != "--json"]
+    if len(paths) != 2:
+        print("Usage:" + USAGE, file=sys.stderr)
+        return 2
+    try:
+        old, new = (load_card(Path(p)) for p in paths)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+    with trace.phase("diff"):
+        changes = diff_cards(old, new)
+    if as_json:
+        print(json.dumps(changes, ensure_ascii=False, indent=1))
+    else:
+        print_changes(changes)
+    return 1 if changes else 0
+
+
+def cmd_merge(args: List[str]) -> int:
+    out: Optional[str] = None
+    in_place = False
+    paths: List[str] = []
+    i = 0
+    while i < len(args):
+        if args[i] in ("-o", "--out") and i + 1 < len(args):
+            out = args[i + 1]
+            i += 2
+        elif args[i] == "--in-place":
+            in_place = True
+            i += 1
+        else:
+            paths.append(args[i])
+            i += 1
+    if len(paths) != 3 or (out and in_place):
+        print("Usage:" + USAGE, file=sys.stderr)
+        return 2
+    try:
+        base, ours, theirs = (load_card(Path(p)) for p in paths)
+    except (OSError, UnicodeDecodeError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        return 2
+
+    text, conflicts = merge_cards(base, ours, theirs)
+    target = paths[1] if in_place else out
+    with trace.phase("write"):
+        if target is None:
+            sys.stdout.write(text)
+        else:
+            with open(target, "w", encoding="utf-8", newline="") as f:
+                f.write(text)
+    for what in conflicts:
+        print(f"CONFLICT: {what}", file=sys.stderr)
+    return 1 if conflicts else 0
+
+
+COMMANDS = {"diff": cmd_diff, "merge": cmd_merge}
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv if argv is None else argv
+    trace.start("merge")
+    if len(argv) < 2 or argv[1] not in COMMANDS:
+        print("Usage:" + USAGE, file=sys.stderr)
+        sys.exit(2)
+    sys.exit(COMMANDS[argv[1]](argv[2:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,52 @@
 #!/usr/bin/env python3
+"""
+CaveCode Scaffold v1.1
+
+Usage:
+    python cavecode_new_card.py "My New Game" > my-new-game.cavecode
+
+    # Many cards from a manifest (CSV with a header row, or JSONL)
+    python cavecode_new_card.py --manifest cards.csv --out cards/
+    python cavecode_new_card.py --manifest cards.jsonl --out seed.tar.gz
+    python cavecode_new_card.py --manifest cards.csv --out seed.zip
+    python cavecode_new_card.py --manifest - --format jsonl --out - --archive tar > seed.tar
+
+Manifest fields (only title is required; empty means the scaffold default):
+    title            card title
+    file             output name (default: the title, slugified)
+    SPEED_BASE, SPEED_INCREMENT, MAX_LIVES          🖍️ BLOCK 3 knobs
+    TITLE_TEXT, START_MESSAGE, GAME_OVER_TEXT       🌐 BLOCK 4 text
+
+The template is split into literal text and slots once; each card is
+one join over that skeleton. The whole manifest is checked before
+anything is written. Existing files in --out DIR are kept unless
+--force is given.
+"""
+
+import csv
+import io
+import json
+import os
+import re
+import string
 import sys
+import tarfile
+import time
+import zipfile
 from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 
-def main():
-    title = "New CaveCode Card"
-    if len(sys.argv) > 1:
-        title = sys.argv[1]
-
-    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%SZ")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+import cavecode_trace as trace
 
-    template = f"""\
+TEMPLATE = """\
 ========================================
 🪨 CAVECODE CARD — BLANK SCAFFOLD (v1.0)
 ========================================
 
 Title: {title}
-Created: {now}
+Created: {created}
 Source: scaffolded by CaveCode tools.
 
 ========================================
@@ -44,16 +75,16 @@ On Update:
 ========================================
 # Safe values for humans to tweak:
 
-SPEED_BASE:       6.0
-SPEED_INCREMENT:  0.4
-MAX_LIVES:        3
+SPEED_BASE:       {SPEED_BASE}
+SPEED_INCREMENT:  {SPEED_INCREMENT}
+MAX_LIVES:        {MAX_LIVES}
 
 ========================================
 🌐 BLOCK 4 — PUBLIC TEXT
 ========================================
-TITLE_TEXT:       "{title}"
-START_MESSAGE:    "Tap to begin."
-GAME_OVER_TEXT:   "Game over. Try again."
+TITLE_TEXT:       "{TITLE_TEXT}"
+START_MESSAGE:    "{START_MESSAGE}"
+GAME_OVER_TEXT:   "{GAME_OVER_TEXT}"
 
 ========================================
 📝 BLOCK 5 — HUMAN NOTES
@@ -62,7 +93,347 @@ GAME_OVER_TEXT:   "Game over. Try again."
 # This file is for humans first, machines second.
 """
 
-    sys.stdout.write(template)
+DEFAULT_TITLE = "New CaveCode Card"
+
+KNOB_DEFAULTS = {"SPEED_BASE": "6.0", "SPEED_INCREMENT": "0.4", "MAX_LIVES": "3"}
+TEXT_DEFAULTS = {"START_MESSAGE": "Tap to begin.", "GAME_OVER_TEXT": "Game over. Try again."}
+INT_KNOBS = {"MAX_LIVES"}
+
+# TITLE_TEXT defaults to the card's title
+FIELDS = ("title", "file", *KNOB_DEFAULTS, "TITLE_TEXT", *TEXT_DEFAULTS)
+
+ARCHIVES = {".tar": "tar", ".tgz": "tgz", ".tar.gz": "tgz", ".zip": "zip"}
+
+USAGE = (
+    "Usage: cavecode_new_card.py [TITLE]\n"
+    "       cavecode_new_card.py --manifest <file.csv | file.jsonl | -> [--format csv|jsonl]\n"
+    "                            --out <DIR | cards.tar | cards.tar.gz | cards.zip | -> "
+    "[--archive tar|tgz|zip] [--force]"
+)
+
+_LINE_BREAK_RE = re.compile(r"[\r\n\x0b\x0c\x1c-\x1e\x85\u2028\u2029]")
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+_NUMBER_RE = re.compile(r"-?\d+(\.\d+)?")
+
+
+class ManifestError(Exception):
+    pass
+
+
+class Skeleton:
+    """A template split once into literal parts and the slots between them."""
+
+    __slots__ = ("parts", "slots")
+
+    def __init__(self, template: str):
+        self.parts: List[str] = []
+        self.slots: List[Tuple[int, str]] = []     # (index into parts, field)
+        for literal, field, _, _ in string.Formatter().parse(template):
+            self.parts.append(literal)
+            if field is not None:
+                self.slots.append((len(self.parts), field))
+                self.parts.append("")
+
+    def render(self, values: Dict[str, str]) -> str:
+        parts = self.parts[:]
+        for i, field in self.slots:
+            parts[i] = values[field]
+        return "".join(parts)
+
+
+SKELETON = Skeleton(TEMPLATE)
+
+
+def card_values(title: str, created: str, overrides: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    values = {"title": title, "created": created, "TITLE_TEXT": title,
+              **KNOB_DEFAULTS, **TEXT_DEFAULTS}
+    if overrides:
+        values.update(overrides)
+    return values
+
+
+def render_card(title: str = DEFAULT_TITLE, now: Optional[str] = None,
+                overrides: Optional[Dict[str, str]] = None) -> str:
+    if now is None:
+        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%SZ")
+    return SKELETON.render(card_values(title, now, overrides))
+
+
+# ----------------------------------------------------------------------
+# Manifests
+# ----------------------------------------------------------------------
+
+def read_rows(stream, fmt: str) -> Iterator[Tuple[int, Dict[str, object]]]:
+    """(line number, raw row) for each manifest entry."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        unknown = [f for f in reader.fieldnames or [] if f not in FIELDS]
+        if unknown:
+            raise ManifestError(f"unknown column(s): {', '.join(unknown)}")
+        for row in reader:
+            yield reader.line_num, {k: v for k, v in row.items() if k is not None}
+        return
+    for lineno, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            raise ManifestError(f"line {lineno}: {e}")
+        if not isinstance(row, dict):
+            raise ManifestError(f"line {lineno}: expected a JSON object")
+        yield lineno, row
+
+
+def knob_text(key: str, value: object) -> str:
+    if isinstance(value, bool):
+        raise ValueError(f"{key} must be a number")
+    text = str(value).strip()
+    match = _NUMBER_RE.fullmatch(text)
+    if not match or (key in INT_KNOBS and match.group(1)):
+        raise ValueError(f"{key} must be {'an integer' if key in INT_KNOBS else 'a number'}, got {value!r}")
+    return text
+
+
+def slug(title: str) -> str:
+    return _SLUG_RE.sub("-", title.lower()).strip("-")
+
+
+def card_name(name: str) -> str:
+    if name in ("", ".", "..") or "/" in name or "\\" in name:
+        raise ValueError(f"file must be a plain file name, got {name!r}")
+    return name if name.endswith(".cavecode") else name + ".cavecode"
+
+
+def load_manifest(stream, fmt: str) -> List[Tuple[str, str, Dict[str, str]]]:
+    """
+    (file name, title, overrides) for every entry. Every problem in the
+    manifest is collected and raised together, before any card is written.
+    """
+    cards = []
+    errors = []
+    used = set()
+    for lineno, row in read_rows(stream, fmt):
+        try:
+            unknown = [k for k in row if k not in FIELDS]
+            if unknown:
+                raise ValueError(f"unknown field(s): {', '.join(unknown)}")
+            present = {k: v for k, v in row.items() if v is not None and v != ""}
+            title = str(present.get("title", "")).strip()
+            if not title:
+                raise ValueError("title is required")
+            overrides = {}
+            for key, value in present.items():
+                if key in KNOB_DEFAULTS:
+                    overrides[key] = knob_text(key, value)
+                elif key not in ("title", "file"):
+                    overrides[key] = str(value)
+            for key, value in [("title", title)] + list(overrides.items()):
+                # A line break would end the knob line early and break the card
+                if _LINE_BREAK_RE.search(value):
+                    raise ValueError(f"{key} must be a single line")
+                # Knob values end at "#"; the rest would read back as a comment
+                if key != "title" and "#" in value:
+                    raise ValueError(f"{key} cannot contain '#'")
+            if "TITLE_TEXT" not in overrides and "#" in title:
+                # TITLE_TEXT defaults to the title
+                raise ValueError("title contains '#', so TITLE_TEXT must be given without one")
+            if "file" in present:
+                name = card_name(str(present["file"]).strip())
+                if name in used:
+                    raise ValueError(f"duplicate file name {name}")
+            else:
+                base = slug(title) or "card"
+                name, n = base + ".cavecode", 2
+                while name in used:
+                    name, n = f"{base}-{n}.cavecode", n + 1
+            used.add(name)
+            cards.append((name, title, overrides))
+        except ValueError as e:
+            errors.append(f"line {lineno}: {e}")
+    if errors:
+        raise ManifestError("\n".join(errors))
+    return cards
+
+
+def manifest_format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    suffix = Path(path).suffix.lower()
+    if suffix == ".csv":
+        return "csv"
+    if suffix in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ManifestError(f"cannot tell the format of {path}; use --format csv|jsonl")
+
+
+# ----------------------------------------------------------------------
+# Output
+# ----------------------------------------------------------------------
+
+def archive_kind(out: str, archive: Optional[str]) -> Optional[str]:
+    if archive:
+        return archive
+    lowered = out.lower()
+    for suffix, kind in ARCHIVES.items():
+        if lowered.endswith(suffix):
+            return kind
+    return None
+
+
+def write_dir(cards: Iterator[Tuple[str, bytes]], out: Path, force: bool) -> Tuple[int, int]:
+    """Returns (written, kept) file counts."""
+    out.mkdir(parents=True, exist_ok=True)
+    written = kept = 0
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC if force else os.O_WRONLY | os.O_CREAT | os.O_EXCL
+    for name, data in cards:
+        try:
+            fd = os.open(out / name, flags, 0o644)
+        except FileExistsError:
+            kept += 1
+            continue
+        # One write per card
+        with open(fd, "wb", buffering=0) as f:
+            f.write(data)
+        written += 1
+    return written, kept
+
+
+def write_tar(cards: Iterator[Tuple[str, bytes]], stream, gzip: bool) -> int:
+    written = 0
+    now = int(time.time())
+    # Stream mode: members go out as they are rendered, nothing is held back
+    with tarfile.open(fileobj=stream, mode="w|gz" if gzip else "w|", format=tarfile.PAX_FORMAT) as tar:
+        for name, data in cards:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = now
+            info.mode = 0o644
+            tar.addfile(info, io.BytesIO(data))
+            written += 1
+    return written
+
+
+def write_zip(cards: Iterator[Tuple[str, bytes]], stream) -> int:
+    written = 0
+    stamp = time.localtime()[:6]
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in cards:
+            info = zipfile.ZipInfo(name, date_time=stamp)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            zf.writestr(info, data)
+            written += 1
+    return written
+
+
+def run_manifest(manifest: str, fmt: Optional[str], out: str, archive: Optional[str], force: bool) -> int:
+    started = time.perf_counter()
+    try:
+        with trace.phase("manifest"):
+            fmt = manifest_format(manifest, fmt)
+            if manifest == "-":
+                stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+                cards = load_manifest(stream, fmt)
+            else:
+                with open(manifest, encoding="utf-8", newline="") as stream:
+                    cards = load_manifest(stream, fmt)
+    except (OSError, UnicodeDecodeError, csv.Error, ManifestError) as e:
+        print(f"ERROR: {manifest}: {e}", file=sys.stderr)
+        return 1
+    if not cards:
+        print(f"ERROR: {manifest}: no cards", file=sys.stderr)
+        return 1
+
+    # One timestamp for the whole batch
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%SZ")
+
+    def rendered() -> Iterator[Tuple[str, bytes]]:
+        for name, title, overrides in cards:
+            with trace.phase("render"):
+                data = SKELETON.render(card_values(title, now, overrides)).encode("utf-8")
+            trace.count("files")
+            yield name, data
+
+    kind = archive_kind(out, archive)
+    kept = 0
+    if kind is None and out == "-":
+        print("ERROR: --out - needs --archive tar|tgz|zip", file=sys.stderr)
+        return 1
+    if kind is None and os.path.exists(out) and not os.path.isdir(out):
+        print(f"ERROR: {out} is a file, not a folder (name it .tar, .tar.gz or .zip "
+              "for an archive)", file=sys.stderr)
+        return 1
+    if kind is not None and out != "-" and os.path.exists(out) and not force:
+        print(f"ERROR: {out} exists (use --force to replace it)", file=sys.stderr)
+        return 1
+    try:
+        with trace.phase("write"):
+            if kind is None:
+                written, kept = write_dir(rendered(), Path(out), force)
+            elif out == "-":
+                sys.stdout.flush()
+                if kind == "zip":
+                    written = write_zip(rendered(), sys.stdout.buffer)
+                else:
+                    written = write_tar(rendered(), sys.stdout.buffer, kind == "tgz")
+            else:
+                with open(out, "wb") as f:
+                    if kind == "zip":
+                        written = write_zip(rendered(), f)
+                    else:
+                        written = write_tar(rendered(), f, kind == "tgz")
+    except OSError as e:
+        print(f"ERROR: {out}: {e}", file=sys.stderr)
+        return 1
+
+    elapsed = (time.perf_counter() - started) * 1000
+    note = f", kept {kept} existing" if kept else ""
+    print(f"Scaffolded {written} cards into {out}{note} ({elapsed:.0f} ms)", file=sys.stderr)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv if argv is None else argv
+    trace.start("new")
+    args = argv[1:]
+    manifest: Optional[str] = None
+    fmt: Optional[str] = None
+    out: Optional[str] = None
+    archive: Optional[str] = None
+    force = False
+    titles: List[str] = []
+    i = 0
+    while i < len(args):
+        if args[i] == "--manifest" and i + 1 < len(args):
+            manifest = args[i + 1]
+            i += 2
+        elif args[i] == "--format" and i + 1 < len(args) and args[i + 1] in ("csv", "jsonl"):
+            fmt = args[i + 1]
+            i += 2
+        elif args[i] == "--out" and i + 1 < len(args):
+            out = args[i + 1]
+            i += 2
+        elif args[i] == "--archive" and i + 1 < len(args) and args[i + 1] in ("tar", "tgz", "zip"):
+            archive = args[i + 1]
+            i += 2
+        elif args[i] == "--force":
+            force = True
+            i += 1
+        else:
+            titles.append(args[i])
+            i += 1
+
+    if manifest is not None:
+        if out is None:
+            print(USAGE, file=sys.stderr)
+            sys.exit(1)
+        sys.exit(run_manifest(manifest, fmt, out, archive, force))
+
+    # Extra arguments (e.g. a folder name) are ignored, as they always were
+    title = titles[0] if titles else DEFAULT_TITLE
+    sys.stdout.write(render_card(title))
+
 
 if __name__ == "__main__":
     main()
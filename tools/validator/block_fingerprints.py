@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+CaveCode Locked-Block Fingerprints v1.0
+
+Blocks that AIs must not rewrite — headers naming IDENTITY or LOCKED
+(in any case), e.g. "🪨 BLOCK 1 — IDENTITY (Locked)" or "🪨 BLOCK 4 — LOCKED LOGIC" —
+are fingerprinted per block and kept in a JSON manifest:
+
+    {"version": 1,
+     "cards": {"cards/a.cavecode": {
+         "sha256": <whole file>,
+         "blocks": {"1": {"header": "🪨 BLOCK 1 — IDENTITY (Locked)",
+                          "line": 8, "sha256": <block body>}}}}}
+
+A card seen for the first time is recorded as it is. Later runs compare:
+
+    - the whole-file hash first: an unchanged card costs one hash
+    - otherwise one hash per locked block; TUNING KNOBS, PUBLIC TEXT and
+      other open blocks are never decoded or hashed, so editing them is
+      never reported
+
+A locked block whose body changed, or that disappeared (removed or
+renamed), is an error. The recorded fingerprints stay as they were
+until the change is accepted (see validate_cavecode_v1_1.py --accept-locks).
+
+Blocks are keyed by their number (the header text when there is none),
+so the fixer normalizing a header's glyph is not a change, and neither
+is a locked block moving to another number with its body unchanged (as
+cavecode_upgrade.py renumbers v1.0 blocks). Trailing blank lines of a
+block are not part of its body.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from validation_report import Finding
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+from cavecode_dialect import LOCKED_RE     # header text that marks a block as locked
+from cavecode_view import CardView
+
+LOCK_MANIFEST_VERSION = 1
+
+# {"sha256": file hash, "blocks": {key: {"header", "line", "sha256"}}}
+LockEntry = Dict[str, Any]
+
+
+def locked_blocks(data: bytes) -> Dict[str, Dict[str, Any]]:
+    """Fingerprints of the card's locked blocks, keyed by block number."""
+    blocks: Dict[str, Dict[str, Any]] = {}
+    seen: Dict[str, int] = {}
+    for block in CardView(data).blocks:
+        header = block.header
+        if not LOCKED_RE.search(header.text):
+            continue
+        base = header.number or header.text
+        n = seen[base] = seen.get(base, 0) + 1
+        key = base if n == 1 else f"{base}#{n}"
+        lines = block.lines
+        end = len(lines)
+        while end and not lines[end - 1].strip():
+            end -= 1
+        body = "\n".join(lines[:end]).encode("utf-8")
+        blocks[key] = {"header": header.text, "line": header.lineno + 1,
+                       "sha256": hashlib.sha256(body).hexdigest()}
+    return blocks
+
+
+def check_locked(data: bytes, recorded: Optional[LockEntry]) -> Tuple[List[str], LockEntry]:
+    """
+    (messages, entry to keep) for one card. With nothing recorded the
+    card is fingerprinted as it is; if a locked block changed, the
+    recorded entry is kept so the change keeps being reported.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    if recorded is not None and recorded.get("sha256") == digest:
+        return [], recorded
+    current = locked_blocks(data)
+    entry = {"sha256": digest, "blocks": current}
+    if recorded is None:
+        return [], entry
+
+    messages: List[str] = []
+    old_blocks = recorded.get("blocks", {})
+    # A locked block that only moved (cavecode_upgrade.py renumbers blocks)
+    # keeps its body: it is still there, under another key
+    moved = {new["sha256"] for key, new in current.items() if key not in old_blocks}
+    for key, old in old_blocks.items():
+        new = current.get(key)
+        if new is None and old["sha256"] in moved:
+            continue
+        if new is None:
+            messages.append(Finding(
+                f"ERROR: [locked-block] Locked block removed or renamed: {old['header']!r}",
+                "locked-block", "error"))
+        elif new["sha256"] != old["sha256"]:
+            messages.append(Finding(
+                f"ERROR: Line {new['line']}: [locked-block] "
+                f"Locked block changed since it was recorded: {new['header']!r}",
+                "locked-block", "error", new["line"]))
+    if messages:
+        return messages, recorded
+    # Open blocks changed, or a locked block was added: the new state is the baseline
+    return messages, entry
+
+
+class LockManifest:
+    """
+    The JSON manifest of recorded locked-block fingerprints. Cards are
+    keyed by their resolved path relative to the manifest's directory, so
+    the same card has one entry whatever the cwd or path spelling.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.root = self.path.resolve().parent
+        self.cards: Dict[str, LockEntry] = {}
+        self.dirty = False
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("version") == LOCK_MANIFEST_VERSION:
+            self.cards = data.get("cards", {})
+
+    def key(self, card: str) -> str:
+        return Path(os.path.relpath(Path(card).resolve(), self.root)).as_posix()
+
+    def get(self, card: str) -> Optional[LockEntry]:
+        return self.cards.get(self.key(card))
+
+    def entries(self, cards: List[str]) -> Dict[str, LockEntry]:
+        """The recorded entries for these cards (what a worker needs)."""
+        found = {}
+        for card in cards:
+            entry = self.get(card)
+            if entry is not None:
+                found[card] = entry
+        return found
+
+    def update(self, card: str, entry: LockEntry) -> None:
+        key = self.key(card)
+        if self.cards.get(key) != entry:
+            self.cards[key] = entry
+            self.dirty = True
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        text = json.dumps({"version": LOCK_MANIFEST_VERSION, "cards": self.cards},
+                          ensure_ascii=False, indent=1, sort_keys=True)
+        if self.path.parent != Path(""):
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{self.path.name}.", suffix=".tmp",
+                                        dir=self.path.parent)
+        try:
+            with open(fd, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+        self.dirty = False
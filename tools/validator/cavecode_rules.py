@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+CaveCode Rule Engine v1.0
+
+Validator rules are declared once as data (a RuleSet) and compiled into
+a RuleEngine that checks a parsed document in one pass:
+
+    - header format / glyph checks and all HeaderRules share one loop
+      over the block headers; every HeaderRule pattern is folded into a
+      single regex of optional lookaheads, so one match() per header
+      reports all rules that hit it
+    - required block snippets are plain substring checks per header
+    - all LineRules are folded into one MULTILINE alternation that scans
+      the whole text once; only lines it hits are looked at again
+    - BlockRules reuse the knobs the parser already collected
+
+Extra rule packs (see RULE_PACKS) plug in next to the core rules without
+adding passes over the file. A pack can also live in its own .py file
+that defines a module-level RULES = RuleSet(...).
+"""
+
+import bisect
+import importlib.util
+import re
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Pattern, Sequence, Set
+
+from validation_cache import rules_fingerprint
+from validation_report import Finding
+
+SEVERITY_PREFIX = {"error": "ERROR", "warning": "WARN"}
+
+
+class HeaderRule:
+    """Reports every block header that matches pattern."""
+
+    __slots__ = ("code", "severity", "pattern", "message")
+
+    def __init__(self, code: str, severity: str, pattern: str, message: str):
+        self.code = code
+        self.severity = severity
+        self.pattern = pattern
+        self.message = message        # may use {text}
+
+
+class LineRule:
+    """Reports every line that matches pattern."""
+
+    __slots__ = ("code", "severity", "pattern", "message")
+
+    def __init__(self, code: str, severity: str, pattern: str, message: str):
+        self.code = code
+        self.severity = severity
+        self.pattern = pattern
+        self.message = message        # may use {text} (the matched text)
+
+
+class BlockRule:
+    """Reports once unless some block whose header contains snippet passes check."""
+
+    __slots__ = ("code", "severity", "snippet", "check", "message")
+
+    def __init__(self, code: str, severity: str, snippet: str, check: Callable, message: str):
+        self.code = code
+        self.severity = severity
+        self.snippet = snippet
+        self.check = check
+        self.message = message
+
+
+class RuleSet:
+    """
+    A named group of rules.
+
+    tag_codes puts "[code]" in front of each message so text reports show
+    which rule fired; the core set leaves it off to keep its long-standing
+    message text. The NDJSON report takes the code from the Finding either
+    way.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        header_pattern: Optional[Pattern] = None,
+        allowed_glyphs: Optional[Set[str]] = None,
+        required: Optional[Dict[str, str]] = None,
+        header_rules: Sequence[HeaderRule] = (),
+        block_rules: Sequence[BlockRule] = (),
+        line_rules: Sequence[LineRule] = (),
+        tag_codes: bool = True,
+    ):
+        self.name = name
+        self.header_pattern = header_pattern
+        self.allowed_glyphs = allowed_glyphs
+        self.required = required or {}
+        self.header_rules = list(header_rules)
+        self.block_rules = list(block_rules)
+        self.line_rules = list(line_rules)
+        self.tag_codes = tag_codes
+
+    def fingerprint(self) -> str:
+        return rules_fingerprint(
+            self.name,
+            self.header_pattern.pattern if self.header_pattern else None,
+            self.allowed_glyphs or set(),
+            self.required,
+            [(r.code, r.severity, r.pattern, r.message) for r in self.header_rules],
+            [(r.code, r.severity, r.snippet, r.check.__name__, r.message) for r in self.block_rules],
+            [(r.code, r.severity, r.pattern, r.message) for r in self.line_rules],
+        )
+
+
+def _format(rule, tag: bool, line: Optional[int], **fields) -> Finding:
+    parts = [SEVERITY_PREFIX[rule.severity] + ":"]
+    if line is not None:
+        parts.append(f"Line {line}:")
+    if tag:
+        parts.append(f"[{rule.code}]")
+    parts.append(rule.message.format(**fields))
+    return Finding(" ".join(parts), rule.code, rule.severity, line)
+
+
+def _alternation(patterns: List[str], flags: int = 0) -> Optional[Pattern]:
+    """p0|p1|... with each branch in a _rN group — finds the next hit of any rule."""
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?P<_r{i}>{p})" for i, p in enumerate(patterns)), flags)
+
+
+def _all_matcher(patterns: List[str]) -> Optional[Pattern]:
+    """
+    (?=.*?(?P<_r0>p0))?(?=.*?(?P<_r1>p1))?... — a single match() at the
+    start of a line fills in the group of every rule found on that line.
+    """
+    if not patterns:
+        return None
+    return re.compile("".join(f"(?=.*?(?P<_r{i}>{p}))?" for i, p in enumerate(patterns)))
+
+
+def _hits(m):
+    """(rule index, matched text) for every _rN group that matched."""
+    for name, value in m.groupdict().items():
+        if value is not None and name.startswith("_r"):
+            yield int(name[2:]), value
+
+
+class RuleEngine:
+    def __init__(self, rule_sets: Iterable[RuleSet]):
+        self.rule_sets = list(rule_sets)
+
+        self.format_checks = [rs for rs in self.rule_sets if rs.header_pattern is not None]
+
+        self.required = []          # (RuleSet, key, snippet)
+        for rs in self.rule_sets:
+            for key, snippet in rs.required.items():
+                self.required.append((rs, key, snippet))
+
+        self.header_rules = [(rs, r) for rs in self.rule_sets for r in rs.header_rules]
+        self.header_re = _all_matcher([r.pattern for _, r in self.header_rules])
+
+        self.block_rules = [(rs, r) for rs in self.rule_sets for r in rs.block_rules]
+
+        self.line_rules = [(rs, r) for rs in self.rule_sets for r in rs.line_rules]
+        self.line_scan_re = _alternation([r.pattern for _, r in self.line_rules], re.MULTILINE)
+        self.line_re = _all_matcher([r.pattern for _, r in self.line_rules])
+
+    def fingerprint(self) -> str:
+        return rules_fingerprint(*[rs.fingerprint() for rs in self.rule_sets])
+
+    def header_messages(self, header) -> List[str]:
+        """Format, glyph and header-rule messages for one block header."""
+        messages: List[str] = []
+        text = header.text
+        lineno = header.lineno + 1
+        for rs in self.format_checks:
+            m = rs.header_pattern.match(text)
+            if not m:
+                messages.append(Finding(
+                    f"ERROR: Line {lineno}: Block header not in expected format: {text!r}",
+                    "header-format", "error", lineno,
+                ))
+                continue
+            glyph = m.group("glyph")
+            if rs.allowed_glyphs is not None and glyph not in rs.allowed_glyphs:
+                messages.append(Finding(
+                    f"ERROR: Line {lineno}: Unknown glyph {glyph!r} on block header.",
+                    "unknown-glyph", "error", lineno,
+                ))
+        if self.header_re is not None:
+            for idx, _ in _hits(self.header_re.match(text)):
+                rs, rule = self.header_rules[idx]
+                messages.append(_format(rule, rs.tag_codes, lineno, text=text))
+        return messages
+
+    def required_hits(self, header) -> List[int]:
+        """Indexes into self.required of the snippets this header satisfies."""
+        # Each snippet on its own: snippets from different packs may overlap
+        text = header.text
+        return [i for i, (_, _, snippet) in enumerate(self.required) if snippet in text]
+
+    def block_checks(self, block) -> List[Optional[bool]]:
+        """Per block rule: check(block), or None when the rule does not apply here."""
+        return [
+            rule.check(block) if rule.snippet in block.header.text else None
+            for _, rule in self.block_rules
+        ]
+
+    def line_messages(self, text: str, offsets: List[int], lines: List[str], base: int = 0) -> List[str]:
+        """
+        Line-rule messages for lines (one scan of text, then each hit line
+        once). offsets are relative to text; base is the 0-based document
+        line of lines[0].
+        """
+        messages: List[str] = []
+        if self.line_scan_re is None:
+            return messages
+        last = -1
+        for m in self.line_scan_re.finditer(text):
+            idx = bisect.bisect_right(offsets, m.start())
+            if idx == last:
+                continue
+            last = idx
+            for ridx, matched in _hits(self.line_re.match(lines[idx - 1])):
+                rs, rule = self.line_rules[ridx]
+                messages.append(_format(rule, rs.tag_codes, base + idx, text=matched))
+        return messages
+
+    def finish(self, header_messages: List[str], present: List[bool],
+               block_passes: List[bool], line_messages: List[str]) -> List[str]:
+        """Puts per-header, per-block and per-line results together in report order."""
+        messages = list(header_messages)
+        for (rs, key, snippet), ok in zip(self.required, present):
+            if not ok:
+                messages.append(Finding(f"ERROR: Missing required block: {snippet!r}",
+                                        "missing-block", "error"))
+        for (rs, rule), ok in zip(self.block_rules, block_passes):
+            if not ok:
+                messages.append(_format(rule, rs.tag_codes, None))
+        messages.extend(line_messages)
+        return messages
+
+    def evaluate(self, doc) -> List[str]:
+        header_messages: List[str] = []
+        present = [False] * len(self.required)
+
+        # 1) One loop over headers: format, glyphs, header rules, required blocks
+        for header in doc.headers:
+            header_messages.extend(self.header_messages(header))
+            for idx in self.required_hits(header):
+                present[idx] = True
+
+        # 2) Block content rules
+        passes = [
+            any(rule.check(b) for b in doc.find_blocks(rule.snippet))
+            for _, rule in self.block_rules
+        ]
+
+        # 3) Line rules: one scan of the whole text
+        lines = self.line_messages(doc.text, doc.offsets, doc.lines)
+
+        return self.finish(header_messages, present, passes, lines)
+
+
+# ----------------------------------------------------------------------
+# Rule packs
+# ----------------------------------------------------------------------
+
+# Drift seen in cold-start Gemini output (see MULTI-ENGINE.md)
+GEMINI_DRIFT = RuleSet(
+    "gemini-drift",
+    header_rules=[
+        HeaderRule("commented-header", "warning", r"^//",
+                   "Block header is written as a code comment: {text!r}"),
+        HeaderRule("missing-glyph", "warning", r"^(?://\s*)?BLOCK\b",
+                   "Block header has no glyph: {text!r}"),
+        HeaderRule("legacy-glyph", "warning", r"✏️",
+                   "Old ✏️ glyph on block header (use 🖍️): {text!r}"),
+    ],
+    line_rules=[
+        LineRule("search-url-substitution", "warning", r"https?://(?:www\.)?google\.com/search\?q=URL",
+                 "Engine substituted a search link for the word URL: {text!r}"),
+    ],
+)
+
+RULE_PACKS: Dict[str, RuleSet] = {
+    GEMINI_DRIFT.name: GEMINI_DRIFT,
+}
+
+
+def load_rule_pack(name: str) -> RuleSet:
+    """A built-in pack name, or a path to a .py file defining RULES."""
+    if name in RULE_PACKS:
+        return RULE_PACKS[name]
+    path = Path(name)
+    if path.suffix == ".py" and path.exists():
+        spec = importlib.util.spec_from_file_location(f"cavecode_rules_{path.stem}", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.RULES
+    raise ValueError(f"Unknown rule pack: {name} (built-in: {', '.join(sorted(RULE_PACKS))})")
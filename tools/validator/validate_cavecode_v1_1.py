@@ -5,17 +5,50 @@ CaveCode Validator v1.1
 Usage:
     python validate_cavecode_v1_1.py path/to/file.cavecode
 
+    # Batch mode: directories, globs, or a file list on stdin
+    python validate_cavecode_v1_1.py cards/ "artifacts/**/*.cavecode"
+    find . -name "*.cavecode" | python validate_cavecode_v1_1.py - --jobs 8
+
+    # Skip unchanged cards (or set CAVECODE_CACHE=path)
+    python validate_cavecode_v1_1.py --cache .cavecode-cache/validate.sqlite cards/
+
+    # One JSON record per file (plus a final summary record)
+    python validate_cavecode_v1_1.py --format ndjson cards/
+
+    # Add a rule pack (built-in name or path/to/pack.py)
+    python validate_cavecode_v1_1.py --rules gemini-drift artifacts/gemini/
+
+    # Flag edits to IDENTITY / LOCKED blocks since they were first recorded
+    python validate_cavecode_v1_1.py --locks .cavecode-locks.json cards/
+    python validate_cavecode_v1_1.py --locks .cavecode-locks.json --accept-locks cards/a.cavecode
+
 Checks:
     - Required blocks present
     - Valid glyphs on block headers
     - At least one tuning knob (🖍️)
     - At least one public text entry (🌐)
+    - With --locks: locked blocks unchanged (see block_fingerprints.py)
 """
 
+import glob
+import os
 import sys
 import re
+import time
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from block_fingerprints import LockEntry, LockManifest, check_locked
+from cavecode_rules import BlockRule, RuleEngine, RuleSet, load_rule_pack
+from validation_cache import ValidationCache, cache_key
+from validation_report import make_record, read_error, write_record
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "common"))
+import cavecode_trace as trace
+from cavecode_parser import Block, Document, parse_text
+
+VALIDATOR_VERSION = "1.1"
 
 # Allowed glyphs for block headers
 ALLOWED_GLYPHS = {"🧱", "🎮", "🖍️", "🌐", "🪨", "📝"}
@@ -29,152 +62,399 @@ REQUIRED_BLOCKS = {
     "NOTES": "📝 BLOCK 5 — HUMAN NOTES",
 }
 
-BLOCK_HEADER_RE = re.compile(
-    r"^(?P<glyph>[\u2600-\u27BF\U0001F300-\U0001FAFF])\s+BLOCK\s+(?P<num>\d+)\s+—\s+(?P<title>.+)$"
+USAGE = (
+    "Usage: python validate_cavecode_v1_1.py [--jobs N] [--chunk-size N] [--batch] "
+    "[--cache PATH | --no-cache] [--format text|ndjson] [--rules PACK[,PACK]] "
+    "[--locks PATH [--accept-locks]] "
+    "<file | dir | glob | -> ..."
 )
 
+# Glyph (with its variation selector, as in 🖍️), number (sub-blocks such
+# as 1A included), em-dash, title
+BLOCK_HEADER_RE = re.compile(
+    r"^(?P<glyph>[\u2600-\u27BF\U0001F300-\U0001FAFF]\ufe0f?)\s+BLOCK\s+(?P<num>\d+[A-Z]?)\s+—\s+(?P<title>.+)$"
+)
 
-def read_file(path: Path) -> str:
-    return path.read_text(encoding="utf-8")
-
-
-def find_block_headers(lines: List[str]) -> List[Tuple[int, str]]:
-    headers = []
-    for i, line in enumerate(lines):
-        line = line.strip()
-        if "BLOCK" in line and "—" in line:
-            headers.append((i, line))
-    return headers
-
-
-def validate_headers(headers: List[Tuple[int, str]]) -> List[str]:
-    messages = []
-    for lineno, line in headers:
-        m = BLOCK_HEADER_RE.match(line)
-        if not m:
-            messages.append(
-                f"ERROR: Line {lineno+1}: Block header not in expected format: {line!r}"
-            )
-            continue
-        glyph = m.group("glyph")
-        if glyph not in ALLOWED_GLYPHS:
-            messages.append(
-                f"ERROR: Line {lineno+1}: Unknown glyph {glyph!r} on block header."
-            )
-    return messages
-
-
-def check_required_blocks(headers: List[Tuple[int, str]]) -> List[str]:
-    present = {key: False for key in REQUIRED_BLOCKS}
-    header_texts = [h[1] for h in headers]
-
-    for key, snippet in REQUIRED_BLOCKS.items():
-        for ht in header_texts:
-            if snippet in ht:
-                present[key] = True
-                break
-
-    messages = []
-    for key, ok in present.items():
-        if not ok:
-            messages.append(
-                f"ERROR: Missing required block: {REQUIRED_BLOCKS[key]!r}"
-            )
-    return messages
-
-
-def extract_block_sections(lines: List[str], headers: List[Tuple[int, str]]) -> Dict[str, List[str]]:
-    """
-    Returns mapping of header line text -> list of lines inside that block.
-    """
-    sections: Dict[str, List[str]] = {}
-    if not headers:
-        return sections
+# (locked-block messages, manifest entry to keep), when --locks is on
+LockResult = Optional[Tuple[List[str], LockEntry]]
+# (path, status, messages, cache key, cache hit, elapsed ms, lock result)
+Result = Tuple[str, str, List[str], Optional[str], bool, float, LockResult]
 
-    # Add sentinel at end
-    extended = headers + [(len(lines), "END-OF-FILE")]
 
-    for idx in range(len(headers)):
-        start_line, header_text = extended[idx]
-        next_start, _ = extended[idx + 1]
-        block_lines = lines[start_line + 1 : next_start]
-        sections[header_text] = block_lines
+def has_tuning_knobs(block: Block) -> bool:
+    # rough heuristic: any "KEY: value" line the parser picked up
+    return bool(block.knobs)
 
-    return sections
 
+def has_public_text(block: Block) -> bool:
+    # Same heuristic as knobs: any key/value indicates text fields
+    return has_tuning_knobs(block)
+
+
+# The v1.1 checks, declared once for the rule engine
+CORE_RULES = RuleSet(
+    "core",
+    header_pattern=BLOCK_HEADER_RE,
+    allowed_glyphs=ALLOWED_GLYPHS,
+    required=REQUIRED_BLOCKS,
+    block_rules=[
+        BlockRule("no-tuning-knobs", "warning", "TUNING KNOBS", has_tuning_knobs,
+                  "No obvious tuning knobs found in 🖍️ BLOCK 3 — TUNING KNOBS."),
+        BlockRule("no-public-text", "warning", "PUBLIC TEXT", has_public_text,
+                  "No obvious public text entries found in 🌐 BLOCK 4 — PUBLIC TEXT."),
+    ],
+    tag_codes=False,
+)
 
-def has_tuning_knobs(block_lines: List[str]) -> bool:
-    for line in block_lines:
-        stripped = line.strip()
-        if not stripped or stripped.startswith("#"):
-            continue
-        # rough heuristic: "KEY: value"
-        if ":" in stripped:
-            return True
-    return False
 
+@lru_cache(maxsize=None)
+def build_engine(packs: Tuple[str, ...] = ()) -> RuleEngine:
+    """Core rules plus any extra packs, compiled once per process."""
+    return RuleEngine([CORE_RULES] + [load_rule_pack(name) for name in packs])
 
-def has_public_text(block_lines: List[str]) -> bool:
-    # Same heuristic as knobs: any key/value indicates text fields
-    return has_tuning_knobs(block_lines)
 
+def cache_namespace(engine: RuleEngine) -> str:
+    # Cached results are only valid for this exact validator + rule set
+    return f"validate_cavecode_v1_1:{VALIDATOR_VERSION}:{engine.fingerprint()}"
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python validate_cavecode_v1_1.py path/to/file.cavecode", file=sys.stderr)
-        sys.exit(1)
 
-    path = Path(sys.argv[1])
-    if not path.exists():
-        print(f"ERROR: File not found: {path}", file=sys.stderr)
-        sys.exit(1)
+def validate_document(doc: Document, engine: Optional[RuleEngine] = None) -> List[str]:
+    with trace.phase("rules"):
+        return (engine or build_engine()).evaluate(doc)
 
-    text = read_file(path)
-    lines = text.splitlines()
 
-    headers = find_block_headers(lines)
-    messages: List[str] = []
+def summarize(messages: List[str]) -> str:
+    errors = [m for m in messages if m.startswith("ERROR")]
+    warns = [m for m in messages if m.startswith("WARN")]
 
-    # 1) Validate header formats and glyphs
-    messages.extend(validate_headers(headers))
+    if not errors and not warns:
+        return "PASS"
+    elif errors:
+        return "FAIL"
+    return "PASS WITH WARNINGS"
 
-    # 2) Check required blocks
-    messages.extend(check_required_blocks(headers))
 
-    # 3) Deeper content checks
-    sections = extract_block_sections(lines, headers)
+def validate_bytes(data: bytes, path: Path, engine: Optional[RuleEngine] = None) -> Tuple[str, List[str]]:
+    """Returns (status, messages) for one card's raw bytes."""
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        return "FAIL", [read_error(e)]
+    # Single parse: headers, blocks and knobs all come from one pass
+    messages = validate_document(parse_text(text, path), engine)
+    return summarize(messages), messages
 
-    # tuning knobs & public text checks
-    tuning_ok = False
-    public_ok = False
-    for header, block_lines in sections.items():
-        if "TUNING KNOBS" in header:
-            tuning_ok = has_tuning_knobs(block_lines)
-        if "PUBLIC TEXT" in header:
-            public_ok = has_public_text(block_lines)
 
-    if not tuning_ok:
-        messages.append("WARN: No obvious tuning knobs found in 🖍️ BLOCK 3 — TUNING KNOBS.")
-    if not public_ok:
-        messages.append("WARN: No obvious public text entries found in 🌐 BLOCK 4 — PUBLIC TEXT.")
+def validate_chunk(
+    paths: List[str], cache_path: Optional[str] = None, packs: Tuple[str, ...] = (),
+    locks: Optional[Dict[str, LockEntry]] = None,
+) -> List[Result]:
+    """
+    Worker entry point: validate one chunk of files.
 
-    # Summary
-    errors = [m for m in messages if m.startswith("ERROR")]
-    warns = [m for m in messages if m.startswith("WARN")]
+    With a cache, each file is hashed and looked up first; hits are
+    replayed without decoding or parsing the card.
 
-    if not errors and not warns:
-        status = "PASS"
-    elif errors:
-        status = "FAIL"
+    locks holds the recorded locked-block fingerprints of this chunk's
+    cards (None: no lock check). Lock results travel separately from the
+    rule messages, which are what the cache stores.
+    """
+    engine = build_engine(packs)
+    namespace = cache_namespace(engine)
+    cache = ValidationCache(Path(cache_path), readonly=True) if cache_path else None
+    results: List[Result] = []
+    for p in paths:
+        started = time.perf_counter()
+        trace.count("files")
+        try:
+            with trace.phase("read"):
+                data = Path(p).read_bytes()
+        except OSError as e:
+            elapsed = (time.perf_counter() - started) * 1000
+            results.append((p, "FAIL", [read_error(e)], None, False, elapsed, None))
+            continue
+        with trace.phase("cache"):
+            key = cache_key(namespace, data) if cache else None
+            cached = cache.get(key) if cache else None
+        if cached is not None:
+            trace.count("cache_hits")
+            status, messages = cached
+        else:
+            status, messages = validate_bytes(data, Path(p), engine)
+        lock: LockResult = None
+        if locks is not None:
+            with trace.phase("locks"):
+                lock = check_locked(data, locks.get(p))
+        elapsed = (time.perf_counter() - started) * 1000
+        results.append((p, status, messages, key, cached is not None, elapsed, lock))
+    if cache:
+        cache.close()
+    trace.flush_worker()
+    return results
+
+
+def record_result(cache: Optional[ValidationCache], result: Result) -> None:
+    """Main-process side of the cache: store misses, refresh LRU on hits."""
+    if cache is None:
+        return
+    _, status, messages, key, hit, _, _ = result
+    if key is None:
+        return
+    if hit:
+        cache.touch(key)
     else:
-        status = "PASS WITH WARNINGS"
+        cache.put(key, status, messages)
 
-    print(f"Validation result for {path.name}: {status}")
+
+def collect_paths(targets: List[str]) -> List[str]:
+    """
+    Expand directories (recursively, *.cavecode), glob patterns and
+    "-" (newline-separated file list on stdin) into a flat file list.
+    """
+    paths: List[str] = []
+    for target in targets:
+        if target == "-":
+            paths.extend(line.strip() for line in sys.stdin if line.strip())
+        elif os.path.isdir(target):
+            paths.extend(sorted(str(p) for p in Path(target).rglob("*.cavecode")))
+        elif glob.has_magic(target):
+            paths.extend(sorted(glob.glob(target, recursive=True)))
+        else:
+            paths.append(target)
+    return paths
+
+
+def iter_results(
+    paths: List[str],
+    jobs: int,
+    chunk_size: int,
+    cache_path: Optional[str] = None,
+    packs: Tuple[str, ...] = (),
+    locks: Optional[LockManifest] = None,
+    accept_locks: bool = False,
+) -> Iterator[Result]:
+    """
+    Yields per-file results as soon as each chunk finishes. Each chunk
+    only carries its own cards' lock entries (none when accepting, so
+    every card is fingerprinted afresh).
+    """
+    chunks = [paths[i : i + chunk_size] for i in range(0, len(paths), chunk_size)]
+
+    def chunk_locks(chunk: List[str]) -> Optional[Dict[str, LockEntry]]:
+        if locks is None:
+            return None
+        return {} if accept_locks else locks.entries(chunk)
+
+    if jobs <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield from validate_chunk(chunk, cache_path, packs, chunk_locks(chunk))
+        return
+
+    # Imported on demand: the pool machinery costs more startup than a small run
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(validate_chunk, chunk, cache_path, packs, chunk_locks(chunk))
+                   for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def apply_lock(locks: Optional[LockManifest], result: Result) -> Tuple[str, List[str]]:
+    """Status and messages with the lock check added; records the card's fingerprints."""
+    p, status, messages, _, _, _, lock = result
+    if locks is None or lock is None:
+        return status, messages
+    lock_messages, entry = lock
+    locks.update(p, entry)
+    if not lock_messages:
+        return status, messages
+    messages = messages + lock_messages
+    return summarize(messages), messages
+
+
+def print_result(name: str, status: str, messages: List[str]) -> None:
+    print(f"Validation result for {name}: {status}")
     if messages:
         print("\nDetails:")
         for m in messages:
             print(f"- {m}")
 
 
+def run_batch(opts: "Options") -> int:
+    paths = collect_paths(opts.targets)
+    jobs, chunk_size, cache_path = opts.jobs, opts.chunk_size, opts.cache_path
+    if not paths:
+        print("ERROR: No files to validate.", file=sys.stderr)
+        return 1
+
+    if chunk_size <= 0:
+        # Aim for a few chunks per worker so slow files don't stall the pool
+        chunk_size = max(1, min(256, len(paths) // (jobs * 4) or 1))
+
+    # Creating the writer first makes sure the table exists before workers read it
+    cache = ValidationCache(Path(cache_path)) if cache_path else None
+    locks = LockManifest(Path(opts.locks_path)) if opts.locks_path else None
+    counts = {"PASS": 0, "PASS WITH WARNINGS": 0, "FAIL": 0}
+    hits = tampered = 0
+    started = time.perf_counter()
+    for result in iter_results(paths, jobs, chunk_size, cache_path, opts.packs,
+                               locks, opts.accept_locks):
+        p, _, _, _, hit, elapsed, lock = result
+        with trace.phase("cache"):
+            record_result(cache, result)
+        status, messages = apply_lock(locks, result)
+        tampered += bool(lock and lock[0])
+        hits += hit
+        counts[status] += 1
+        with trace.phase("report"):
+            if opts.ndjson:
+                write_record(sys.stdout, make_record(p, status, messages, elapsed, hit))
+                continue
+            print(f"{p}: {status}")
+            for m in messages:
+                print(f"    - {m}")
+            sys.stdout.flush()
+
+    if cache:
+        cache.close()
+    if locks:
+        locks.save()
+
+    if opts.ndjson:
+        write_record(sys.stdout, {
+            "type": "summary",
+            "files": len(paths),
+            "counts": counts,
+            "cached": hits if cache else None,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        })
+        return 1 if counts["FAIL"] else 0
+
+    print(
+        f"\nSummary: {len(paths)} files — "
+        f"{counts['PASS']} PASS, "
+        f"{counts['PASS WITH WARNINGS']} PASS WITH WARNINGS, "
+        f"{counts['FAIL']} FAIL"
+    )
+    if cache:
+        print(f"Cache: {hits} of {len(paths)} results replayed from {cache_path}")
+    if locks:
+        action = "recorded" if opts.accept_locks else "checked"
+        print(f"Locks: {len(paths)} cards {action}, {tampered} with changed locked blocks "
+              f"({opts.locks_path})")
+    return 1 if counts["FAIL"] else 0
+
+
+class Options:
+    __slots__ = ("targets", "jobs", "chunk_size", "batch", "cache_path", "ndjson", "packs",
+                 "locks_path", "accept_locks")
+
+    def __init__(self):
+        self.targets: List[str] = []
+        self.jobs = os.cpu_count() or 1
+        self.chunk_size = 0
+        self.batch = False
+        self.cache_path: Optional[str] = os.environ.get("CAVECODE_CACHE") or None
+        self.ndjson = False
+        self.packs: Tuple[str, ...] = ()
+        self.locks_path: Optional[str] = None
+        self.accept_locks = False
+
+
+def parse_args(argv) -> Options:
+    opts = Options()
+    i = 1
+    while i < len(argv):
+        if argv[i] == "--cache" and i + 1 < len(argv):
+            opts.cache_path = argv[i + 1]
+            i += 2
+        elif argv[i] == "--no-cache":
+            opts.cache_path = None
+            i += 1
+        elif argv[i] in ("-j", "--jobs") and i + 1 < len(argv):
+            try:
+                opts.jobs = max(1, int(argv[i + 1]))
+            except ValueError:
+                print(USAGE, file=sys.stderr)
+                sys.exit(1)
+            opts.batch = True
+            i += 2
+        elif argv[i] == "--chunk-size" and i + 1 < len(argv):
+            try:
+                opts.chunk_size = int(argv[i + 1])
+            except ValueError:
+                print(USAGE, file=sys.stderr)
+                sys.exit(1)
+            opts.batch = True
+            i += 2
+        elif argv[i] == "--batch":
+            opts.batch = True
+            i += 1
+        elif argv[i] == "--format" and i + 1 < len(argv):
+            if argv[i + 1] not in ("text", "ndjson", "json"):
+                print(f"Unsupported format: {argv[i + 1]}", file=sys.stderr)
+                sys.exit(1)
+            opts.ndjson = argv[i + 1] != "text"
+            i += 2
+        elif argv[i] == "--rules" and i + 1 < len(argv):
+            opts.packs += tuple(p for p in argv[i + 1].split(",") if p)
+            i += 2
+        elif argv[i] == "--locks" and i + 1 < len(argv):
+            opts.locks_path = argv[i + 1]
+            i += 2
+        elif argv[i] == "--accept-locks":
+            opts.accept_locks = True
+            i += 1
+        elif argv[i] in ("--json", "--ndjson"):
+            opts.ndjson = True
+            i += 1
+        else:
+            opts.targets.append(argv[i])
+            i += 1
+    if not opts.targets or (opts.accept_locks and not opts.locks_path):
+        print(USAGE, file=sys.stderr)
+        sys.exit(1)
+    try:
+        build_engine(opts.packs)
+    except (ValueError, OSError, AttributeError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    # A single plain file keeps the classic one-card report
+    first = opts.targets[0]
+    if len(opts.targets) > 1 or first == "-" or os.path.isdir(first) or glob.has_magic(first):
+        opts.batch = True
+    return opts
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv if argv is None else argv
+    trace.start("validate")
+    opts = parse_args(argv)
+
+    if opts.batch:
+        sys.exit(run_batch(opts))
+
+    path = Path(opts.targets[0])
+    if not path.exists():
+        print(f"ERROR: File not found: {path}", file=sys.stderr)
+        sys.exit(1)
+
+    cache = ValidationCache(Path(opts.cache_path)) if opts.cache_path else None
+    locks = LockManifest(Path(opts.locks_path)) if opts.locks_path else None
+    entries = None if locks is None else ({} if opts.accept_locks else locks.entries([str(path)]))
+    result = validate_chunk([str(path)], opts.cache_path, opts.packs, entries)[0]
+    record_result(cache, result)
+    if cache:
+        cache.close()
+    status, messages = apply_lock(locks, result)
+    if locks:
+        locks.save()
+    p, _, _, _, hit, elapsed, _ = result
+    if opts.ndjson:
+        write_record(sys.stdout, make_record(p, status, messages, elapsed, hit))
+    else:
+        print_result(path.name, status, messages)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+CaveCode Validation Cache v1.0
+
+On-disk cache of validator results, shared by validate_cavecode.py and
+validate_cavecode_v1_1.py.
+
+Entries are keyed by a hash of:
+    - the validator name and version
+    - a fingerprint of its rule set (glyphs, required blocks, patterns)
+    - the raw file bytes
+
+So editing a card, bumping the validator, or changing ALLOWED_GLYPHS /
+REQUIRED_BLOCKS all produce new keys; stale entries simply stop being
+used and fall out through LRU eviction.
+
+Storage is a single SQLite file. Readers (pool workers) open it
+read-only; the main process is the only writer.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+
+from validation_report import message_from_json, message_to_json
+
+# 2: findings are stored with their code, severity and line
+CACHE_SCHEMA = "2"
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+def rules_fingerprint(*rules: Any) -> str:
+    """Stable short hash of rule tables (sets and dicts are sorted first)."""
+    parts = []
+    for rule in rules:
+        if isinstance(rule, dict):
+            rule = sorted(rule.items())
+        elif isinstance(rule, (set, frozenset)):
+            rule = sorted(rule)
+        parts.append(repr(rule))
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def cache_key(namespace: str, data: bytes) -> str:
+    h = hashlib.sha256()
+    h.update(f"{CACHE_SCHEMA}:{namespace}\x00".encode("utf-8"))
+    h.update(data)
+    return h.hexdigest()
+
+
+class ValidationCache:
+    """
+    LRU-bounded SQLite cache of (status, messages) per cache key.
+
+    Writes are buffered and flushed on close(), which also evicts the
+    least recently used rows beyond max_entries.
+    """
+
+    def __init__(self, path: Path, max_entries: int = DEFAULT_MAX_ENTRIES, readonly: bool = False):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.readonly = readonly
+        self._pending: List[Tuple[str, str, str, int]] = []
+        self._touched: List[Tuple[int, str]] = []
+        self.conn: Optional[sqlite3.Connection] = None
+
+        if readonly:
+            if self.path.exists():
+                self.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " messages TEXT NOT NULL,"
+            " last_used INTEGER NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_lru ON results(last_used)")
+        self.conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, List[str]]]:
+        if self.conn is None:
+            return None
+        try:
+            row = self.conn.execute(
+                "SELECT status, messages FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        return row[0], [message_from_json(m) for m in json.loads(row[1])]
+
+    def put(self, key: str, status: str, messages: Iterable[str]) -> None:
+        self._pending.append((key, status, json.dumps([message_to_json(m) for m in messages]), time.time_ns()))
+
+    def touch(self, key: str) -> None:
+        self._touched.append((time.time_ns(), key))
+
+    def flush(self) -> None:
+        if self.readonly or self.conn is None:
+            return
+        with self.conn:
+            if self._pending:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO results (key, status, messages, last_used)"
+                    " VALUES (?, ?, ?, ?)",
+                    self._pending,
+                )
+            if self._touched:
+                self.conn.executemany(
+                    "UPDATE results SET last_used = ? WHERE key = ?", self._touched
+                )
+        self._pending.clear()
+        self._touched.clear()
+
+    def evict(self) -> None:
+        if self.readonly or self.conn is None:
+            return
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            with self.conn:
+                self.conn.execute(
+                    "DELETE FROM results WHERE key IN ("
+                    " SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+
+    def close(self) -> None:
+        if self.conn is None:
+            return
+        self.flush()
+        self.evict()
+        self.conn.close()
+        self.conn = None
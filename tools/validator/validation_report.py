@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+CaveCode Validation Report v1.0
+
+Turns the validators' message lists into NDJSON records, one per file:
+
+    {"type": "result", "path": "...", "status": "FAIL",
+     "errors": [{"code": "missing-block", "line": null, "message": "..."}],
+     "warnings": [...], "elapsed_ms": 0.42, "cached": false}
+
+A batch run ends with one {"type": "summary", ...} record. Each record
+is flushed as soon as it is written, so consumers can tail the stream
+while a large run is still going.
+
+Every finding is a Finding: the check that reports it sets its code,
+severity and line, and make_record() copies them into the record.
+"""
+
+import json
+import re
+from typing import Dict, List, Optional, TextIO
+
+LINE_RE = re.compile(r"\bLine (\d+):")
+
+
+class Finding(str):
+    """
+    One report message that carries its own code, severity and line, so
+    the NDJSON report never has to read them back out of the text. It is
+    still the plain message everywhere else (text output, summarize()).
+    """
+
+    def __new__(cls, message: str, code: str, severity: str, line: Optional[int] = None):
+        self = super().__new__(cls, message)
+        self.code = code
+        self.severity = severity        # "error" or "warning"
+        self.line = line
+        return self
+
+    def __getnewargs__(self):
+        # Pickled across the validator's worker processes
+        return str(self), self.code, self.severity, self.line
+
+
+def read_error(e: Exception) -> Finding:
+    return Finding(f"ERROR: Cannot read file: {e}", "read-error", "error")
+
+
+def message_to_json(message: str) -> object:
+    """A Finding as [message, code, severity, line]; other lines stay strings."""
+    if isinstance(message, Finding):
+        return [str(message), message.code, message.severity, message.line]
+    return message
+
+
+def message_from_json(item: object) -> str:
+    return Finding(*item) if isinstance(item, list) else item
+
+
+def make_record(
+    path: str,
+    status: str,
+    messages: List[str],
+    elapsed_ms: Optional[float] = None,
+    cached: bool = False,
+) -> Dict[str, object]:
+    errors = []
+    warnings = []
+    for message in messages:
+        # Lines that are not Findings only introduce or close a list
+        if not isinstance(message, Finding):
+            continue
+        finding = {"code": message.code, "line": message.line, "message": message.strip()}
+        (errors if message.severity == "error" else warnings).append(finding)
+    return {
+        "type": "result",
+        "path": path,
+        "status": status,
+        "errors": errors,
+        "warnings": warnings,
+        "elapsed_ms": None if elapsed_ms is None else round(elapsed_ms, 3),
+        "cached": cached,
+    }
+
+
+def write_record(out: TextIO, record: Dict[str, object]) -> None:
+    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    out.flush()
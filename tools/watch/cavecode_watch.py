@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+CaveCode Watch v1.0
+
+Keeps cards parsed in memory and re-validates them as soon as they
+change on disk, optionally running the fixer first.
+
+Usage:
+    python cavecode_watch.py cards/ examples/
+    python cavecode_watch.py --fix --interval 0.2 cards/
+    python cavecode_watch.py --rules gemini-drift --format ndjson artifacts/
+
+Options:
+    --interval SECONDS   how often to poll for changes (default 0.5)
+    --fix                normalize block headers in place before validating
+    --rules PACK[,PACK]  extra validator rule packs (same as the v1.1 validator)
+    --format text|ndjson one line per report, or one JSON record per report
+    --once               check everything once and exit (status 1 on any FAIL)
+
+Change detection is plain polling of (mtime, size), so it works on any
+Linux box (or container, or network mount) without inotify or extra
+services. Each card is kept as a list of segments (the lines before the
+first header, then one per block) with their check results. On a change
+the old and new text are compared, only the segments the edit touched
+are parsed and checked again, and later segments just have their line
+numbers moved. Results are identical to validate_cavecode_v1_1.py.
+"""
+
+import bisect
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+TOOLS = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(TOOLS / "common"))
+sys.path.insert(0, str(TOOLS / "validator"))
+sys.path.insert(0, str(TOOLS / "fixer"))
+import cavecode_trace as trace
+from cavecode_parser import Document, parse_text
+from cavecode_fix_v1 import fix_header_line, fix_in_place
+from cavecode_rules import RuleEngine
+from validate_cavecode_v1_1 import build_engine, collect_paths, summarize
+from validation_report import LINE_RE, Finding, make_record, read_error, write_record
+
+DEFAULT_INTERVAL = 0.5
+
+USAGE = (
+    "Usage: python cavecode_watch.py [--interval SECONDS] [--fix] [--rules PACK[,PACK]] "
+    "[--format text|ndjson] [--once] <file | dir | glob> ..."
+)
+
+# (header messages, required hits, block checks, line messages) for one segment
+SegmentResult = Tuple[List[str], List[int], List[Optional[bool]], List[str]]
+
+
+class Segment:
+    """
+    The lines before the first header, or one block (header line
+    included), with its check results at its current line position.
+    """
+
+    __slots__ = ("text", "line", "nlines", "block", "result")
+
+    def __init__(self, text: str, line: int, nlines: int, block, result: SegmentResult):
+        self.text = text
+        self.line = line          # 0-based document line of the first line
+        self.nlines = nlines
+        self.block = block        # parsed Block, None for the preamble
+        self.result = result
+
+    def move(self, line: int) -> None:
+        """Renumber this segment's messages for its new position."""
+        delta = line - self.line
+        if delta:
+            headers, hits, checks, lines = self.result
+            self.result = (shift_lines(headers, delta), hits, checks, shift_lines(lines, delta))
+            self.line = line
+
+
+class WatchedCard:
+    """One card's last stat and text, and its segments."""
+
+    __slots__ = ("path", "stat", "text", "segments", "status", "messages")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stat: Optional[Tuple[int, int]] = None
+        self.text = ""
+        self.segments: List[Segment] = []
+        self.status = ""
+        self.messages: List[str] = []
+
+
+def file_stat(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def shift_line(msg: str, delta: int) -> str:
+    text = LINE_RE.sub(lambda m: f"Line {int(m.group(1)) + delta}:", msg, count=1)
+    if isinstance(msg, Finding):
+        return Finding(text, msg.code, msg.severity, None if msg.line is None else msg.line + delta)
+    return text
+
+
+def shift_lines(messages: List[str], delta: int) -> List[str]:
+    if not delta:
+        return messages
+    return [shift_line(msg, delta) for msg in messages]
+
+
+def common_prefix(a: str, b: str) -> int:
+    """Length of the common prefix (slice compares, so O(n) at C speed)."""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def common_suffix(a: str, b: str, limit: int) -> int:
+    """Length of the common suffix, at most limit."""
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid : len(a) - lo] == b[len(b) - mid : len(b) - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def check_segment(engine: RuleEngine, doc: Document, block, start: int, end: int) -> SegmentResult:
+    """Runs every check that depends on lines start..end of doc."""
+    base = doc.offsets[start]
+    stop = doc.offsets[end] if end < len(doc.offsets) else len(doc.text)
+    lines = engine.line_messages(
+        doc.text[base:stop],
+        [o - base for o in doc.offsets[start:end]],
+        doc.lines[start:end],
+        start,
+    )
+    if block is None:
+        return [], [], [None] * len(engine.block_rules), lines
+    return (
+        engine.header_messages(block.header),
+        engine.required_hits(block.header),
+        engine.block_checks(block),
+        lines,
+    )
+
+
+def parse_segments(engine: RuleEngine, region: str, line: int, reuse: Dict[str, Segment]) -> Tuple[List[Segment], int]:
+    """
+    Parses region (whole segments of the card, starting at document line
+    line) and checks each segment not found in reuse. Returns the new
+    segments and how many were checked.
+    """
+    doc = parse_text(region)
+    bounds = []             # (block or None, start, end)
+    first = doc.blocks[0].header.lineno if doc.blocks else len(doc.lines)
+    if first > 0:
+        bounds.append((None, 0, first))
+    for block in doc.blocks:
+        bounds.append((block, block.header.lineno, block.end))
+
+    segments: List[Segment] = []
+    checked = 0
+    for block, start, end in bounds:
+        stop = doc.offsets[end] if end < len(doc.offsets) else len(region)
+        text = region[doc.offsets[start]:stop]
+        old = reuse.pop(text, None)
+        if old is not None:
+            old.move(line + start)
+            segments.append(old)
+            continue
+        result = check_segment(engine, doc, block, start, end)
+        segment = Segment(text, start, end - start, block, result)
+        segment.move(line + start)
+        segments.append(segment)
+        checked += 1
+    return segments, checked
+
+
+def update_card(card: WatchedCard, text: str, engine: RuleEngine) -> Tuple[int, List[Segment]]:
+    """
+    Brings card up to date with text, re-parsing and re-checking only the
+    segments the edit touched. Returns (segments checked, new segments).
+    """
+    old = card.segments
+    if not old:
+        new, checked = parse_segments(engine, text, 0, {})
+        card.segments, card.text = new, text
+        return checked, new
+
+    prefix = common_prefix(card.text, text)
+    if prefix == len(card.text) == len(text):
+        return 0, []
+    suffix = common_suffix(card.text, text, min(len(card.text), len(text)) - prefix)
+
+    starts = []
+    offset = 0
+    for seg in old:
+        starts.append(offset)
+        offset += len(seg.text)
+    first = bisect.bisect_right(starts, max(prefix - 1, 0)) - 1
+    last = bisect.bisect_right(starts, len(card.text) - suffix) - 1
+    growth = len(text) - len(card.text)
+
+    while True:
+        start = starts[first]
+        end = starts[last] + len(old[last].text) + growth
+        region = text[start:end]
+        # A broken or deleted header hands its lines to the block above
+        if first > 0 and not starts_with_header(region):
+            first -= 1
+            continue
+        break
+
+    reuse = {seg.text: seg for seg in old[first : last + 1]}
+    new, checked = parse_segments(engine, region, old[first].line, reuse)
+    delta = sum(s.nlines for s in new) - sum(s.nlines for s in old[first : last + 1])
+    for seg in old[last + 1 :]:
+        seg.move(seg.line + delta)
+    card.segments = old[:first] + new + old[last + 1 :]
+    card.text = text
+    return checked, new
+
+
+def starts_with_header(region: str) -> bool:
+    doc = parse_text(region[: region.find("\n") + 1 or len(region)])
+    return bool(doc.blocks) and doc.blocks[0].header.lineno == 0
+
+
+def check_card(card: WatchedCard, text: str, engine: RuleEngine) -> Tuple[int, int, List[Segment]]:
+    """
+    Re-checks card against text. Returns (segments checked, total
+    segments, segments that were parsed again).
+    """
+    checked, new = update_card(card, text, engine)
+    headers: List[str] = []
+    present = [False] * len(engine.required)
+    passes = [False] * len(engine.block_rules)
+    lines: List[str] = []
+    for seg in card.segments:
+        header_messages, hits, checks, line_messages = seg.result
+        headers.extend(header_messages)
+        for idx in hits:
+            present[idx] = True
+        for idx, ok in enumerate(checks):
+            if ok:
+                passes[idx] = True
+        lines.extend(line_messages)
+    card.messages = engine.finish(headers, present, passes, lines)
+    card.status = summarize(card.messages)
+    return checked, len(card.segments), new
+
+
+def needs_fix(segments: List[Segment]) -> bool:
+    for seg in segments:
+        if seg.block is not None:
+            header = seg.text.splitlines()[0]
+            if fix_header_line(header) != header:
+                return True
+    return False
+
+
+def refresh(card: WatchedCard, engine: RuleEngine, fix: bool) -> Tuple[int, int, bool]:
+    """Reads the card from disk and re-checks it. Returns (checked, total, fixed)."""
+    try:
+        text = Path(card.path).read_bytes().decode("utf-8")
+    except (OSError, UnicodeDecodeError) as e:
+        card.text = ""
+        card.segments = []
+        card.messages = [read_error(e)]
+        card.status = "FAIL"
+        card.stat = file_stat(card.path)
+        return 0, 0, False
+
+    previous = card.segments     # keeps old segments alive so their ids stay unique
+    reused = {id(seg) for seg in previous}
+    _, total, new = check_card(card, text, engine)
+    fixed = False
+    if fix and needs_fix(new):
+        with trace.phase("fix"):
+            fix_in_place(Path(card.path))
+        text = Path(card.path).read_text(encoding="utf-8")
+        _, total, _ = check_card(card, text, engine)
+        fixed = True
+    checked = sum(1 for seg in card.segments if id(seg) not in reused)
+    # Stat after any fix so our own write is not reported as a change
+    card.stat = file_stat(card.path)
+    return checked, total, fixed
+
+
+def report(card: WatchedCard, elapsed_ms: float, rechecked: int, total: int,
+           fixed: bool, ndjson: bool) -> None:
+    if ndjson:
+        record = make_record(card.path, card.status, card.messages, elapsed_ms)
+        record["blocks_rechecked"] = rechecked
+        record["blocks"] = total
+        record["fixed"] = fixed
+        write_record(sys.stdout, record)
+        return
+    stamp = time.strftime("%H:%M:%S")
+    note = " — headers fixed" if fixed else ""
+    print(f"[{stamp}] {card.path}: {card.status} "
+          f"({elapsed_ms:.2f} ms, {rechecked}/{total} blocks rechecked){note}")
+    for m in card.messages:
+        print(f"    - {m}")
+    sys.stdout.flush()
+
+
+def report_removed(path: str, ndjson: bool) -> None:
+    if ndjson:
+        write_record(sys.stdout, {"type": "removed", "path": path})
+        return
+    print(f"[{time.strftime('%H:%M:%S')}] {path}: removed")
+    sys.stdout.flush()
+
+
+def poll(cards: Dict[str, WatchedCard], targets: List[str], engine: RuleEngine,
+         fix: bool, ndjson: bool) -> None:
+    """One sweep: pick up new and changed cards, drop deleted ones."""
+    paths = collect_paths(targets)
+    for path in paths:
+        stat = file_stat(path)
+        if stat is None:
+            continue
+        card = cards.get(path)
+        if card is None:
+            card = cards[path] = WatchedCard(path)
+        elif card.stat == stat:
+            continue
+        started = time.perf_counter()
+        with trace.phase("check"):
+            rechecked, total, fixed = refresh(card, engine, fix)
+        trace.count("files")
+        trace.count("segments_rechecked", rechecked)
+        with trace.phase("report"):
+            report(card, (time.perf_counter() - started) * 1000, rechecked, total, fixed, ndjson)
+
+    current = set(paths)
+    for path in list(cards):
+        if path not in current or file_stat(path) is None:
+            del cards[path]
+            report_removed(path, ndjson)
+
+
+def parse_args(argv):
+    opts = {"targets": [], "interval": DEFAULT_INTERVAL, "fix": False,
+            "packs": (), "ndjson": False, "once": False}
+    i = 1
+    while i < len(argv):
+        if argv[i] == "--interval" and i + 1 < len(argv):
+            try:
+                opts["interval"] = max(0.01, float(argv[i + 1]))
+            except ValueError:
+                print(USAGE, file=sys.stderr)
+                sys.exit(1)
+            i += 2
+        elif argv[i] == "--fix":
+            opts["fix"] = True
+            i += 1
+        elif argv[i] == "--rules" and i + 1 < len(argv):
+            opts["packs"] += tuple(p for p in argv[i + 1].split(",") if p)
+            i += 2
+        elif argv[i] == "--format" and i + 1 < len(argv):
+            if argv[i + 1] not in ("text", "ndjson", "json"):
+                print(f"Unsupported format: {argv[i + 1]}", file=sys.stderr)
+                sys.exit(1)
+            opts["ndjson"] = argv[i + 1] != "text"
+            i += 2
+        elif argv[i] in ("--json", "--ndjson"):
+            opts["ndjson"] = True
+            i += 1
+        elif argv[i] == "--once":
+            opts["once"] = True
+            i += 1
+        else:
+            opts["targets"].append(argv[i])
+            i += 1
+    if not opts["targets"]:
+        print(USAGE, file=sys.stderr)
+        sys.exit(1)
+    return opts
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv if argv is None else argv
+    trace.start("watch")
+    opts = parse_args(argv)
+    try:
+        engine = build_engine(opts["packs"])
+    except (ValueError, OSError, AttributeError) as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    cards: Dict[str, WatchedCard] = {}
+    poll(cards, opts["targets"], engine, opts["fix"], opts["ndjson"])
+    if opts["once"]:
+        sys.exit(1 if any(c.status == "FAIL" for c in cards.values()) else 0)
+
+    if not opts["ndjson"]:
+        print(f"\nWatching {len(cards)} cards (every {opts['interval']}s, Ctrl-C to stop)")
+        sys.stdout.flush()
+    try:
+        while True:
+            time.sleep(opts["interval"])
+            poll(cards, opts["targets"], engine, opts["fix"], opts["ndjson"])
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()